@@ -15,6 +15,40 @@
 /*!40101 SET @OLD_SQL_MODE=@@SQL_MODE, SQL_MODE='NO_AUTO_VALUE_ON_ZERO' */;
 /*!40111 SET @OLD_SQL_NOTES=@@SQL_NOTES, SQL_NOTES=0 */;
 
+--
+-- Table structure for table `attempt_step_summary`
+--
+
+DROP TABLE IF EXISTS `attempt_step_summary`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `attempt_step_summary` (
+  `session_id` varchar(50) NOT NULL,
+  `step_index` int NOT NULL,
+  `lesson_id` varchar(50) DEFAULT NULL,
+  `user_id` int DEFAULT NULL,
+  `attempts` int NOT NULL DEFAULT '0',
+  `corrects` int NOT NULL DEFAULT '0',
+  `skips` int NOT NULL DEFAULT '0',
+  `first_ts` bigint DEFAULT NULL,
+  `last_ts` bigint DEFAULT NULL,
+  PRIMARY KEY (`session_id`,`step_index`),
+  KEY `idx_attempt_step_summary_user` (`user_id`),
+  KEY `idx_attempt_step_summary_lesson` (`lesson_id`),
+  CONSTRAINT `attempt_step_summary_ibfk_1` FOREIGN KEY (`lesson_id`) REFERENCES `lessons` (`id`) ON DELETE SET NULL,
+  CONSTRAINT `attempt_step_summary_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `attempt_step_summary`
+--
+
+LOCK TABLES `attempt_step_summary` WRITE;
+/*!40000 ALTER TABLE `attempt_step_summary` DISABLE KEYS */;
+/*!40000 ALTER TABLE `attempt_step_summary` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `attempts`
 --
@@ -32,10 +66,13 @@ CREATE TABLE `attempts` (
   `correct` tinyint(1) DEFAULT '0',
   `attempts` int DEFAULT '0',
   `ts` bigint DEFAULT NULL,
+  `client_key` varchar(64) DEFAULT NULL,
   PRIMARY KEY (`id`),
+  UNIQUE KEY `idx_attempts_client_key` (`session_id`,`client_key`),
   KEY `lesson_id` (`lesson_id`),
-  KEY `idx_attempts_session` (`session_id`),
   KEY `idx_attempts_user` (`user_id`),
+  KEY `idx_attempts_session_correct` (`session_id`,`correct`),
+  KEY `idx_attempts_session_step` (`session_id`,`step_index`),
   CONSTRAINT `attempts_ibfk_1` FOREIGN KEY (`session_id`) REFERENCES `sessions` (`id`) ON DELETE CASCADE,
   CONSTRAINT `attempts_ibfk_2` FOREIGN KEY (`lesson_id`) REFERENCES `lessons` (`id`) ON DELETE SET NULL,
   CONSTRAINT `attempts_ibfk_3` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE SET NULL
@@ -48,10 +85,66 @@ CREATE TABLE `attempts` (
 
 LOCK TABLES `attempts` WRITE;
 /*!40000 ALTER TABLE `attempts` DISABLE KEYS */;
-INSERT INTO `attempts` VALUES (1,'1ef27394ca404474','ef2b0d3f',20,0,'A',1,1,20251115170050),(2,'1ef27394ca404474','ef2b0d3f',20,1,'B',0,1,20251115170056),(3,'1ef27394ca404474','ef2b0d3f',20,1,'E',1,2,20251115170100),(4,'1ef27394ca404474','ef2b0d3f',20,2,'C',0,1,20251115170106),(5,'1ef27394ca404474','ef2b0d3f',20,2,'E',0,2,20251115170110),(6,'1ef27394ca404474','ef2b0d3f',20,2,'__SKIP__',0,1,20251115170119),(7,'1ef27394ca404474','ef2b0d3f',20,2,'DSADSA',0,4,20251115170126),(8,'1ef27394ca404474','ef2b0d3f',20,2,'E',0,5,20251115170135),(9,'d03de8cce71e4b13','aafed076',20,0,'HOLA',0,1,20251115171044),(10,'d03de8cce71e4b13','aafed076',20,0,'A',1,2,20251115171046),(11,'1ef27394ca404474','ef2b0d3f',20,2,'I',1,6,20251115171100),(12,'1ef27394ca404474','ef2b0d3f',20,3,'O',1,1,20251115171106),(13,'1ef27394ca404474','ef2b0d3f',20,4,'Y',0,1,20251115171113),(14,'1ef27394ca404474','ef2b0d3f',20,4,'U',1,2,20251115171117),(15,'708e1db43cf74bac','db976995',20,0,'B',0,1,20251115174745),(16,'708e1db43cf74bac','db976995',20,0,'A',1,2,20251115174749),(17,'708e1db43cf74bac','db976995',20,1,'B',1,1,20251115174753),(18,'708e1db43cf74bac','db976995',20,2,'C',1,1,20251115174756),(19,'41f1d59cf8254601','ef2b0d3f',20,0,'A',1,1,20251115175745),(20,'41f1d59cf8254601','ef2b0d3f',20,1,'E',1,1,20251115175749),(21,'41f1d59cf8254601','ef2b0d3f',20,2,'I',1,1,20251115175753),(22,'41f1d59cf8254601','ef2b0d3f',20,3,'O',1,1,20251115175758),(23,'41f1d59cf8254601','ef2b0d3f',20,4,'U',1,1,20251115175803),(24,'578ef99c53274c4c','ef2b0d3f',20,0,'2',0,1,20251115180154),(25,'578ef99c53274c4c','ef2b0d3f',20,0,'D',0,2,20251115180200),(26,'578ef99c53274c4c','ef2b0d3f',20,0,'D',0,3,20251115180204);
+INSERT INTO `attempts` VALUES (1,'1ef27394ca404474','ef2b0d3f',20,0,'A',1,1,20251115170050,NULL),(2,'1ef27394ca404474','ef2b0d3f',20,1,'B',0,1,20251115170056,NULL),(3,'1ef27394ca404474','ef2b0d3f',20,1,'E',1,2,20251115170100,NULL),(4,'1ef27394ca404474','ef2b0d3f',20,2,'C',0,1,20251115170106,NULL),(5,'1ef27394ca404474','ef2b0d3f',20,2,'E',0,2,20251115170110,NULL),(6,'1ef27394ca404474','ef2b0d3f',20,2,'__SKIP__',0,1,20251115170119,NULL),(7,'1ef27394ca404474','ef2b0d3f',20,2,'DSADSA',0,4,20251115170126,NULL),(8,'1ef27394ca404474','ef2b0d3f',20,2,'E',0,5,20251115170135,NULL),(9,'d03de8cce71e4b13','aafed076',20,0,'HOLA',0,1,20251115171044,NULL),(10,'d03de8cce71e4b13','aafed076',20,0,'A',1,2,20251115171046,NULL),(11,'1ef27394ca404474','ef2b0d3f',20,2,'I',1,6,20251115171100,NULL),(12,'1ef27394ca404474','ef2b0d3f',20,3,'O',1,1,20251115171106,NULL),(13,'1ef27394ca404474','ef2b0d3f',20,4,'Y',0,1,20251115171113,NULL),(14,'1ef27394ca404474','ef2b0d3f',20,4,'U',1,2,20251115171117,NULL),(15,'708e1db43cf74bac','db976995',20,0,'B',0,1,20251115174745,NULL),(16,'708e1db43cf74bac','db976995',20,0,'A',1,2,20251115174749,NULL),(17,'708e1db43cf74bac','db976995',20,1,'B',1,1,20251115174753,NULL),(18,'708e1db43cf74bac','db976995',20,2,'C',1,1,20251115174756,NULL),(19,'41f1d59cf8254601','ef2b0d3f',20,0,'A',1,1,20251115175745,NULL),(20,'41f1d59cf8254601','ef2b0d3f',20,1,'E',1,1,20251115175749,NULL),(21,'41f1d59cf8254601','ef2b0d3f',20,2,'I',1,1,20251115175753,NULL),(22,'41f1d59cf8254601','ef2b0d3f',20,3,'O',1,1,20251115175758,NULL),(23,'41f1d59cf8254601','ef2b0d3f',20,4,'U',1,1,20251115175803,NULL),(24,'578ef99c53274c4c','ef2b0d3f',20,0,'2',0,1,20251115180154,NULL),(25,'578ef99c53274c4c','ef2b0d3f',20,0,'D',0,2,20251115180200,NULL),(26,'578ef99c53274c4c','ef2b0d3f',20,0,'D',0,3,20251115180204,NULL);
 /*!40000 ALTER TABLE `attempts` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `attempts_archive`
+--
+
+DROP TABLE IF EXISTS `attempts_archive`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `attempts_archive` (
+  `id` int NOT NULL,
+  `session_id` varchar(50) DEFAULT NULL,
+  `lesson_id` varchar(50) DEFAULT NULL,
+  `user_id` int DEFAULT NULL,
+  `step_index` int DEFAULT NULL,
+  `answer` text,
+  `correct` tinyint(1) DEFAULT '0',
+  `attempts` int DEFAULT '0',
+  `ts` bigint DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_attempts_archive_session` (`session_id`),
+  KEY `idx_attempts_archive_user` (`user_id`)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `attempts_archive`
+--
+
+LOCK TABLES `attempts_archive` WRITE;
+/*!40000 ALTER TABLE `attempts_archive` DISABLE KEYS */;
+/*!40000 ALTER TABLE `attempts_archive` ENABLE KEYS */;
+UNLOCK TABLES;
+
+--
+-- Table structure for table `cache_versions`
+--
+
+DROP TABLE IF EXISTS `cache_versions`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `cache_versions` (
+  `name` varchar(50) NOT NULL,
+  `version` bigint NOT NULL DEFAULT '0',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `cache_versions`
+--
+
+LOCK TABLES `cache_versions` WRITE;
+/*!40000 ALTER TABLE `cache_versions` DISABLE KEYS */;
+INSERT INTO `cache_versions` VALUES ('lessons',0);
+/*!40000 ALTER TABLE `cache_versions` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `class_lessons`
 --
@@ -175,6 +268,37 @@ LOCK TABLES `devices` WRITE;
 /*!40000 ALTER TABLE `devices` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `import_jobs`
+--
+
+DROP TABLE IF EXISTS `import_jobs`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `import_jobs` (
+  `id` char(32) NOT NULL,
+  `status` varchar(16) NOT NULL,
+  `row_count` int NOT NULL DEFAULT '0',
+  `imported` int NOT NULL DEFAULT '0',
+  `skipped` int NOT NULL DEFAULT '0',
+  `error_count` int NOT NULL DEFAULT '0',
+  `errors` mediumtext,
+  `started_at` bigint NOT NULL,
+  `finished_at` bigint DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_import_jobs_started` (`started_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `import_jobs`
+--
+
+LOCK TABLES `import_jobs` WRITE;
+/*!40000 ALTER TABLE `import_jobs` DISABLE KEYS */;
+/*!40000 ALTER TABLE `import_jobs` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `lesson_steps`
 --
@@ -222,6 +346,8 @@ CREATE TABLE `lessons` (
   `order_index` int DEFAULT '0',
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   `active` tinyint(1) DEFAULT '1',
+  `version` int NOT NULL DEFAULT '1',
+  `step_count` int NOT NULL DEFAULT '0',
   PRIMARY KEY (`id`),
   KEY `idx_lessons_difficulty` (`difficulty`),
   KEY `idx_lessons_order` (`order_index`)
@@ -234,10 +360,61 @@ CREATE TABLE `lessons` (
 
 LOCK TABLES `lessons` WRITE;
 /*!40000 ALTER TABLE `lessons` DISABLE KEYS */;
-INSERT INTO `lessons` VALUES ('aafed076','hehe','hehe','intermediate',1,'2025-11-15 19:47:04',1),('db976995','introduccion a braille','empleado','beginner',3,'2025-11-15 21:46:22',1),('ef2b0d3f','Vocales en Braille','Aprende a reconocer y escribir las 5 vocales en el sistema Braille','beginner',0,'2025-11-15 19:34:16',1);
+INSERT INTO `lessons` VALUES ('aafed076','hehe','hehe','intermediate',1,'2025-11-15 19:47:04',1,1,1),('db976995','introduccion a braille','empleado','beginner',3,'2025-11-15 21:46:22',1,1,3),('ef2b0d3f','Vocales en Braille','Aprende a reconocer y escribir las 5 vocales en el sistema Braille','beginner',0,'2025-11-15 19:34:16',1,1,5);
 /*!40000 ALTER TABLE `lessons` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `live_events`
+--
+
+DROP TABLE IF EXISTS `live_events`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `live_events` (
+  `id` bigint NOT NULL AUTO_INCREMENT,
+  `student_id` int NOT NULL,
+  `payload` text NOT NULL,
+  `created_at` bigint NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_live_events_created` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `live_events`
+--
+
+LOCK TABLES `live_events` WRITE;
+/*!40000 ALTER TABLE `live_events` DISABLE KEYS */;
+/*!40000 ALTER TABLE `live_events` ENABLE KEYS */;
+UNLOCK TABLES;
+
+--
+-- Table structure for table `schema_version`
+--
+
+DROP TABLE IF EXISTS `schema_version`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `schema_version` (
+  `version` int NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `applied_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`version`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `schema_version`
+--
+
+LOCK TABLES `schema_version` WRITE;
+/*!40000 ALTER TABLE `schema_version` DISABLE KEYS */;
+INSERT INTO `schema_version` VALUES (1,'session_cursor','2026-10-18 12:00:00'),(2,'lesson_versions','2026-10-18 12:00:00'),(3,'user_token_version','2026-10-18 12:00:00'),(4,'student_activity','2026-10-18 12:00:00'),(5,'hot_path_indexes','2026-10-18 12:00:00'),(6,'attempt_archive','2026-10-18 12:00:00'),(7,'student_lessons','2026-10-18 12:00:00'),(8,'attempt_client_keys','2026-10-18 12:00:00'),(9,'live_events','2026-10-18 12:00:00'),(10,'import_jobs','2026-10-18 12:00:00');
+/*!40000 ALTER TABLE `schema_version` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `sessions`
 --
@@ -254,10 +431,15 @@ CREATE TABLE `sessions` (
   `finished_at` bigint DEFAULT NULL,
   `score` int DEFAULT '0',
   `completed` tinyint(1) DEFAULT '0',
+  `current_step` int NOT NULL DEFAULT '0',
+  `step_attempts` int NOT NULL DEFAULT '0',
+  `attempt_count` int NOT NULL DEFAULT '0',
+  `archived_at` bigint DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `lesson_id` (`lesson_id`),
-  KEY `user_id` (`user_id`),
   KEY `idx_sessions_class` (`class_id`),
+  KEY `idx_sessions_user_lesson` (`user_id`,`lesson_id`,`finished_at`,`started_at`),
+  KEY `idx_sessions_archive` (`archived_at`,`finished_at`,`started_at`),
   CONSTRAINT `sessions_ibfk_1` FOREIGN KEY (`lesson_id`) REFERENCES `lessons` (`id`) ON DELETE SET NULL,
   CONSTRAINT `sessions_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE SET NULL,
   CONSTRAINT `sessions_ibfk_3` FOREIGN KEY (`class_id`) REFERENCES `classes` (`id`) ON DELETE SET NULL ON UPDATE CASCADE
@@ -270,10 +452,96 @@ CREATE TABLE `sessions` (
 
 LOCK TABLES `sessions` WRITE;
 /*!40000 ALTER TABLE `sessions` DISABLE KEYS */;
-INSERT INTO `sessions` VALUES ('1ef27394ca404474','ef2b0d3f',20,NULL,20251115170041,20251115171117,5,0),('41f1d59cf8254601','ef2b0d3f',20,NULL,20251115175742,20251115175803,5,0),('578ef99c53274c4c','ef2b0d3f',20,NULL,20251115180141,NULL,0,0),('708e1db43cf74bac','db976995',20,NULL,20251115174738,20251115174756,3,0),('b3eff7f753944a30','aafed076',20,NULL,20251115171124,NULL,0,0),('d03de8cce71e4b13','aafed076',20,NULL,20251115171037,20251115171046,1,0);
+INSERT INTO `sessions` VALUES ('1ef27394ca404474','ef2b0d3f',20,NULL,20251115170041,20251115171117,5,0,5,0,12,NULL),('41f1d59cf8254601','ef2b0d3f',20,NULL,20251115175742,20251115175803,5,0,5,0,5,NULL),('578ef99c53274c4c','ef2b0d3f',20,NULL,20251115180141,NULL,0,0,0,3,3,NULL),('708e1db43cf74bac','db976995',20,NULL,20251115174738,20251115174756,3,0,3,0,4,NULL),('b3eff7f753944a30','aafed076',20,NULL,20251115171124,NULL,0,0,0,0,0,NULL),('d03de8cce71e4b13','aafed076',20,NULL,20251115171037,20251115171046,1,0,1,0,2,NULL);
 /*!40000 ALTER TABLE `sessions` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `student_activity`
+--
+
+DROP TABLE IF EXISTS `student_activity`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `student_activity` (
+  `student_id` int NOT NULL,
+  `attempts` int NOT NULL DEFAULT '0',
+  `corrects` int NOT NULL DEFAULT '0',
+  `last_ts` bigint DEFAULT NULL,
+  `lessons_completed` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`student_id`),
+  CONSTRAINT `student_activity_ibfk_1` FOREIGN KEY (`student_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `student_activity`
+--
+
+LOCK TABLES `student_activity` WRITE;
+/*!40000 ALTER TABLE `student_activity` DISABLE KEYS */;
+INSERT INTO `student_activity` VALUES (20,26,14,20251115180204,3);
+/*!40000 ALTER TABLE `student_activity` ENABLE KEYS */;
+UNLOCK TABLES;
+
+--
+-- Table structure for table `student_lesson_activity`
+--
+
+DROP TABLE IF EXISTS `student_lesson_activity`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `student_lesson_activity` (
+  `student_id` int NOT NULL,
+  `lesson_id` varchar(50) NOT NULL,
+  `attempts` int NOT NULL DEFAULT '0',
+  `corrects` int NOT NULL DEFAULT '0',
+  `last_ts` bigint DEFAULT NULL,
+  `completed` tinyint(1) NOT NULL DEFAULT '0',
+  PRIMARY KEY (`student_id`,`lesson_id`),
+  KEY `idx_student_lesson_activity_lesson` (`lesson_id`),
+  CONSTRAINT `student_lesson_activity_ibfk_1` FOREIGN KEY (`student_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `student_lesson_activity_ibfk_2` FOREIGN KEY (`lesson_id`) REFERENCES `lessons` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `student_lesson_activity`
+--
+
+LOCK TABLES `student_lesson_activity` WRITE;
+/*!40000 ALTER TABLE `student_lesson_activity` DISABLE KEYS */;
+INSERT INTO `student_lesson_activity` VALUES (20,'aafed076',2,1,20251115171046,1),(20,'db976995',4,3,20251115174756,1),(20,'ef2b0d3f',20,10,20251115180204,1);
+/*!40000 ALTER TABLE `student_lesson_activity` ENABLE KEYS */;
+UNLOCK TABLES;
+
+--
+-- Table structure for table `student_lessons`
+--
+
+DROP TABLE IF EXISTS `student_lessons`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `student_lessons` (
+  `student_id` int NOT NULL,
+  `lesson_id` varchar(50) NOT NULL,
+  PRIMARY KEY (`student_id`,`lesson_id`),
+  KEY `idx_student_lessons_lesson` (`lesson_id`),
+  CONSTRAINT `student_lessons_ibfk_1` FOREIGN KEY (`student_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `student_lessons_ibfk_2` FOREIGN KEY (`lesson_id`) REFERENCES `lessons` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `student_lessons`
+--
+
+LOCK TABLES `student_lessons` WRITE;
+/*!40000 ALTER TABLE `student_lessons` DISABLE KEYS */;
+INSERT INTO `student_lessons` VALUES (19,'aafed076'),(19,'ef2b0d3f'),(20,'aafed076'),(20,'db976995'),(20,'ef2b0d3f');
+/*!40000 ALTER TABLE `student_lessons` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `student_progress`
 --
@@ -308,6 +576,7 @@ CREATE TABLE `student_progress` (
 
 LOCK TABLES `student_progress` WRITE;
 /*!40000 ALTER TABLE `student_progress` DISABLE KEYS */;
+INSERT INTO `student_progress` VALUES (1,20,'aafed076',NULL,1,1,2,'2025-11-15 17:10:46','2025-11-15 17:10:46'),(2,20,'db976995',NULL,1,3,4,'2025-11-15 17:47:56','2025-11-15 17:47:56'),(3,20,'ef2b0d3f',NULL,1,5,17,'2025-11-15 17:58:03','2025-11-15 17:11:17');
 /*!40000 ALTER TABLE `student_progress` ENABLE KEYS */;
 UNLOCK TABLES;
 
@@ -328,6 +597,7 @@ CREATE TABLE `users` (
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   `active` tinyint(1) DEFAULT '1',
   `CI` int DEFAULT '0',
+  `token_version` int NOT NULL DEFAULT '0',
   PRIMARY KEY (`id`),
   UNIQUE KEY `username` (`username`),
   KEY `idx_users_role` (`role`)
@@ -340,7 +610,7 @@ CREATE TABLE `users` (
 
 LOCK TABLES `users` WRITE;
 /*!40000 ALTER TABLE `users` DISABLE KEYS */;
-INSERT INTO `users` VALUES (13,'xdd','fabiofernandez','admin','scrypt:32768:8:1$mHHw2fBobI4LXY0y$ec087b5800844557336bb0f004d2691e778c35a36ca93e595d2f6d8ed1a72f0bdcf3ffbfcfe4a60305e8b19a914fd203dc1b90fc1502cbfd4d0208ff540d167e',NULL,'2025-11-14 23:33:04',1,12345678),(14,'fer','fab','admin','c8cefded12a2334c16a9c2c50f56509b$70a70d69a8909cd6000ef2e024c97cfe077ef33dc98942e8c49856fe3f5243e6e02d828c3c74af52179cb1408ad118ffcbf0ffcf0df06fc222745b55068306b3',NULL,'2025-11-14 23:46:05',1,0),(15,'lesli','Moises Fernandez','admin','0f7bc0d4b293aa537c0d05438f6c66fc$f9bcacd48acf576e577d63ebdbecd1a9be42da3f99e40b732d74a42bd09aecd939897f9a5456e988460e1088857c09bc4242ebed1849dcb8aa9ebe30cc106b96',NULL,'2025-11-15 00:10:55',1,0),(16,'empleado','fabio fernandez','teacher','2bb790553c4ca591aed84ee603b033d0$b40cf2f10de1191f02051ecba57f0407949aa3796151b4b2d5736f9c493f42e694bed89de4f7718e0af5f2323481b87369cb7f8072b88df94570c2d940755c8a',NULL,'2025-11-15 00:14:23',1,0),(17,'feb','fab','admin','a72e61220fbd23f0a585c9aaf34091a2$a0043affbbbc123d77050f9222d871d071ac72b99c0d7b0bfa96bddaab87f9c1b617513f9ab9ba8634d33438ae9af326de865c0a4ac234a81b4f6555d1bd824c',NULL,'2025-11-15 00:30:05',1,0),(19,'lesliaa','Moises Fernandez','student','26a8d82829b147057586532d52e3c018$fefb938908e788a371994fe7b9cb4075bc41d5b2866faac0002690537353622812cec434ed216b3fdeccc025ca1823b364f959e01ad632a121f55b4e318bf331',NULL,'2025-11-15 05:38:54',1,0),(20,'empleado1','fabio fernandez','student','43e66e053024991669332d1bb86ad7b3$ab5fc01c2325968a544a921d41602c123175743a38d860744a65b25fb4360af07d7adfdde86a8d2dc2b16717b239d716e3c58c087d696faa05b6aa93e64f9a37',NULL,'2025-11-15 18:42:46',1,NULL),(21,'lucas','Lucas','teacher','ec39f899088ce58689c5c947b766eca3$8376691d8de550769ed1897a97b78c131482dfa1e407f2b7bf4349918c0957c3911eb94e6d918713be0f2c55e98d0fc8d377aeb1b0f38a8cbc63e710a26c080a',NULL,'2025-11-15 18:56:54',1,NULL);
+INSERT INTO `users` VALUES (13,'xdd','fabiofernandez','admin','scrypt:32768:8:1$mHHw2fBobI4LXY0y$ec087b5800844557336bb0f004d2691e778c35a36ca93e595d2f6d8ed1a72f0bdcf3ffbfcfe4a60305e8b19a914fd203dc1b90fc1502cbfd4d0208ff540d167e',NULL,'2025-11-14 23:33:04',1,12345678,0),(14,'fer','fab','admin','c8cefded12a2334c16a9c2c50f56509b$70a70d69a8909cd6000ef2e024c97cfe077ef33dc98942e8c49856fe3f5243e6e02d828c3c74af52179cb1408ad118ffcbf0ffcf0df06fc222745b55068306b3',NULL,'2025-11-14 23:46:05',1,0,0),(15,'lesli','Moises Fernandez','admin','0f7bc0d4b293aa537c0d05438f6c66fc$f9bcacd48acf576e577d63ebdbecd1a9be42da3f99e40b732d74a42bd09aecd939897f9a5456e988460e1088857c09bc4242ebed1849dcb8aa9ebe30cc106b96',NULL,'2025-11-15 00:10:55',1,0,0),(16,'empleado','fabio fernandez','teacher','2bb790553c4ca591aed84ee603b033d0$b40cf2f10de1191f02051ecba57f0407949aa3796151b4b2d5736f9c493f42e694bed89de4f7718e0af5f2323481b87369cb7f8072b88df94570c2d940755c8a',NULL,'2025-11-15 00:14:23',1,0,0),(17,'feb','fab','admin','a72e61220fbd23f0a585c9aaf34091a2$a0043affbbbc123d77050f9222d871d071ac72b99c0d7b0bfa96bddaab87f9c1b617513f9ab9ba8634d33438ae9af326de865c0a4ac234a81b4f6555d1bd824c',NULL,'2025-11-15 00:30:05',1,0,0),(19,'lesliaa','Moises Fernandez','student','26a8d82829b147057586532d52e3c018$fefb938908e788a371994fe7b9cb4075bc41d5b2866faac0002690537353622812cec434ed216b3fdeccc025ca1823b364f959e01ad632a121f55b4e318bf331',NULL,'2025-11-15 05:38:54',1,0,0),(20,'empleado1','fabio fernandez','student','43e66e053024991669332d1bb86ad7b3$ab5fc01c2325968a544a921d41602c123175743a38d860744a65b25fb4360af07d7adfdde86a8d2dc2b16717b239d716e3c58c087d696faa05b6aa93e64f9a37',NULL,'2025-11-15 18:42:46',1,NULL,0),(21,'lucas','Lucas','teacher','ec39f899088ce58689c5c947b766eca3$8376691d8de550769ed1897a97b78c131482dfa1e407f2b7bf4349918c0957c3911eb94e6d918713be0f2c55e98d0fc8d377aeb1b0f38a8cbc63e710a26c080a',NULL,'2025-11-15 18:56:54',1,NULL,0);
 /*!40000 ALTER TABLE `users` ENABLE KEYS */;
 UNLOCK TABLES;
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
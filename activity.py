@@ -0,0 +1,246 @@
+"""Contadores de actividad por estudiante (student_activity) y por estudiante y
+lección (student_lesson_activity).
+
+record_attempts() inserta los intentos y los suma a los contadores dentro de la
+misma transacción, así el dashboard lee una fila por estudiante en lugar de
+agregar toda la tabla attempts. reconcile() recalcula los contadores desde
+attempts (más los resúmenes de archive.py) y sessions por bloques de
+estudiantes e informa (o corrige) las diferencias:
+
+    python activity.py --reconcile [--repair] [--chunk 500]
+"""
+import argparse
+from datetime import datetime
+
+from db import get_db_connection, insert_many
+
+ATTEMPT_INSERT = """INSERT INTO attempts
+    (session_id, lesson_id, user_id, step_index, answer, correct, attempts, ts) VALUES"""
+# Intentos subidos en lote por dispositivos sin conexión (answer_batch.py), con su clave de idempotencia
+ATTEMPT_KEYED_INSERT = """INSERT INTO attempts
+    (session_id, lesson_id, user_id, step_index, answer, correct, attempts, ts, client_key) VALUES"""
+STUDENT_INSERT = "INSERT INTO student_activity (student_id, attempts, corrects, last_ts, lessons_completed) VALUES"
+LESSON_INSERT = """INSERT INTO student_lesson_activity
+    (student_id, lesson_id, attempts, corrects, last_ts, completed) VALUES"""
+
+COUNTER_UPDATE = """ON DUPLICATE KEY UPDATE attempts = attempts + VALUES(attempts),
+    corrects = corrects + VALUES(corrects), last_ts = GREATEST(COALESCE(last_ts, 0), VALUES(last_ts))"""
+
+def now_ts():
+    # Mismo formato que NOW() guardado en una columna bigint: YYYYMMDDhhmmss
+    return int(datetime.now().strftime("%Y%m%d%H%M%S"))
+
+def _totals(attempts):
+    students = {}
+    lessons = {}
+    for attempt in attempts:
+        _, lesson_id, user_id, _, _, correct, _, ts = attempt[:8]
+        if user_id is None:
+            continue
+        keys = [(students, user_id)]
+        if lesson_id is not None:
+            keys.append((lessons, (user_id, lesson_id)))
+        for totals, key in keys:
+            count, corrects, last_ts = totals.get(key, (0, 0, 0))
+            totals[key] = (count + 1, corrects + (1 if correct else 0), max(last_ts, ts))
+    return students, lessons
+
+def record_attempts(cursor, attempts, keyed=False):
+    """Insertar intentos y sumarlos a los contadores, en la transacción del cursor.
+
+    attempts son tuplas (session_id, lesson_id, user_id, step_index, answer,
+    correct, attempts, ts), con client_key como noveno elemento si keyed=True.
+    Los contadores se actualizan antes del INSERT y en orden de clave, el mismo
+    orden en que reconcile() bloquea las filas.
+    """
+    attempts = list(attempts)
+    if not attempts:
+        return 0
+    students, lessons = _totals(attempts)
+    insert_many(cursor, STUDENT_INSERT,
+                [(sid, *students[sid], 0) for sid in sorted(students)],
+                suffix=COUNTER_UPDATE)
+    insert_many(cursor, LESSON_INSERT,
+                [(sid, lid, *lessons[(sid, lid)], 0) for sid, lid in sorted(lessons)],
+                suffix=COUNTER_UPDATE)
+    return insert_many(cursor, ATTEMPT_KEYED_INSERT if keyed else ATTEMPT_INSERT, attempts)
+
+def record_lesson_completed(cursor, student_id, lesson_id):
+    """Marcar la lección como completada; lessons_completed solo sube la primera vez"""
+    if student_id is None or lesson_id is None:
+        return
+    cursor.execute("""
+        INSERT INTO student_activity (student_id) VALUES (%s)
+        ON DUPLICATE KEY UPDATE student_id = student_id
+    """, (student_id,))
+    cursor.execute("""
+        SELECT completed FROM student_lesson_activity
+        WHERE student_id = %s AND lesson_id = %s
+        FOR UPDATE
+    """, (student_id, lesson_id))
+    row = cursor.fetchone()
+    completed = (row["completed"] if isinstance(row, dict) else row[0]) if row else None
+    if completed:
+        return
+    if row:
+        cursor.execute("""
+            UPDATE student_lesson_activity SET completed = 1
+            WHERE student_id = %s AND lesson_id = %s
+        """, (student_id, lesson_id))
+    else:
+        cursor.execute("""
+            INSERT INTO student_lesson_activity (student_id, lesson_id, completed)
+            VALUES (%s, %s, 1)
+        """, (student_id, lesson_id))
+    cursor.execute("""
+        UPDATE student_activity SET lessons_completed = lessons_completed + 1
+        WHERE student_id = %s
+    """, (student_id,))
+
+def _expected(cursor, student_ids, placeholders):
+    """Contadores esperados de un bloque de estudiantes, calculados desde attempts,
+    attempt_step_summary y sessions"""
+    students = {sid: [0, 0, None, 0] for sid in student_ids}
+    lessons = {}
+
+    # Intentos vigentes más los ya archivados (archive.py), que quedan resumidos por sesión y paso
+    cursor.execute(f"""
+        SELECT a.user_id, a.lesson_id, l.id as known_lesson, COUNT(*) as attempts,
+               IFNULL(SUM(a.correct), 0) as corrects, MAX(a.ts) as last_ts
+        FROM attempts a
+        LEFT JOIN lessons l ON l.id = a.lesson_id
+        WHERE a.user_id IN ({placeholders})
+        GROUP BY a.user_id, a.lesson_id, l.id
+    """, student_ids)
+    rows = cursor.fetchall()
+    cursor.execute(f"""
+        SELECT ss.user_id, ss.lesson_id, l.id as known_lesson, SUM(ss.attempts) as attempts,
+               IFNULL(SUM(ss.corrects), 0) as corrects, MAX(ss.last_ts) as last_ts
+        FROM attempt_step_summary ss
+        LEFT JOIN lessons l ON l.id = ss.lesson_id
+        WHERE ss.user_id IN ({placeholders})
+        GROUP BY ss.user_id, ss.lesson_id, l.id
+    """, student_ids)
+    rows.extend(cursor.fetchall())
+    for r in rows:
+        row_totals = [int(r["attempts"]), int(r["corrects"]), r["last_ts"]]
+        targets = [students[r["user_id"]]]
+        # Intentos de lecciones borradas cuentan para el estudiante pero no tienen fila por lección
+        if r["known_lesson"] is not None:
+            targets.append(lessons.setdefault((r["user_id"], r["lesson_id"]), [0, 0, None, 0]))
+        for totals in targets:
+            totals[0] += row_totals[0]
+            totals[1] += row_totals[1]
+            if row_totals[2] is not None:
+                totals[2] = max(totals[2] or 0, row_totals[2])
+
+    cursor.execute(f"""
+        SELECT DISTINCT s.user_id, s.lesson_id
+        FROM sessions s
+        JOIN lessons l ON l.id = s.lesson_id
+        WHERE s.user_id IN ({placeholders}) AND s.finished_at IS NOT NULL
+    """, student_ids)
+    for r in cursor.fetchall():
+        lessons.setdefault((r["user_id"], r["lesson_id"]), [0, 0, None, 0])[3] = 1
+        students[r["user_id"]][3] += 1
+    return students, lessons
+
+def reconcile(conn, repair=False, chunk_size=500, log=print):
+    """Comparar los contadores con attempts/attempt_step_summary/sessions por bloques de estudiantes.
+
+    Con repair=True reescribe los contadores de los estudiantes con diferencias.
+    Las filas de student_activity del bloque se bloquean primero, así los intentos
+    que lleguen mientras tanto esperan y se suman sobre el valor corregido.
+    Devuelve la cantidad de estudiantes con diferencias.
+    """
+    cursor = conn.cursor(dictionary=True)
+    last_id = 0
+    drifted_total = 0
+    try:
+        while True:
+            cursor.execute("""
+                SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s
+            """, (last_id, chunk_size))
+            student_ids = [row["id"] for row in cursor.fetchall()]
+            if not student_ids:
+                break
+            last_id = student_ids[-1]
+            placeholders = ", ".join(["%s"] * len(student_ids))
+            # Cerrar la lectura anterior: la instantánea de attempts tiene que tomarse
+            # después de bloquear los contadores, no antes
+            conn.commit()
+
+            cursor.execute(f"""
+                SELECT student_id, attempts, corrects, last_ts, lessons_completed
+                FROM student_activity
+                WHERE student_id IN ({placeholders})
+                ORDER BY student_id
+                {"FOR UPDATE" if repair else ""}
+            """, student_ids)
+            current_students = {
+                r["student_id"]: [r["attempts"], r["corrects"], r["last_ts"], r["lessons_completed"]]
+                for r in cursor.fetchall()
+            }
+            cursor.execute(f"""
+                SELECT student_id, lesson_id, attempts, corrects, last_ts, completed
+                FROM student_lesson_activity
+                WHERE student_id IN ({placeholders})
+            """, student_ids)
+            current_lessons = {}
+            for r in cursor.fetchall():
+                current_lessons[(r["student_id"], r["lesson_id"])] = [
+                    r["attempts"], r["corrects"], r["last_ts"], r["completed"]
+                ]
+
+            expected_students, expected_lessons = _expected(cursor, student_ids, placeholders)
+
+            empty = [0, 0, None, 0]
+            drifted = set()
+            for sid, totals in expected_students.items():
+                if current_students.get(sid, empty) != totals:
+                    drifted.add(sid)
+            for key in set(expected_lessons) | set(current_lessons):
+                if current_lessons.get(key, empty) != expected_lessons.get(key, empty):
+                    drifted.add(key[0])
+
+            for sid in sorted(drifted):
+                log(f"estudiante {sid}: contadores {current_students.get(sid, empty)} "
+                    f"esperados {expected_students[sid]}")
+            drifted_total += len(drifted)
+
+            if repair and drifted:
+                ids = sorted(drifted)
+                marks = ", ".join(["%s"] * len(ids))
+                cursor.execute(f"DELETE FROM student_lesson_activity WHERE student_id IN ({marks})", ids)
+                cursor.execute(f"DELETE FROM student_activity WHERE student_id IN ({marks})", ids)
+                insert_many(cursor, STUDENT_INSERT,
+                            [(sid, *expected_students[sid]) for sid in ids])
+                insert_many(cursor, LESSON_INSERT,
+                            [(sid, lid, *totals) for (sid, lid), totals in sorted(expected_lessons.items())
+                             if sid in drifted])
+                log(f"student_activity: {len(ids)} estudiantes corregidos (hasta el estudiante {last_id})")
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return drifted_total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento de los contadores de actividad")
+    parser.add_argument("--reconcile", action="store_true", help="comparar los contadores con attempts/sessions")
+    parser.add_argument("--repair", action="store_true", help="corregir los contadores con diferencias")
+    parser.add_argument("--chunk", type=int, default=500, help="estudiantes por transacción")
+    args = parser.parse_args()
+    if not args.reconcile:
+        parser.print_help()
+    else:
+        conn = get_db_connection()
+        if not conn:
+            raise SystemExit("Database connection failed")
+        try:
+            drifted = reconcile(conn, args.repair, args.chunk)
+            print(f"{drifted} estudiantes con diferencias")
+        finally:
+            conn.close()
@@ -1,6 +1,6 @@
 from flask import Flask
 from flask_cors import CORS
-from db import init_db
+from db import init_db, init_app
 
 init_db()
 
@@ -16,6 +16,7 @@ CORS(app, resources={
 })
 
 app.config['SECRET_KEY'] = 'admin-secret-key'
+init_app(app)
 
 from admin_views import admin_bp
 app.register_blueprint(admin_bp)
@@ -1,39 +1,104 @@
 from flask import Blueprint, request, jsonify
-from db import get_db, now_ms
-import csv
-import io
-import hashlib
-import secrets
+from db import get_db, now_ms, has_column, bump_version, read_versions
+from passwords import get_password_hash
+import import_jobs
+import assignments
+import user_events
+from etags import make_etag, not_modified, tagged
 
 admin_bp = Blueprint("admin_bp", __name__)
 
-# Password hashing - same method as FastAPI user_service
-SCRYPT_N = 16384
-SCRYPT_R = 8
-SCRYPT_P = 1
-SCRYPT_DKLEN = 64
-SALT_SIZE = 16
+# Columnas que se pueden pedir con ?fields= en los listados. La contraseña y
+# token_version nunca salen de la base.
+USER_FIELDS = ("id", "username", "full_name", "role", "created_by", "created_at", "active", "CI")
+DEVICE_FIELDS = ("id", "name", "assigned_user_id", "last_seen", "active")
+CLASS_FIELDS = ("id", "name", "description", "teacher_id", "teacher_name", "created_at", "active", "students_count")
+CLASS_FIELD_SQL = {
+    "teacher_name": "(SELECT u.full_name FROM users u WHERE u.id = c.teacher_id) as teacher_name",
+    "students_count": "(SELECT COUNT(*) FROM class_students cs WHERE cs.class_id = c.id) as students_count",
+}
+LIST_DEFAULT_LIMIT = 100
+LIST_MAX_LIMIT = 1000
 
-def get_password_hash(password: str) -> str:
-    """Hash password using scrypt - compatible with FastAPI user_service"""
-    salt = secrets.token_bytes(SALT_SIZE)
-    derived = hashlib.scrypt(
-        password.encode(),
-        salt=salt,
-        n=SCRYPT_N,
-        r=SCRYPT_R,
-        p=SCRYPT_P,
-        dklen=SCRYPT_DKLEN
-    )
-    return salt.hex() + '$' + derived.hex()
+class ListError(ValueError):
+    pass
+
+def _fields(allowed):
+    requested = request.args.get("fields")
+    if not requested:
+        return list(allowed)
+    fields = [f.strip() for f in requested.split(",") if f.strip()]
+    invalid = [f for f in fields if f not in allowed]
+    if invalid:
+        raise ListError(f"fields inválidos: {', '.join(invalid)}; permitidos: {', '.join(allowed)}")
+    # El id siempre va, es la clave de paginación
+    return fields if "id" in fields else ["id"] + fields
+
+def _flag(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    if value not in ("0", "1"):
+        raise ListError(f"{name} debe ser 0 o 1")
+    return int(value)
+
+def _int_arg(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ListError(f"{name} debe ser un número")
+
+def _list_page(table, alias, columns, where, params, after_type=int):
+    """Página por clave (id) de un listado: ?after=<id>&limit=N&order=asc|desc.
+
+    Devuelve {"items", "next_after", "limit"}; next_after es None en la última página.
+    """
+    limit = _int_arg("limit") or LIST_DEFAULT_LIMIT
+    limit = min(max(limit, 1), LIST_MAX_LIMIT)
+    descending = request.args.get("order", "asc").lower() == "desc"
+    after = request.args.get("after")
+    where = list(where)
+    params = list(params)
+    if after not in (None, ""):
+        try:
+            after = after_type(after)
+        except ValueError:
+            raise ListError("after inválido")
+        where.append(f"{alias}.id {'<' if descending else '>'} %s")
+        params.append(after)
+
+    sql = f"SELECT {', '.join(columns)} FROM {table} {alias}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {alias}.id {'DESC' if descending else 'ASC'} LIMIT %s"
+    params.append(limit + 1)
+
+    rows = get_db().execute(sql, tuple(params)).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": rows,
+        "next_after": rows[-1]["id"] if more else None,
+        "limit": limit
+    }
+
+@admin_bp.errorhandler(ListError)
+def list_error(e):
+    return jsonify({"error": str(e)}), 400
 
 @admin_bp.route("/admin", methods=["GET"])
 def admin_index():
+    """Listado completo (compatibilidad). Para tablas grandes usar /admin/users,
+    /admin/devices, /admin/classes y /admin/summary."""
     db = get_db()
-    users = db.execute("SELECT * FROM users ORDER BY id DESC").fetchall()
-    students = db.execute("SELECT * FROM users WHERE role='student' ORDER BY full_name").fetchall()
-    teachers = db.execute("SELECT * FROM users WHERE role='teacher' ORDER BY full_name").fetchall()
-    devices = db.execute("SELECT * FROM devices ORDER BY id").fetchall()
+    user_columns = ", ".join(USER_FIELDS)
+    users = db.execute(f"SELECT {user_columns} FROM users ORDER BY id DESC").fetchall()
+    students = db.execute(f"SELECT {user_columns} FROM users WHERE role='student' ORDER BY full_name").fetchall()
+    teachers = db.execute(f"SELECT {user_columns} FROM users WHERE role='teacher' ORDER BY full_name").fetchall()
+    devices = db.execute(f"SELECT {', '.join(DEVICE_FIELDS)} FROM devices ORDER BY id").fetchall()
     classes = db.execute("""
         SELECT c.id, c.name, c.teacher_id, u.full_name as teacher_name, COUNT(cs.student_id) as students_count
         FROM classes c
@@ -50,35 +115,115 @@ def admin_index():
         "classes": classes
     }), 200
 
+@admin_bp.route("/admin/users", methods=["GET"])
+def list_users():
+    """Usuarios paginados por id. Filtros: ?role=, ?active=0|1, ?class_id= (estudiantes de la clase)"""
+    columns = [f"u.{f}" for f in _fields(USER_FIELDS)]
+    where, params = [], []
+    role = request.args.get("role")
+    if role:
+        if role not in ("admin", "teacher", "student"):
+            raise ListError("role debe ser admin, teacher o student")
+        where.append("u.role = %s")
+        params.append(role)
+    active = _flag("active")
+    if active is not None:
+        where.append("u.active = %s")
+        params.append(active)
+    class_id = _int_arg("class_id")
+    if class_id is not None:
+        where.append("EXISTS (SELECT 1 FROM class_students cs WHERE cs.student_id = u.id AND cs.class_id = %s)")
+        params.append(class_id)
+    return jsonify(_list_page("users", "u", columns, where, params)), 200
+
+@admin_bp.route("/admin/devices", methods=["GET"])
+def list_devices():
+    """Dispositivos paginados por id. Filtros: ?active=0|1, ?assigned_user_id=, ?assigned=0|1"""
+    columns = [f"d.{f}" for f in _fields(DEVICE_FIELDS)]
+    where, params = [], []
+    active = _flag("active")
+    if active is not None:
+        where.append("d.active = %s")
+        params.append(active)
+    assigned_user_id = _int_arg("assigned_user_id")
+    if assigned_user_id is not None:
+        where.append("d.assigned_user_id = %s")
+        params.append(assigned_user_id)
+    assigned = _flag("assigned")
+    if assigned is not None:
+        where.append("d.assigned_user_id IS NOT NULL" if assigned else "d.assigned_user_id IS NULL")
+    return jsonify(_list_page("devices", "d", columns, where, params, after_type=str)), 200
+
+@admin_bp.route("/admin/classes", methods=["GET"])
+def list_classes():
+    """Clases paginadas por id. Filtros: ?teacher_id=, ?active=0|1, ?student_id="""
+    columns = [CLASS_FIELD_SQL.get(f, f"c.{f}") for f in _fields(CLASS_FIELDS)]
+    where, params = [], []
+    teacher_id = _int_arg("teacher_id")
+    if teacher_id is not None:
+        where.append("c.teacher_id = %s")
+        params.append(teacher_id)
+    active = _flag("active")
+    if active is not None:
+        where.append("c.active = %s")
+        params.append(active)
+    student_id = _int_arg("student_id")
+    if student_id is not None:
+        where.append("EXISTS (SELECT 1 FROM class_students cs WHERE cs.class_id = c.id AND cs.student_id = %s)")
+        params.append(student_id)
+    return jsonify(_list_page("classes", "c", columns, where, params)), 200
+
+@admin_bp.route("/admin/summary", methods=["GET"])
+def admin_summary():
+    """Conteos para las tarjetas del panel, sin traer filas"""
+    db = get_db()
+    users = db.execute("""
+        SELECT role, COUNT(*) as total, IFNULL(SUM(active), 0) as active
+        FROM users GROUP BY role
+    """).fetchall()
+    devices = db.execute("""
+        SELECT COUNT(*) as total, IFNULL(SUM(active), 0) as active,
+               COUNT(assigned_user_id) as assigned
+        FROM devices
+    """).fetchone()
+    classes = db.execute("""
+        SELECT COUNT(*) as total, IFNULL(SUM(active), 0) as active FROM classes
+    """).fetchone()
+    by_role = {role: {"total": 0, "active": 0} for role in ("admin", "teacher", "student")}
+    for row in users:
+        by_role[row["role"]] = {"total": int(row["total"]), "active": int(row["active"])}
+    return jsonify({
+        "users": {
+            "total": sum(r["total"] for r in by_role.values()),
+            "by_role": by_role
+        },
+        "devices": {k: int(v) for k, v in devices.items()},
+        "classes": {k: int(v) for k, v in classes.items()}
+    }), 200
+
 @admin_bp.route("/admin/import_students", methods=["POST"])
 def import_students():
+    """Iniciar la importación de estudiantes desde CSV; el avance se consulta con el job_id"""
     file = request.files.get("csv_file")
     if not file:
         return jsonify({"error": "No file provided"}), 400
     try:
-        stream = io.TextIOWrapper(file.stream, encoding='utf-8')
-        reader = csv.DictReader(stream)
-        db = get_db()
-        imported = 0
-        for row in reader:
-            username = (row.get('username') or "").strip()
-            full_name = (row.get('full_name') or "").strip()
-            ci = row.get('ci') or None
-            password = row.get('password') or "password"
-            if not username:
-                continue
-            exists = db.execute("SELECT id FROM users WHERE username=%s", (username,)).fetchone()
-            if exists:
-                continue
-            pwd = get_password_hash(password)
-            db.execute("INSERT INTO users (username, full_name, role, password, created_at, active, CI) VALUES (%s,%s,%s,%s,CURRENT_TIMESTAMP,%s,%s)",
-                       (username, full_name, 'student', pwd, 1, ci))
-            imported += 1
-        db.commit()
-        return jsonify({"message": f"Imported {imported} students"}), 200
+        job = import_jobs.start(file.stream)
+        return jsonify({
+            "message": "Import started",
+            "job_id": job["id"],
+            "status_url": f"/admin/import_jobs/{job['id']}"
+        }), 202
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@admin_bp.route("/admin/import_jobs/<job_id>", methods=["GET"])
+def import_job_status(job_id):
+    job = import_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Import job not found"}), 404
+    return jsonify(job), 200
+
 @admin_bp.route("/admin/create_user", methods=["POST"])
 def create_user():
     if request.is_json:
@@ -153,6 +298,7 @@ def create_class():
     db = get_db()
     db.execute("INSERT INTO classes (name, teacher_id, created_at) VALUES (%s,%s,CURRENT_TIMESTAMP)",
                (name, teacher_id))
+    bump_version(db, "classes")
     db.commit()
     
     return jsonify({"message": "Class created successfully", "name": name}), 201
@@ -175,6 +321,7 @@ def assign_teacher():
     
     db = get_db()
     db.execute("UPDATE classes SET teacher_id=%s WHERE id=%s", (teacher_id, class_id))
+    bump_version(db, "classes")
     db.commit()
     
     return jsonify({"message": "Teacher assigned successfully"}), 200
@@ -204,6 +351,8 @@ def add_students_to_class():
         if not exists:
             db.execute("INSERT INTO class_students (class_id, student_id, created_at) VALUES (%s,%s,CURRENT_TIMESTAMP)", (class_id, sid))
             added += 1
+    assignments.add_students_to_class(db, class_id, student_ids)
+    bump_version(db, "classes")
     db.commit()
     
     return jsonify({"message": f"Added {added} students to class"}), 200
@@ -222,11 +371,17 @@ def delete_class():
     
     db = get_db()
     
+    # Los estudiantes de la clase pierden sus lecciones: recalcular su índice al final
+    students = [row["student_id"] for row in
+                db.execute("SELECT student_id FROM class_students WHERE class_id=%s", (class_id,)).fetchall()]
+    
     # Primero eliminar estudiantes asociados
     db.execute("DELETE FROM class_students WHERE class_id=%s", (class_id,))
     
     # Luego eliminar la clase
     db.execute("DELETE FROM classes WHERE id=%s", (class_id,))
+    assignments.refresh_students(db, students)
+    bump_version(db, "classes")
     db.commit()
     
     return jsonify({"message": "Class deleted successfully"}), 200
@@ -268,20 +423,30 @@ def update_user():
     if existing:
         return jsonify({"error": "Username already exists"}), 400
     
-    # Actualizar datos básicos
+    # Actualizar datos básicos. Cambiar la contraseña, el username o desactivar
+    # al usuario incrementa token_version, lo que invalida sus tokens emitidos
+    # (se evalúa antes de las demás asignaciones, con los valores anteriores)
+    token_bump = ""
+    token_params = ()
+    if has_column("users", "token_version"):
+        token_bump = "token_version = token_version + IF(%s OR username <> %s OR active <> %s, 1, 0), "
+        token_params = (1 if password else 0, username, active)
+
     if password:
         pwd = get_password_hash(password)
         db.execute(
-            "UPDATE users SET username=%s, full_name=%s, password=%s, active=%s WHERE id=%s",
-            (username, full_name, pwd, active, user_id)
+            f"UPDATE users SET {token_bump}username=%s, full_name=%s, password=%s, active=%s WHERE id=%s",
+            token_params + (username, full_name, pwd, active, user_id)
         )
     else:
         db.execute(
-            "UPDATE users SET username=%s, full_name=%s, active=%s WHERE id=%s",
-            (username, full_name, active, user_id)
+            f"UPDATE users SET {token_bump}username=%s, full_name=%s, active=%s WHERE id=%s",
+            token_params + (username, full_name, active, user_id)
         )
+    bump_version(db, "users")
     
     db.commit()
+    user_events.user_changed(user_id)
     
     return jsonify({"message": "User updated successfully"}), 200
 
@@ -314,7 +479,10 @@ def delete_user():
     
     # Eliminar el usuario
     db.execute("DELETE FROM users WHERE id=%s", (user_id,))
+    bump_version(db, "users")
+    bump_version(db, "classes")
     db.commit()
+    user_events.user_changed(user_id)
     
     return jsonify({"message": "User deleted successfully"}), 200
 
@@ -323,6 +491,15 @@ def get_class_details(class_id):
     """Obtener detalles de una clase específica con sus estudiantes"""
     db = get_db()
     
+    # Clases, inscripciones y nombres cambian solo junto con estos contadores
+    cursor = db.conn.cursor(dictionary=True)
+    versions = read_versions(cursor, ["classes", "users"])
+    cursor.close()
+    etag = make_etag("class_details", class_id, versions["classes"], versions["users"])
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
     # Obtener información de la clase
     cls = db.execute("""
         SELECT c.id, c.name, c.teacher_id, u.full_name as teacher_name, c.created_at
@@ -343,7 +520,7 @@ def get_class_details(class_id):
         ORDER BY u.full_name
     """, (class_id,)).fetchall()
     
-    return jsonify({
+    return tagged((jsonify({
         "class": cls,
         "students": students
-    }), 200
+    }), 200), etag)
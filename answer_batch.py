@@ -0,0 +1,166 @@
+"""Subida en lote de respuestas de dispositivos sin conexión.
+
+Un dispositivo que perdió la conexión guarda sus respuestas y al reconectarse
+las manda todas juntas, en orden, a POST /api/session/<id>/answers:
+
+    {"answers": [{"key": "tablet7-000123", "answer": "A", "ts": 1760790000000},
+                 {"key": "tablet7-000124", "skip": true}]}
+
+key es la clave de idempotencia de cada respuesta (única dentro de la sesión,
+hasta 64 caracteres) y ts el momento en que se respondió, en milisegundos desde
+epoch según el reloj del dispositivo (sin ts se usa la hora de llegada).
+
+apply() bloquea la sesión, descarta las claves que ya se registraron (en un lote
+anterior o repetidas en el mismo), evalúa el resto con las mismas reglas que
+api_submit/api_skip y escribe todo en una transacción: un INSERT multi-fila de
+intentos (activity.record_attempts) y un UPDATE de la sesión con su estado
+final. Reenviar el mismo lote después de un timeout no vuelve a contar nada.
+"""
+import os
+from datetime import datetime
+
+import activity
+import lesson_cache
+import progress
+
+ANSWER_BATCH_MAX = int(os.getenv("ANSWER_BATCH_MAX", 500))
+CLIENT_KEY_MAX = 64
+SKIP = "__SKIP__"
+
+def _client_ts(value, now):
+    """ts del dispositivo (ms desde epoch) en el formato YYYYMMDDhhmmss de attempts.ts"""
+    if value is None:
+        return now
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("ts tiene que ser un número (milisegundos desde epoch)")
+    try:
+        ts = int(datetime.fromtimestamp(value / 1000).strftime("%Y%m%d%H%M%S"))
+    except (OverflowError, OSError, ValueError):
+        raise ValueError(f"ts fuera de rango: {value}")
+    # Un reloj adelantado no puede dejar intentos en el futuro
+    return min(ts, now)
+
+def parse(data):
+    """Validar el cuerpo del request. Devuelve [{key, answer, ts}] o lanza ValueError."""
+    answers = (data or {}).get("answers")
+    if not isinstance(answers, list) or not answers:
+        raise ValueError("answers tiene que ser una lista no vacía")
+    if len(answers) > ANSWER_BATCH_MAX:
+        raise ValueError(f"Como máximo {ANSWER_BATCH_MAX} respuestas por lote")
+    now = activity.now_ts()
+    parsed = []
+    for index, item in enumerate(answers):
+        if not isinstance(item, dict):
+            raise ValueError(f"Respuesta {index}: tiene que ser un objeto")
+        key = item.get("key")
+        if not isinstance(key, str) or not key.strip() or len(key.strip()) > CLIENT_KEY_MAX:
+            raise ValueError(f"Respuesta {index}: key requerida (hasta {CLIENT_KEY_MAX} caracteres)")
+        if item.get("skip"):
+            answer = SKIP
+        else:
+            answer = str(item.get("answer") or "").strip().upper()
+            if not answer:
+                raise ValueError(f"Respuesta {index}: answer requerida")
+        try:
+            ts = _client_ts(item.get("ts"), now)
+        except ValueError as e:
+            raise ValueError(f"Respuesta {index}: {e}")
+        parsed.append({"key": key.strip(), "answer": answer, "ts": ts})
+    return parsed
+
+def _session_state(session, lesson):
+    state = {
+        "session_id": session["id"],
+        "lesson_id": session["lesson_id"],
+        "user_id": session["user_id"],
+        "finished": session["finished"],
+        "score": session["score"],
+        "current_step": session["current_step"],
+        "step_attempts": session["step_attempts"],
+        "attempt_count": session["attempt_count"],
+        "total_steps": len(lesson.steps) if lesson else 0,
+    }
+    step = lesson_cache.step_at(lesson, session["current_step"]) if lesson and not session["finished"] else None
+    if step:
+        state.update(prompt=step.prompt, target=step.target, hint=step.hint, max_attempts=step.max_attempts)
+    return state
+
+def apply(cursor, session_id, answers):
+    """Aplicar las respuestas en la transacción del cursor (el commit lo hace quien llama).
+
+    Devuelve {"session": estado final, "results": [...], "applied": n, "corrects": n,
+    "duplicates": n}, o None si la sesión no existe. Si se aplicó alguna respuesta y
+    la sesión quedó terminada, la terminó este lote.
+    """
+    # Bloquear la sesión: dos reintentos simultáneos del mismo lote se aplican de a uno
+    cursor.execute("""
+        SELECT id, lesson_id, user_id, class_id, score, current_step, step_attempts, attempt_count, finished_at
+        FROM sessions WHERE id = %s FOR UPDATE
+    """, (session_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    session = dict(row, finished=row["finished_at"] is not None)
+    lesson = lesson_cache.get(cursor, session["lesson_id"])
+
+    keys = list(dict.fromkeys(a["key"] for a in answers))
+    cursor.execute(f"""
+        SELECT client_key, step_index, correct, attempts FROM attempts
+        WHERE session_id = %s AND client_key IN ({", ".join(["%s"] * len(keys))})
+    """, (session_id, *keys))
+    seen = {r["client_key"]: {"step_index": r["step_index"], "correct": bool(r["correct"]), "attempts": r["attempts"]}
+            for r in cursor.fetchall()}
+
+    rows, results = [], []
+    finishing = False
+    for a in answers:
+        if a["key"] in seen:
+            results.append(dict(seen[a["key"]], key=a["key"], status="duplicate"))
+            continue
+        step = lesson_cache.step_at(lesson, session["current_step"]) if lesson and not session["finished"] else None
+        if not step:
+            # La clave no se registra: si el lote se reenvía, vuelve a informarse igual
+            results.append({"key": a["key"], "status": "finished"})
+            continue
+
+        if a["answer"] == SKIP:
+            correct, attempts_now = False, 1
+            session["step_attempts"] += 1
+        else:
+            correct = a["answer"] == (step.target or "").upper()
+            attempts_now = session["step_attempts"] + 1
+            if correct:
+                session["score"] += 1
+                session["current_step"] += 1
+                session["step_attempts"] = 0
+                if lesson_cache.step_at(lesson, session["current_step"]) is None:
+                    session["finished"] = finishing = True
+            else:
+                session["step_attempts"] = attempts_now
+        session["attempt_count"] += 1
+
+        rows.append((session_id, session["lesson_id"], session["user_id"], step.step_index, a["answer"],
+                     1 if correct else 0, attempts_now, a["ts"], a["key"]))
+        seen[a["key"]] = {"step_index": step.step_index, "correct": correct, "attempts": attempts_now}
+        results.append(dict(seen[a["key"]], key=a["key"], status="applied"))
+
+    if rows:
+        # Mismo orden de bloqueo que api_submit: sesión, contadores, intentos, progreso
+        cursor.execute(f"""
+            UPDATE sessions
+            SET score = %s, current_step = %s, step_attempts = %s, attempt_count = %s
+                {", finished_at = NOW()" if finishing else ""}
+            WHERE id = %s
+        """, (session["score"], session["current_step"], session["step_attempts"],
+              session["attempt_count"], session_id))
+        activity.record_attempts(cursor, rows, keyed=True)
+        if finishing:
+            progress.record_session_finished(cursor, session)
+
+    return {
+        "session": _session_state(session, lesson),
+        "results": results,
+        "applied": len(rows),
+        "corrects": sum(1 for row in rows if row[5]),
+        "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+    }
@@ -0,0 +1,167 @@
+"""Archivo de intentos viejos y limpieza de sesiones abandonadas.
+
+attempts crece con cada respuesta. Para las sesiones terminadas hace más de
+ARCHIVE_AFTER_DAYS días, archive():
+
+1. resume sus intentos por sesión y paso en attempt_step_summary (intentos,
+   aciertos, saltos, primer y último ts), que es lo que siguen leyendo el detalle
+   de lección del docente y activity.reconcile();
+2. mueve las filas originales a attempts_archive (o, con --file, a un archivo
+   .jsonl.gz) y las borra de attempts;
+3. marca la sesión con archived_at.
+
+Las sesiones sin terminar que empezaron hace más de ARCHIVE_ABANDONED_DAYS días
+y no tienen intentos en ese período se tratan igual y después se borran.
+
+Cada bloque de ARCHIVE_CHUNK sesiones es una transacción corta, con una pausa de
+ARCHIVE_PAUSE_MS entre bloques para no competir con el tráfico de los estudiantes.
+
+    python archive.py [--days 90] [--abandoned-days 14] [--chunk 200] [--file DIR] [--dry-run]
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from db import get_db_connection
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 90))
+ARCHIVE_ABANDONED_DAYS = int(os.getenv("ARCHIVE_ABANDONED_DAYS", 14))
+ARCHIVE_CHUNK = int(os.getenv("ARCHIVE_CHUNK", 200))
+ARCHIVE_PAUSE_MS = float(os.getenv("ARCHIVE_PAUSE_MS", 50))
+
+ATTEMPT_COLUMNS = ("id", "session_id", "lesson_id", "user_id", "step_index", "answer", "correct", "attempts", "ts")
+
+FINISHED_SQL = """
+    SELECT id FROM sessions
+    WHERE archived_at IS NULL AND finished_at < %s
+    LIMIT %s
+"""
+
+ABANDONED_SQL = """
+    SELECT s.id FROM sessions s
+    WHERE s.archived_at IS NULL AND s.finished_at IS NULL AND s.started_at < %s
+      AND NOT EXISTS (SELECT 1 FROM attempts a WHERE a.session_id = s.id AND a.ts >= %s)
+    LIMIT %s
+"""
+
+# Una sesión se archiva una sola vez (después queda marcada o borrada y no recibe
+# más intentos), así que el resumen no necesita ON DUPLICATE KEY
+SUMMARY_INSERT = """
+    INSERT INTO attempt_step_summary
+        (session_id, step_index, lesson_id, user_id, attempts, corrects, skips, first_ts, last_ts)
+    SELECT session_id, COALESCE(step_index, -1), MAX(lesson_id), MAX(user_id), COUNT(*),
+           COALESCE(SUM(correct), 0), COALESCE(SUM(answer = '__SKIP__'), 0), MIN(ts), MAX(ts)
+    FROM attempts
+    WHERE session_id IN ({marks})
+    GROUP BY session_id, COALESCE(step_index, -1)
+"""
+
+def cutoff_ts(days):
+    # Mismo formato que NOW() en las columnas bigint: YYYYMMDDhhmmss
+    return int((datetime.now() - timedelta(days=days)).strftime("%Y%m%d%H%M%S"))
+
+class ArchiveFile:
+    """Intentos en JSON por línea; cada bloque se agrega como un miembro gzip más"""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"attempts_{datetime.now().strftime('%Y%m%d%H%M%S')}.jsonl.gz")
+
+    def write(self, rows):
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+def _archive_attempts(cursor, session_ids, archive_file):
+    """Resumir, copiar y borrar los intentos de las sesiones. Devuelve la cantidad de intentos."""
+    marks = ", ".join(["%s"] * len(session_ids))
+    cursor.execute(SUMMARY_INSERT.format(marks=marks), session_ids)
+    columns = ", ".join(ATTEMPT_COLUMNS)
+    if archive_file:
+        cursor.execute(f"SELECT {columns} FROM attempts WHERE session_id IN ({marks}) ORDER BY id", session_ids)
+        # El archivo se escribe antes del DELETE: si el commit falla, el bloque se repite
+        # y puede quedar duplicado en el archivo, pero nunca perdido
+        archive_file.write(cursor.fetchall())
+    else:
+        cursor.execute(f"""
+            INSERT IGNORE INTO attempts_archive ({columns})
+            SELECT {columns} FROM attempts WHERE session_id IN ({marks})
+        """, session_ids)
+    cursor.execute(f"DELETE FROM attempts WHERE session_id IN ({marks})", session_ids)
+    return cursor.rowcount
+
+def _run(conn, select, params, finish, chunk_size, archive_file, pause_ms, dry_run, log, label):
+    cursor = conn.cursor(dictionary=True)
+    sessions = attempts = 0
+    # Sin modificar nada la consulta devolvería siempre el mismo bloque: en dry_run se cuenta todo de una vez
+    limit = 2 ** 31 - 1 if dry_run else chunk_size
+    try:
+        while True:
+            cursor.execute(select, (*params, limit))
+            session_ids = [row["id"] for row in cursor.fetchall()]
+            if dry_run:
+                log(f"{label}: {len(session_ids)} sesiones para archivar")
+                return len(session_ids), 0
+            if not session_ids:
+                break
+            attempts += _archive_attempts(cursor, session_ids, archive_file)
+            finish(cursor, session_ids)
+            conn.commit()
+            sessions += len(session_ids)
+            log(f"{label}: {sessions} sesiones, {attempts} intentos archivados")
+            if pause_ms:
+                time.sleep(pause_ms / 1000)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return sessions, attempts
+
+def _mark_archived(cursor, session_ids):
+    marks = ", ".join(["%s"] * len(session_ids))
+    cursor.execute(f"UPDATE sessions SET archived_at = NOW() WHERE id IN ({marks})", session_ids)
+
+def _delete_sessions(cursor, session_ids):
+    marks = ", ".join(["%s"] * len(session_ids))
+    cursor.execute(f"DELETE FROM sessions WHERE id IN ({marks})", session_ids)
+
+def archive(conn, days=ARCHIVE_AFTER_DAYS, abandoned_days=ARCHIVE_ABANDONED_DAYS, chunk_size=ARCHIVE_CHUNK,
+            directory=None, pause_ms=ARCHIVE_PAUSE_MS, dry_run=False, log=print):
+    """Archivar sesiones terminadas y abandonadas. Devuelve un resumen con las cantidades."""
+    archive_file = ArchiveFile(directory) if directory and not dry_run else None
+    finished = _run(conn, FINISHED_SQL, (cutoff_ts(days),), _mark_archived,
+                    chunk_size, archive_file, pause_ms, dry_run, log, "terminadas")
+    abandoned_cutoff = cutoff_ts(abandoned_days)
+    abandoned = _run(conn, ABANDONED_SQL, (abandoned_cutoff, abandoned_cutoff), _delete_sessions,
+                     chunk_size, archive_file, pause_ms, dry_run, log, "abandonadas")
+    return {
+        "finished_sessions": finished[0],
+        "finished_attempts": finished[1],
+        "abandoned_sessions": abandoned[0],
+        "abandoned_attempts": abandoned[1],
+        "file": archive_file.path if archive_file else None,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archivar intentos de sesiones viejas")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="sesiones terminadas hace más de N días")
+    parser.add_argument("--abandoned-days", type=int, default=ARCHIVE_ABANDONED_DAYS,
+                        help="sesiones sin terminar y sin actividad hace más de N días")
+    parser.add_argument("--chunk", type=int, default=ARCHIVE_CHUNK, help="sesiones por transacción")
+    parser.add_argument("--pause-ms", type=float, default=ARCHIVE_PAUSE_MS, help="pausa entre bloques")
+    parser.add_argument("--file", metavar="DIR", help="guardar los intentos en DIR/*.jsonl.gz en lugar de attempts_archive")
+    parser.add_argument("--dry-run", action="store_true", help="solo informar qué se archivaría")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit("Database connection failed")
+    try:
+        result = archive(conn, args.days, args.abandoned_days, args.chunk, args.file, args.pause_ms, args.dry_run)
+        print(json.dumps(result))
+    finally:
+        conn.close()
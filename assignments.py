@@ -0,0 +1,119 @@
+"""Índice de lecciones asignadas por estudiante (tabla student_lessons).
+
+Una fila (student_id, lesson_id) por cada lección activa asignada a alguna clase
+del estudiante. Es una proyección de class_students x class_lessons x lessons
+que se mantiene en la misma transacción que la escritura que la cambia, así la
+pantalla de inicio del estudiante lee sus lecciones con un rango de la clave
+primaria en lugar de unir las tablas en cada request:
+
+- al asignar una lección a una clase: add_lesson_to_class
+- al agregar estudiantes a una clase: add_students_to_class
+- al quitar estudiantes o borrar una clase: refresh_students
+- al activar o desactivar lecciones: refresh_lessons
+
+Las funciones solo usan cursor.execute, así que sirven tanto con un cursor como
+con el DB de admin. Para reconstruir todo (por ejemplo después de cambios hechos
+a mano en la base):
+
+    python assignments.py --rebuild
+"""
+import argparse
+
+from db import get_db_connection
+
+ASSIGNMENT_SELECT = """
+    SELECT DISTINCT cs.student_id, cl.lesson_id
+    FROM class_students cs
+    JOIN class_lessons cl ON cl.class_id = cs.class_id
+    JOIN lessons l ON l.id = cl.lesson_id AND l.active = 1
+"""
+
+def _marks(values):
+    return ", ".join(["%s"] * len(values))
+
+def add_lesson_to_class(cursor, class_id, lesson_id):
+    """La lección pasa a estar asignada a todos los estudiantes de la clase"""
+    cursor.execute("""
+        INSERT IGNORE INTO student_lessons (student_id, lesson_id)
+        SELECT cs.student_id, l.id
+        FROM class_students cs
+        JOIN lessons l ON l.id = %s AND l.active = 1
+        WHERE cs.class_id = %s
+    """, (lesson_id, class_id))
+
+def add_students_to_class(cursor, class_id, student_ids):
+    """Los estudiantes reciben las lecciones activas de la clase"""
+    if not student_ids:
+        return
+    cursor.execute(f"""
+        INSERT IGNORE INTO student_lessons (student_id, lesson_id)
+        SELECT cs.student_id, cl.lesson_id
+        FROM class_students cs
+        JOIN class_lessons cl ON cl.class_id = cs.class_id
+        JOIN lessons l ON l.id = cl.lesson_id AND l.active = 1
+        WHERE cs.class_id = %s AND cs.student_id IN ({_marks(student_ids)})
+    """, (class_id, *student_ids))
+
+def refresh_students(cursor, student_ids):
+    """Recalcular las asignaciones de los estudiantes (después de quitarlos de una clase)"""
+    if not student_ids:
+        return
+    marks = _marks(student_ids)
+    cursor.execute(f"DELETE FROM student_lessons WHERE student_id IN ({marks})", tuple(student_ids))
+    cursor.execute(f"""
+        INSERT IGNORE INTO student_lessons (student_id, lesson_id)
+        {ASSIGNMENT_SELECT}
+        WHERE cs.student_id IN ({marks})
+    """, tuple(student_ids))
+
+def refresh_lessons(cursor, lesson_ids):
+    """Recalcular quiénes tienen asignadas las lecciones (después de activarlas o desactivarlas)"""
+    if not lesson_ids:
+        return
+    marks = _marks(lesson_ids)
+    cursor.execute(f"DELETE FROM student_lessons WHERE lesson_id IN ({marks})", tuple(lesson_ids))
+    cursor.execute(f"""
+        INSERT IGNORE INTO student_lessons (student_id, lesson_id)
+        {ASSIGNMENT_SELECT}
+        WHERE cl.lesson_id IN ({marks})
+    """, tuple(lesson_ids))
+
+def rebuild(conn, chunk_size=500, log=print):
+    """Reconstruir el índice completo, de a chunk_size estudiantes por transacción"""
+    cursor = conn.cursor(dictionary=True)
+    last_id = 0
+    students = 0
+    try:
+        while True:
+            cursor.execute("SELECT id FROM users WHERE role = 'student' AND id > %s ORDER BY id LIMIT %s",
+                           (last_id, chunk_size))
+            ids = [row["id"] for row in cursor.fetchall()]
+            if not ids:
+                break
+            refresh_students(cursor, ids)
+            conn.commit()
+            last_id = ids[-1]
+            students += len(ids)
+        log(f"Asignaciones recalculadas para {students} estudiantes")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return students
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Índice de lecciones asignadas por estudiante")
+    parser.add_argument("--rebuild", action="store_true", help="recalcular student_lessons completo")
+    parser.add_argument("--chunk", type=int, default=500, help="estudiantes por transacción")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("indicar --rebuild")
+
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit("Database connection failed")
+    try:
+        rebuild(conn, args.chunk)
+    finally:
+        conn.close()
@@ -0,0 +1,429 @@
+"""Escritura diferida (write-behind) de intentos.
+
+Con ATTEMPT_WRITE_BEHIND=1, api_submit y api_skip no escriben en la base: el
+estado de cada sesión (paso, intentos, puntaje) se mantiene en memoria, la
+respuesta se calcula con ese estado y el intento se encola. Un hilo vacía la
+cola cada ATTEMPT_FLUSH_MS milisegundos o al juntar ATTEMPT_FLUSH_ROWS intentos,
+en una sola transacción con INSERT multi-fila (activity.record_attempts) y un
+UPDATE por sesión con sus valores finales.
+
+La cola admite hasta ATTEMPT_QUEUE_MAX intentos; si está llena el request espera
+hasta ATTEMPT_ENQUEUE_TIMEOUT segundos y después se rechaza con QueueFull. Al
+terminar el proceso (atexit / SIGTERM) se vacía lo pendiente.
+
+Si un lote falla ATTEMPT_MAX_RETRIES veces seguidas se escribe registro por
+registro. Los que fallan por un error de datos (clave foránea porque la sesión
+o la lección se borró, duplicado, valor inválido) van como una línea JSON a
+ATTEMPT_DEAD_LETTER_PATH y salen de la cola; ante un error de conexión el resto
+queda en la cola y se vuelve a intentar.
+
+Mientras una sesión tiene intentos sin escribir, el estado en memoria es la
+fuente de verdad: todas las escrituras de una sesión tienen que pasar por el
+mismo proceso.
+"""
+import atexit
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+
+from mysql.connector import DataError, IntegrityError
+import sqlite3
+
+from db import get_db_connection
+import activity
+import lesson_cache
+import progress
+import live_events
+
+ENABLED = os.getenv("ATTEMPT_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+FLUSH_MS = int(os.getenv("ATTEMPT_FLUSH_MS", 50))
+FLUSH_ROWS = int(os.getenv("ATTEMPT_FLUSH_ROWS", 500))
+QUEUE_MAX = int(os.getenv("ATTEMPT_QUEUE_MAX", 10000))
+ENQUEUE_TIMEOUT = float(os.getenv("ATTEMPT_ENQUEUE_TIMEOUT", 2))
+SESSION_STATE_MAX = int(os.getenv("ATTEMPT_SESSION_STATE_MAX", 10000))
+RETRY_DELAY = float(os.getenv("ATTEMPT_RETRY_DELAY", 1))
+SHUTDOWN_TIMEOUT = float(os.getenv("ATTEMPT_SHUTDOWN_TIMEOUT", 30))
+MAX_RETRIES = int(os.getenv("ATTEMPT_MAX_RETRIES", 3))
+DEAD_LETTER_PATH = os.getenv("ATTEMPT_DEAD_LETTER_PATH", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "attempt_dead_letters.jsonl"))
+
+# Errores que se repiten igual en cada reintento. ProgrammingError no entra: una tabla
+# o columna que todavía no existe (1146, 1054) se resuelve al terminar la migración
+PERMANENT_ERRORS = (IntegrityError, DataError, sqlite3.IntegrityError)
+
+SESSION_COLUMNS = ("id", "lesson_id", "user_id", "class_id", "score",
+                   "current_step", "step_attempts", "attempt_count")
+
+class QueueFull(Exception):
+    pass
+
+_cond = threading.Condition()
+_queue = deque()          # [(intento o None, snapshot de la sesión)]
+_sessions = OrderedDict() # session_id -> estado en memoria (LRU)
+_thread = None
+_stopping = False
+_stats = {"enqueued": 0, "flushed": 0, "batches": 0, "rejected": 0, "failures": 0,
+          "dead_letters": 0, "last_flush_ms": 0.0}
+
+def start():
+    """Arrancar el hilo de escritura. Desde el hilo principal también instala el SIGTERM."""
+    global _thread, _stopping
+    with _cond:
+        if _thread is not None and _thread.is_alive():
+            return
+        _stopping = False
+        _thread = threading.Thread(target=_run, name="attempt-writer", daemon=True)
+        _thread.start()
+    atexit.register(stop)
+    if threading.current_thread() is threading.main_thread() \
+            and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+def stop(timeout=SHUTDOWN_TIMEOUT):
+    """Vaciar la cola y detener el hilo. Devuelve la cantidad de registros que quedaron sin escribir."""
+    global _stopping
+    with _cond:
+        _stopping = True
+        _cond.notify_all()
+        thread = _thread
+    if thread is not None:
+        thread.join(timeout)
+    with _cond:
+        lost = len(_queue)
+    if lost:
+        print(f"attempt_writer: {lost} registros sin escribir al detenerse")
+    return lost
+
+def _state(cursor, session_id):
+    # Estado en memoria de la sesión; si no está, se lee de la base
+    with _cond:
+        state = _sessions.get(session_id)
+        if state is not None:
+            _sessions.move_to_end(session_id)
+            return state
+    cursor.execute(f"""
+        SELECT {", ".join(SESSION_COLUMNS)}, finished_at
+        FROM sessions WHERE id = %s
+    """, (session_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    state = {c: row[c] for c in SESSION_COLUMNS}
+    state["finished"] = row["finished_at"] is not None
+    state["pending"] = 0
+    with _cond:
+        state = _sessions.setdefault(session_id, state)
+        _evict()
+        return state
+
+def _evict():
+    # Solo se descartan sesiones sin intentos pendientes, empezando por las menos usadas
+    if len(_sessions) <= SESSION_STATE_MAX:
+        return
+    for session_id in list(_sessions):
+        if len(_sessions) <= SESSION_STATE_MAX:
+            break
+        if not _sessions[session_id]["pending"]:
+            del _sessions[session_id]
+
+def _reserve(session_id, state):
+    """Con el lock tomado: esperar lugar en la cola (backpressure) o lanzar QueueFull.
+
+    Se llama antes de tocar el estado, así el lock no se suelta entre el cálculo y
+    el encolado. Devuelve el estado vigente de la sesión (pudo salir de la LRU y
+    volver a cargarse mientras tanto).
+    """
+    if _thread is None or not _thread.is_alive():
+        # _cond usa un RLock, start() puede tomarlo de nuevo
+        start()
+    deadline = time.monotonic() + ENQUEUE_TIMEOUT
+    while len(_queue) >= QUEUE_MAX:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            _stats["rejected"] += 1
+            raise QueueFull("Attempt queue is full")
+        _cond.wait(remaining)
+    state = _sessions.setdefault(session_id, state)
+    _sessions.move_to_end(session_id)
+    return state
+
+def _enqueue(state, attempt, finishing=False):
+    # Con el lock tomado y después de _reserve()
+    state["pending"] += 1
+    snapshot = {c: state[c] for c in SESSION_COLUMNS}
+    snapshot["finished"] = state["finished"]
+    snapshot["finishing"] = finishing
+    snapshot["ts"] = activity.now_ts()
+    if attempt is not None:
+        attempt = attempt + (snapshot["ts"],)
+    _queue.append((attempt, snapshot))
+    _stats["enqueued"] += 1
+    # El primer registro despierta al hilo, que junta más durante FLUSH_MS
+    if len(_queue) == 1 or len(_queue) >= FLUSH_ROWS:
+        _cond.notify_all()
+    return snapshot
+
+def session(cursor, session_id):
+    """Copia del estado de la sesión (incluye lo que todavía no se escribió), o None"""
+    state = _state(cursor, session_id)
+    if state is None:
+        return None
+    with _cond:
+        return dict(state)
+
+def is_finished(session_id):
+    with _cond:
+        state = _sessions.get(session_id)
+        return bool(state and state["finished"])
+
+def submit(cursor, session_id, answer):
+    """Evaluar la respuesta con el estado en memoria y encolar el intento.
+
+    Devuelve (resultado, paso) como api_submit, o (None, None) si la sesión no existe.
+    """
+    state = _state(cursor, session_id)
+    if state is None:
+        return None, None
+    lesson = lesson_cache.get(cursor, state["lesson_id"])
+    with _cond:
+        state = _reserve(session_id, state)
+        step = lesson_cache.step_at(lesson, state["current_step"]) if lesson and not state["finished"] else None
+        if not step:
+            return {"finished": True}, None
+
+        target = (step.target or "").upper()
+        attempts_now = state["step_attempts"] + 1
+        is_correct = (answer == target)
+        finished = is_correct and lesson_cache.step_at(lesson, state["current_step"] + 1) is None
+        attempt = (session_id, state["lesson_id"], state["user_id"], state["current_step"],
+                   answer, 1 if is_correct else 0, attempts_now)
+
+        if is_correct:
+            state.update(score=state["score"] + 1, current_step=state["current_step"] + 1,
+                         step_attempts=0, finished=finished)
+        else:
+            state["step_attempts"] = attempts_now
+        state["attempt_count"] += 1
+        snapshot = _enqueue(state, attempt, finishing=finished)
+
+    # El estado en memoria ya es el vigente: los docentes lo ven sin esperar a la escritura
+    live_events.record(snapshot["user_id"], snapshot["lesson_id"], session_id, score=snapshot["score"],
+                       current_step=snapshot["current_step"], attempts=1,
+                       corrects=1 if is_correct else 0, finished=finished)
+    result = {
+        "correct": is_correct,
+        "attempts": attempts_now,
+        "max_attempts": step.max_attempts
+    }
+    if not is_correct and attempts_now >= step.max_attempts:
+        result["hint"] = step.hint or f"La respuesta correcta es: {target}"
+    if finished:
+        result["finished"] = True
+    return result, step
+
+def skip(cursor, session_id):
+    """Encolar un intento saltado. Devuelve False si la sesión no existe."""
+    state = _state(cursor, session_id)
+    if state is None:
+        return False
+    with _cond:
+        state = _reserve(session_id, state)
+        attempt = (session_id, state["lesson_id"], state["user_id"], state["current_step"], '__SKIP__', 0, 1)
+        state["step_attempts"] += 1
+        state["attempt_count"] += 1
+        snapshot = _enqueue(state, attempt)
+    live_events.record(snapshot["user_id"], snapshot["lesson_id"], session_id,
+                       current_step=snapshot["current_step"], attempts=1)
+    return True
+
+def finish(cursor, session_id):
+    """Marcar como terminada una sesión que se quedó sin pasos (sin intento asociado)"""
+    state = _state(cursor, session_id)
+    if state is None:
+        return None
+    with _cond:
+        state = _reserve(session_id, state)
+        finishing = not state["finished"]
+        if finishing:
+            state["finished"] = True
+            _enqueue(state, None, finishing=True)
+        state = dict(state)
+    if finishing:
+        live_events.record(state["user_id"], state["lesson_id"], session_id, score=state["score"],
+                           current_step=state["current_step"], finished=True)
+    return state
+
+def release(session_id, timeout=ENQUEUE_TIMEOUT):
+    """Esperar a que se escriban los intentos pendientes de la sesión y descartar su
+    estado en memoria, antes de una escritura que va directo a la base (answer_batch).
+    Devuelve False si no se vaciaron en timeout segundos."""
+    deadline = time.monotonic() + timeout
+    with _cond:
+        while True:
+            state = _sessions.get(session_id)
+            if state is None or not state["pending"]:
+                _sessions.pop(session_id, None)
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _cond.wait(remaining)
+
+def _run():
+    failures = 0
+    while True:
+        with _cond:
+            while not _queue and not _stopping:
+                _cond.wait()
+            if not _queue:
+                return
+            # Juntar hasta FLUSH_ROWS intentos o esperar como máximo FLUSH_MS
+            deadline = time.monotonic() + FLUSH_MS / 1000
+            while len(_queue) < FLUSH_ROWS and not _stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _cond.wait(remaining)
+            batch = list(islice(_queue, FLUSH_ROWS))
+        if _flush(batch):
+            failures = 0
+            continue
+        failures += 1
+        if failures >= MAX_RETRIES:
+            # Un registro que no se puede escribir no puede frenar la cola para siempre
+            failures = 0
+            if _flush_each(batch):
+                continue
+        # Los registros siguen en la cola; se reintenta el mismo lote
+        time.sleep(RETRY_DELAY)
+
+def _write(cursor, records):
+    # Mismo orden de bloqueo que el camino síncrono: sesiones, contadores, intentos
+    latest = {}
+    for _, snapshot in records:
+        latest[snapshot["id"]] = snapshot
+    for session_id in sorted(latest):
+        s = latest[session_id]
+        cursor.execute(f"""
+            UPDATE sessions
+            SET score = %s, current_step = %s, step_attempts = %s, attempt_count = %s
+                {", finished_at = COALESCE(finished_at, %s)" if s["finished"] else ""}
+            WHERE id = %s
+        """, (s["score"], s["current_step"], s["step_attempts"], s["attempt_count"],
+              *((s["ts"],) if s["finished"] else ()), session_id))
+    activity.record_attempts(cursor, [attempt for attempt, _ in records if attempt is not None])
+    for _, snapshot in records:
+        if snapshot["finishing"]:
+            progress.record_session_finished(cursor, snapshot)
+
+def _flush(batch):
+    start = time.perf_counter()
+    conn = get_db_connection()
+    if not conn:
+        with _cond:
+            _stats["failures"] += 1
+        return False
+    cursor = conn.cursor(dictionary=True)
+    try:
+        _write(cursor, batch)
+        conn.commit()
+    except Exception as e:
+        print(f"attempt_writer: error al escribir {len(batch)} registros: {e}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        with _cond:
+            _stats["failures"] += 1
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+    _done(batch)
+    with _cond:
+        _stats["batches"] += 1
+        _stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return True
+
+def _flush_each(batch):
+    """Escribir el lote registro por registro, mandando a dead letter los que no se pueden
+    escribir. Devuelve False si se cortó por un error que no es de datos."""
+    conn = get_db_connection()
+    if not conn:
+        with _cond:
+            _stats["failures"] += 1
+        return False
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for record in batch:
+            try:
+                _write(cursor, [record])
+                conn.commit()
+            except Exception as e:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                if not isinstance(e, PERMANENT_ERRORS):
+                    print(f"attempt_writer: error al escribir un registro: {e}")
+                    with _cond:
+                        _stats["failures"] += 1
+                    return False
+                _dead_letter(record, e)
+                _done([record], dropped=True)
+                continue
+            _done([record])
+        return True
+    finally:
+        cursor.close()
+        conn.close()
+
+def _dead_letter(record, error):
+    attempt, snapshot = record
+    line = json.dumps({"error": str(error), "at": activity.now_ts(), "attempt": attempt, "session": snapshot},
+                      default=str)
+    print(f"attempt_writer: registro descartado (sesión {snapshot['id']}): {error}")
+    try:
+        with open(DEAD_LETTER_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        # Sin archivo queda al menos en el log del proceso
+        print(f"attempt_writer: no se pudo escribir {DEAD_LETTER_PATH}: {e}; {line}")
+    with _cond:
+        _stats["dead_letters"] += 1
+
+def _done(records, dropped=False):
+    """Sacar de la cola los registros escritos (o descartados), que están al frente"""
+    with _cond:
+        for _ in records:
+            _queue.popleft()
+        for _, snapshot in records:
+            state = _sessions.get(snapshot["id"])
+            if state is None:
+                continue
+            state["pending"] -= 1
+            # Si se descartó, el estado en memoria ya no coincide con la base: se vuelve a leer
+            if (state["finished"] or dropped) and not state["pending"]:
+                del _sessions[snapshot["id"]]
+        if not dropped:
+            _stats["flushed"] += len(records)
+        _cond.notify_all()
+
+def stats():
+    with _cond:
+        return dict(
+            _stats,
+            enabled=ENABLED,
+            queued=len(_queue),
+            sessions=len(_sessions),
+            flush_ms=FLUSH_MS,
+            flush_rows=FLUSH_ROWS,
+            queue_max=QUEUE_MAX,
+            running=_thread is not None and _thread.is_alive()
+        )
@@ -5,6 +5,7 @@ try:
     from fastapi.middleware.cors import CORSMiddleware
     from user_service import models, database
     from user_service.routes import router
+    from user_service import hashing
 
     models.Base.metadata.create_all(bind=database.engine)
 
@@ -36,6 +37,10 @@ try:
             if hasattr(route, "methods") and hasattr(route, "path"):
                 print(f"   {list(route.methods)} {route.path}")
 
+    @app.on_event("shutdown")
+    def shutdown_event():
+        hashing.shutdown()
+
     if __name__ == "__main__":
         import uvicorn
         uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)
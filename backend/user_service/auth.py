@@ -3,7 +3,7 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status, Header
 from sqlalchemy.orm import Session
-from . import models, database, crud
+from . import models, database, crud, user_cache
 
 # CONFIGURACIÓN DE TOKEN 
 SECRET_KEY = "clave" 
@@ -22,6 +22,16 @@ def crear_token_acceso(data: dict, expires_delta: Optional[timedelta] = None) ->
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def crear_token_usuario(usuario: models.User) -> str:
+    # El token lleva id, rol y versión firmados: el usuario se busca en la caché
+    # por id y la versión invalida los tokens viejos
+    return crear_token_acceso(data={
+        "sub": usuario.username,
+        "uid": usuario.id,
+        "role": usuario.role,
+        "ver": usuario.token_version or 0,
+    })
+
 def verificar_token(authorization: str = Header(None)) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -55,16 +65,43 @@ def verificar_token(authorization: str = Header(None)) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def obtener_usuario_actual(
-    token_data: dict = Depends(verificar_token),
-    db: Session = Depends(database.get_db)
-) -> models.User:
-    usuario = crud.obtener_usuario_por_username(db, token_data["sub"])
-    
+def _version_usuarios():
+    db: Session = database.SessionLocal()
+    try:
+        return crud.version_usuarios(db)
+    finally:
+        db.close()
+
+def obtener_usuario_actual(token_data: dict = Depends(verificar_token)):
+    """Usuario del token, servido desde la caché de usuarios y validado contra su token_version"""
+    # Cambios hechos por admin_service en otro proceso
+    user_cache.sync(_version_usuarios)
+    user_id = token_data.get("uid")
+    usuario = user_cache.get(user_id) if user_id is not None else None
+
+    if usuario is None:
+        db: Session = database.SessionLocal()
+        try:
+            if user_id is not None:
+                encontrado = crud.obtener_usuario_por_id(db, user_id)
+            else:
+                # Tokens emitidos antes de incluir el id
+                encontrado = crud.obtener_usuario_por_username(db, token_data["sub"])
+            usuario = user_cache.put(encontrado) if encontrado else None
+        finally:
+            db.close()
+
     if not usuario:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado en la base de datos"
         )
+
+    if token_data.get("ver", 0) != usuario.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido o expirado. Por favor, inicia sesión nuevamente.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return usuario
\ No newline at end of file
+    return usuario
@@ -1,3 +1,5 @@
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 import hashlib
 import secrets
@@ -74,4 +76,14 @@ def obtener_usuario_por_id(db: Session, usuario_id: int) -> models.User | None:
     return db.query(models.User).filter(models.User.id == usuario_id).first()
 
 def obtener_usuario_por_username(db: Session, username: str) -> models.User | None:
-    return db.query(models.User).filter(models.User.username == username).first()
\ No newline at end of file
+    return db.query(models.User).filter(models.User.username == username).first()
+
+def version_usuarios(db: Session) -> int | None:
+    """Contador 'users' de cache_versions (lo incrementa admin al modificar o eliminar usuarios)"""
+    try:
+        row = db.execute(text("SELECT version FROM cache_versions WHERE name = 'users'")).first()
+    except SQLAlchemyError:
+        # Base sin cache_versions: la caché queda limitada por el TTL
+        db.rollback()
+        return None
+    return row[0] if row else 0
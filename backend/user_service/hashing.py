@@ -0,0 +1,69 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import crud
+
+# Verificación de contraseñas (scrypt) fuera del event loop y del threadpool de FastAPI.
+# LOGIN_MAX_CONCURRENCY verificaciones corren a la vez en un pool de procesos;
+# hasta LOGIN_MAX_QUEUE esperan turno y las siguientes se rechazan con 503.
+LOGIN_HASH_WORKERS = int(os.getenv("LOGIN_HASH_WORKERS", os.cpu_count() or 1))
+LOGIN_MAX_CONCURRENCY = int(os.getenv("LOGIN_MAX_CONCURRENCY", LOGIN_HASH_WORKERS))
+LOGIN_MAX_QUEUE = int(os.getenv("LOGIN_MAX_QUEUE", 64))
+
+class HashingSaturated(Exception):
+    pass
+
+_executor = None
+_semaphore = None
+_stats = {"in_flight": 0, "queued": 0, "completed": 0, "rejected": 0}
+
+def _pool():
+    global _executor
+    if _executor is None:
+        # spawn: el pool se crea con el servidor ya corriendo hilos, y un fork
+        # podría heredar locks tomados por otro hilo y trabarse
+        _executor = ProcessPoolExecutor(max_workers=LOGIN_HASH_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+def _limiter():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LOGIN_MAX_CONCURRENCY)
+    return _semaphore
+
+async def verificar_password(plain_password: str, hashed_password: str) -> bool:
+    if _stats["queued"] >= LOGIN_MAX_QUEUE:
+        _stats["rejected"] += 1
+        raise HashingSaturated()
+
+    _stats["queued"] += 1
+    try:
+        await _limiter().acquire()
+    finally:
+        _stats["queued"] -= 1
+
+    _stats["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_pool(), crud.verificar_password, plain_password, hashed_password)
+    finally:
+        _stats["in_flight"] -= 1
+        _stats["completed"] += 1
+        _limiter().release()
+
+def metrics() -> dict:
+    return dict(
+        _stats,
+        workers=LOGIN_HASH_WORKERS,
+        max_concurrency=LOGIN_MAX_CONCURRENCY,
+        max_queue=LOGIN_MAX_QUEUE,
+    )
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from . import models, database
 from .routes import router
+from . import hashing
 
 models.Base.metadata.create_all(bind=database.engine)
 
@@ -23,4 +24,8 @@ app.include_router(router, prefix="/api", tags=["Usuarios"])
 
 @app.get("/")
 def root():
-    return {"message": "correcto"}
\ No newline at end of file
+    return {"message": "correcto"}
+
+@app.on_event("shutdown")
+def shutdown_event():
+    hashing.shutdown()
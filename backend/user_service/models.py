@@ -14,6 +14,8 @@ class User(Base):
     password = Column(String(255))
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime)
+    # Se incrementa para invalidar los tokens ya emitidos
+    token_version = Column(Integer, nullable=False, default=0)
 
     # Quién creó este usuario para el registro
     creator = relationship("User", remote_side=[id], backref="created_users")
\ No newline at end of file
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from .database import get_db
 from . import models
 import user_service.schemas as schemas
 import user_service.crud as crud
-from .auth import crear_token_acceso
+from .auth import crear_token_usuario, obtener_usuario_actual
+from . import hashing, user_cache
 
 router = APIRouter()
 
@@ -19,18 +21,37 @@ def crear_usuario(usuario: schemas.UserCreate, db: Session = Depends(get_db)):
     return nuevo_usuario
 
 @router.post("/login/", response_model=schemas.Token)
-def login(request: schemas.LoginRequest, db: Session = Depends(get_db)):
-    usuario = crud.login_usuario(db=db, username=request.username, password=request.password)
-    if not usuario:
+async def login(request: schemas.LoginRequest, db: Session = Depends(get_db)):
+    # La consulta va al threadpool y el scrypt al pool de procesos, así el login
+    # no bloquea el event loop ni ocupa los hilos del resto de las rutas
+    usuario = await run_in_threadpool(crud.obtener_usuario_por_username, db, request.username)
+    try:
+        valido = usuario is not None and await hashing.verificar_password(request.password, usuario.password)
+    except hashing.HashingSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiados inicios de sesión simultáneos, intenta de nuevo en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+    if not valido:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nombre de usuario o contraseña incorrectos"
         )
     
-    access_token = crear_token_acceso(data={"sub": usuario.username})
+    access_token = crear_token_usuario(usuario)
+    user_cache.put(usuario)
     
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user": usuario
-    }
\ No newline at end of file
+    }
+
+@router.get("/usuarios/me/", response_model=schemas.UserResponse)
+def usuario_actual(usuario=Depends(obtener_usuario_actual)):
+    return usuario
+
+@router.get("/login/metrics")
+def login_metrics():
+    return hashing.metrics()
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+# Caché TTL/LRU de usuarios para validar tokens sin consultar MySQL en cada request.
+# Las entradas expiran a los USER_CACHE_TTL segundos; invalidate() las descarta antes
+# (p. ej. cuando un admin modifica o elimina al usuario en el mismo proceso). Entre
+# procesos, sync() compara el contador 'users' de cache_versions, que admin
+# incrementa en cada cambio, como mucho una vez cada USER_CACHE_CHECK_INTERVAL
+# segundos y vacía la caché si cambió.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 30))
+USER_CACHE_MAX = int(os.getenv("USER_CACHE_MAX", 1024))
+USER_CACHE_CHECK_INTERVAL = float(os.getenv("USER_CACHE_CHECK_INTERVAL", 1.0))
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # user_id -> (expires_at, usuario)
+_generation = None
+_checked_at = 0.0
+
+def snapshot(usuario) -> SimpleNamespace:
+    """Copia inmutable de los campos públicos del usuario (sin la contraseña)"""
+    return SimpleNamespace(
+        id=usuario.id,
+        username=usuario.username,
+        full_name=usuario.full_name,
+        role=usuario.role,
+        created_at=usuario.created_at,
+        token_version=getattr(usuario, "token_version", 0) or 0,
+    )
+
+def get(user_id: int):
+    with _lock:
+        entry = _entries.get(user_id)
+        if not entry:
+            return None
+        expires_at, usuario = entry
+        if expires_at < time.monotonic():
+            del _entries[user_id]
+            return None
+        _entries.move_to_end(user_id)
+        return usuario
+
+def put(usuario) -> SimpleNamespace:
+    cached = snapshot(usuario)
+    with _lock:
+        _entries[cached.id] = (time.monotonic() + USER_CACHE_TTL, cached)
+        _entries.move_to_end(cached.id)
+        while len(_entries) > USER_CACHE_MAX:
+            _entries.popitem(last=False)
+    return cached
+
+def invalidate(user_id: int = None):
+    with _lock:
+        if user_id is None:
+            _entries.clear()
+        else:
+            _entries.pop(int(user_id), None)
+
+def sync(read_generation):
+    """Vaciar la caché si cambió el contador de usuarios; read_generation() lo lee de la base"""
+    global _generation, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < USER_CACHE_CHECK_INTERVAL:
+        return
+    _checked_at = now
+    generation = read_generation()
+    if generation is None:
+        return
+    with _lock:
+        if generation != _generation:
+            _entries.clear()
+            _generation = generation
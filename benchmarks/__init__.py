@@ -0,0 +1,9 @@
+"""Benchmarks del ciclo de lecciones del estudiante.
+
+    python -m benchmarks.datagen --schools 5 --attempts 1000000   # datos sintéticos
+    python -m benchmarks.load --duration 60 --out runs/base.json  # carga + reporte
+    python -m benchmarks.report runs/base.json runs/cambio.json   # comparar corridas
+
+Todo lo que genera datagen usa el prefijo "bench" (usuarios bench_..., lecciones
+bench-...) y se borra con `python -m benchmarks.datagen --clean`.
+"""
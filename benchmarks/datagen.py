@@ -0,0 +1,277 @@
+"""Generador de datos sintéticos con el esquema de DB.sql.
+
+Crea escuelas (cada una con sus docentes, clases y estudiantes), lecciones con
+sus pasos asignadas a las clases, y sesiones con sus intentos hasta llegar a
+--attempts (la última sesión puede pasarse un poco). Todo se inserta con INSERT
+multi-fila (db.insert_many) en transacciones de --block sesiones; los contadores
+de student_activity y student_lesson_activity se calculan mientras se generan
+los intentos y student_progress se reconstruye al final con progress.rebuild.
+
+    python -m benchmarks.datagen --schools 10 --classes 4 --students 30 --lessons 40 --attempts 2000000
+    python -m benchmarks.datagen --clean
+
+El esquema no tiene escuelas: una escuela es un grupo de docentes y clases con
+el mismo prefijo (bench_s3_...).
+"""
+import argparse
+import random
+import string
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from db import DB_BACKEND, get_db_connection, insert_many, bump_version
+from passwords import get_password_hash
+import activity
+import progress
+
+USER_PREFIX = "bench_"
+LESSON_PREFIX = "bench-"
+DIFFICULTIES = ("beginner", "intermediate", "advanced")
+LETTERS = string.ascii_uppercase
+
+USER_INSERT = "INSERT INTO users (username, full_name, role, password, active, CI) VALUES"
+CLASS_INSERT = "INSERT INTO classes (name, description, teacher_id, active) VALUES"
+CLASS_STUDENT_INSERT = "INSERT INTO class_students (class_id, student_id, active) VALUES"
+LESSON_INSERT = "INSERT INTO lessons (id, title, description, difficulty, order_index, active, step_count) VALUES"
+STEP_INSERT = """INSERT INTO lesson_steps
+    (lesson_id, step_index, type, target, prompt, hint, max_attempts) VALUES"""
+CLASS_LESSON_INSERT = "INSERT INTO class_lessons (class_id, lesson_id, active) VALUES"
+STUDENT_LESSON_INSERT = "INSERT INTO student_lessons (student_id, lesson_id) VALUES"
+SESSION_INSERT = """INSERT INTO sessions (id, lesson_id, user_id, class_id, started_at, finished_at,
+    score, completed, current_step, step_attempts, attempt_count) VALUES"""
+
+def _ts(moment):
+    # Mismo formato que activity.now_ts()
+    return int(moment.strftime("%Y%m%d%H%M%S"))
+
+def _ids_by_name(cursor, sql, params=()):
+    cursor.execute(sql, params)
+    return {row["name"]: row["id"] for row in cursor.fetchall()}
+
+def _bulk_mode(cursor, on):
+    # En MySQL la carga evita las verificaciones por fila; los datos generados ya son consistentes
+    if DB_BACKEND == "mysql":
+        value = 0 if on else 1
+        cursor.execute(f"SET SESSION foreign_key_checks = {value}, unique_checks = {value}")
+
+def _create_catalog(conn, cursor, args, rng, log):
+    """Usuarios, clases, lecciones, pasos y asignaciones. Devuelve (estudiantes, lecciones)."""
+    password = get_password_hash("bench")
+    users = []
+    for school in range(args.schools):
+        for k in range(args.classes):
+            users.append((f"{USER_PREFIX}s{school}_t{k}", f"Docente {school}-{k}", "teacher", password, 1, 0))
+            for n in range(args.students):
+                users.append((f"{USER_PREFIX}s{school}_c{k}_{n}", f"Estudiante {school}-{k}-{n}",
+                              "student", password, 1, 0))
+    insert_many(cursor, USER_INSERT, users, batch_size=args.batch)
+    user_ids = _ids_by_name(cursor, """
+        SELECT id, username as name FROM users WHERE SUBSTR(username, 1, %s) = %s
+    """, (len(USER_PREFIX), USER_PREFIX))
+
+    insert_many(cursor, CLASS_INSERT, [
+        (f"Bench {school}-{k}", "Clase generada para benchmarks", user_ids[f"{USER_PREFIX}s{school}_t{k}"], 1)
+        for school in range(args.schools) for k in range(args.classes)
+    ], batch_size=args.batch)
+    teacher_ids = [user_ids[f"{USER_PREFIX}s{school}_t{k}"]
+                   for school in range(args.schools) for k in range(args.classes)]
+    placeholders = ", ".join(["%s"] * len(teacher_ids))
+    class_ids = _ids_by_name(cursor, f"SELECT id, name FROM classes WHERE teacher_id IN ({placeholders})",
+                             teacher_ids)
+
+    lessons = {}
+    lesson_rows, step_rows = [], []
+    for i in range(args.lessons):
+        lesson_id = f"{LESSON_PREFIX}{i:04d}"
+        targets = [rng.choice(LETTERS) for _ in range(args.steps)]
+        lessons[lesson_id] = targets
+        lesson_rows.append((lesson_id, f"Lección de prueba {i}", "Generada para benchmarks",
+                            DIFFICULTIES[i % len(DIFFICULTIES)], 1000 + i, 1, args.steps))
+        for index, target in enumerate(targets):
+            step_rows.append((lesson_id, index, "input", target, f"Escribe la letra {target}",
+                              f"Es la letra {target}", 3))
+    insert_many(cursor, LESSON_INSERT, lesson_rows, batch_size=args.batch)
+    insert_many(cursor, STEP_INSERT, step_rows, batch_size=args.batch)
+
+    students = []  # (student_id, class_id, [lecciones asignadas])
+    class_student_rows, class_lesson_rows, student_lesson_rows = [], [], []
+    lesson_ids = sorted(lessons)
+    per_class = min(args.lessons_per_class, len(lesson_ids))
+    for school in range(args.schools):
+        for k in range(args.classes):
+            class_id = class_ids[f"Bench {school}-{k}"]
+            assigned = sorted(rng.sample(lesson_ids, per_class))
+            class_lesson_rows.extend((class_id, lesson_id, 1) for lesson_id in assigned)
+            for n in range(args.students):
+                student_id = user_ids[f"{USER_PREFIX}s{school}_c{k}_{n}"]
+                class_student_rows.append((class_id, student_id, 1))
+                student_lesson_rows.extend((student_id, lesson_id) for lesson_id in assigned)
+                students.append((student_id, class_id, assigned))
+    insert_many(cursor, CLASS_STUDENT_INSERT, class_student_rows, batch_size=args.batch)
+    insert_many(cursor, CLASS_LESSON_INSERT, class_lesson_rows, batch_size=args.batch)
+    # Cada estudiante está en una sola clase: el índice de assignments.py sale directo
+    insert_many(cursor, STUDENT_LESSON_INSERT, student_lesson_rows, batch_size=args.batch)
+    conn.commit()
+    log(f"{len(users)} usuarios, {len(class_ids)} clases, {len(lessons)} lecciones, "
+        f"{len(step_rows)} pasos, {len(class_lesson_rows)} asignaciones")
+    return students, lessons
+
+def _play_session(rng, args, lessons, student, started):
+    """Simular una sesión: intentos hasta acertar cada paso, con saltos y abandonos"""
+    student_id, class_id, assigned = student
+    lesson_id = rng.choice(assigned)
+    targets = lessons[lesson_id]
+    session_id = uuid.uuid4().hex[:16]
+    moment = started
+    attempts = []
+    step = score = step_attempts = 0
+    while step < len(targets):
+        if step_attempts == 0 and attempts and rng.random() < args.abandon:
+            break
+        moment += timedelta(seconds=rng.randint(2, 20))
+        target = targets[step]
+        step_attempts += 1
+        if step_attempts > 3 and rng.random() < args.skip:
+            attempts.append((session_id, lesson_id, student_id, step, "__SKIP__", 0, 1, _ts(moment)))
+            continue
+        if rng.random() < args.accuracy:
+            attempts.append((session_id, lesson_id, student_id, step, target, 1, step_attempts, _ts(moment)))
+            step += 1
+            score += 1
+            step_attempts = 0
+        else:
+            wrong = rng.choice(LETTERS.replace(target, ""))
+            attempts.append((session_id, lesson_id, student_id, step, wrong, 0, step_attempts, _ts(moment)))
+    finished = _ts(moment) if step >= len(targets) else None
+    session = (session_id, lesson_id, student_id, class_id, _ts(started), finished,
+               score, 0, step, step_attempts, len(attempts))
+    return session, attempts
+
+def _create_activity(conn, cursor, args, rng, students, lessons, log):
+    """Sesiones e intentos hasta llegar a args.attempts, más los contadores de actividad"""
+    start = time.perf_counter()
+    window_start = datetime.now() - timedelta(days=args.days)
+    window = args.days * 86400
+    student_totals = {}  # student_id -> [attempts, corrects, last_ts, lessons_completed]
+    lesson_totals = {}   # (student_id, lesson_id) -> [attempts, corrects, last_ts, completed]
+    total_attempts = total_sessions = 0
+
+    while total_attempts < args.attempts:
+        sessions, attempts = [], []
+        while len(sessions) < args.block and total_attempts + len(attempts) < args.attempts:
+            student = rng.choice(students)
+            started = window_start + timedelta(seconds=rng.randint(0, window))
+            session, session_attempts = _play_session(rng, args, lessons, student, started)
+            sessions.append(session)
+            attempts.extend(session_attempts)
+
+            student_id, lesson_id, finished = session[2], session[1], session[5]
+            totals = student_totals.setdefault(student_id, [0, 0, None, 0])
+            per_lesson = lesson_totals.setdefault((student_id, lesson_id), [0, 0, None, 0])
+            for row in session_attempts:
+                for t in (totals, per_lesson):
+                    t[0] += 1
+                    t[1] += row[5]
+                    t[2] = max(t[2] or 0, row[7])
+            if finished is not None and not per_lesson[3]:
+                per_lesson[3] = 1
+                totals[3] += 1
+
+        insert_many(cursor, SESSION_INSERT, sessions, batch_size=args.batch)
+        insert_many(cursor, activity.ATTEMPT_INSERT, attempts, batch_size=args.batch)
+        conn.commit()
+        total_sessions += len(sessions)
+        total_attempts += len(attempts)
+        elapsed = time.perf_counter() - start
+        log(f"{total_sessions} sesiones, {total_attempts} intentos ({total_attempts / elapsed:,.0f} filas/s)")
+
+    insert_many(cursor, activity.STUDENT_INSERT,
+                [(sid, *t) for sid, t in sorted(student_totals.items())], batch_size=args.batch)
+    insert_many(cursor, activity.LESSON_INSERT,
+                [(sid, lid, *t) for (sid, lid), t in sorted(lesson_totals.items())], batch_size=args.batch)
+    conn.commit()
+    return total_sessions, total_attempts
+
+def generate(conn, args, log=print):
+    rng = random.Random(args.seed)
+    cursor = conn.cursor(dictionary=True)
+    start = time.perf_counter()
+    try:
+        _bulk_mode(cursor, True)
+        students, lessons = _create_catalog(conn, cursor, args, rng, log)
+        sessions, attempts = _create_activity(conn, cursor, args, rng, students, lessons, log)
+        for name in ("lessons", "classes", "users"):
+            bump_version(cursor, name)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # La conexión vuelve al pool: restaurar las verificaciones
+        _bulk_mode(cursor, False)
+        cursor.close()
+    if not args.skip_progress:
+        progress.rebuild(conn, log=lambda _: None)
+    log(f"Listo en {time.perf_counter() - start:.1f}s: {len(students)} estudiantes, "
+        f"{sessions} sesiones, {attempts} intentos")
+
+def clean(conn, chunk_size=500, log=print):
+    """Borrar todo lo generado (usuarios bench_* y lecciones bench-*) por bloques de usuarios"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT id FROM users WHERE SUBSTR(username, 1, %s) = %s ORDER BY id",
+                       (len(USER_PREFIX), USER_PREFIX))
+        user_ids = [row["id"] for row in cursor.fetchall()]
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            # sessions, attempts y lo archivado apuntan a users con SET NULL: se borran antes que los usuarios
+            cursor.execute(f"DELETE FROM attempts WHERE user_id IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM attempt_step_summary WHERE user_id IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM attempts_archive WHERE user_id IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM sessions WHERE user_id IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM users WHERE id IN ({placeholders})", chunk)
+            conn.commit()
+            log(f"{min(start + chunk_size, len(user_ids))}/{len(user_ids)} usuarios borrados")
+        cursor.execute("DELETE FROM lessons WHERE SUBSTR(id, 1, %s) = %s", (len(LESSON_PREFIX), LESSON_PREFIX))
+        log(f"{cursor.rowcount} lecciones borradas")
+        for name in ("lessons", "classes", "users"):
+            bump_version(cursor, name)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Datos sintéticos para benchmarks")
+    parser.add_argument("--schools", type=int, default=5)
+    parser.add_argument("--classes", type=int, default=4, help="clases (y docentes) por escuela")
+    parser.add_argument("--students", type=int, default=30, help="estudiantes por clase")
+    parser.add_argument("--lessons", type=int, default=40)
+    parser.add_argument("--steps", type=int, default=8, help="pasos por lección")
+    parser.add_argument("--lessons-per-class", type=int, default=10)
+    parser.add_argument("--attempts", type=int, default=1000000, help="intentos a generar")
+    parser.add_argument("--days", type=int, default=180, help="ventana de fechas de las sesiones")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="probabilidad de acertar un intento")
+    parser.add_argument("--skip", type=float, default=0.3, help="probabilidad de saltar tras 3 errores")
+    parser.add_argument("--abandon", type=float, default=0.05, help="probabilidad de abandonar antes de cada paso")
+    parser.add_argument("--block", type=int, default=2000, help="sesiones por transacción")
+    parser.add_argument("--batch", type=int, default=2000, help="filas por INSERT")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-progress", action="store_true", help="no reconstruir student_progress")
+    parser.add_argument("--clean", action="store_true", help="borrar los datos generados")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit("Database connection failed")
+    try:
+        if args.clean:
+            clean(conn)
+        else:
+            generate(conn, args)
+    finally:
+        conn.close()
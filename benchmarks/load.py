@@ -0,0 +1,256 @@
+"""Generador de carga sobre los servicios Flask.
+
+Cada estudiante virtual repite el recorrido de la app: lista de lecciones
+(con If-None-Match), start-session, y prompt -> submit hasta terminar la
+lección, con respuestas incorrectas y saltos según --accuracy y --skip. Cada
+docente virtual consulta el dashboard, sus clases y el catálogo de lecciones
+cada --poll segundos. Al terminar se guarda el reporte (benchmarks.report).
+
+    python -m benchmarks.load --students 50 --teachers 5 --duration 60 --out runs/base.json
+    python -m benchmarks.load --student-url http://localhost:5003 --teacher-url http://localhost:5002
+    python -m benchmarks.load --url http://localhost:8080    # gateway.py
+
+Sin URLs los blueprints se cargan en este mismo proceso (cliente de pruebas de
+Flask), así que mide las vistas y la base sin la red. Los ids de estudiantes y
+docentes salen de la base: primero los creados por benchmarks.datagen, si no hay
+ninguno, los existentes. Para medir consultas por request contra servicios
+externos, levantarlos con DB_QUERY_STATS_HEADER=1.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# El cliente en proceso lee las consultas por request del encabezado X-DB-Queries
+os.environ.setdefault("DB_QUERY_STATS_HEADER", "1")
+
+from db import get_db_connection
+from benchmarks import report
+from benchmarks.datagen import USER_PREFIX
+
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+class InProcessClient:
+    """Blueprints de admin, teacher y student en una app Flask local"""
+
+    def __init__(self):
+        from flask import Flask
+        from db import init_app
+        from admin_views import admin_bp
+        from teacher_views import teacher_bp
+        from student_views import student_bp
+
+        app = Flask("benchmarks")
+        init_app(app)
+        app.register_blueprint(admin_bp)
+        app.register_blueprint(teacher_bp)
+        app.register_blueprint(student_bp)
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=headers or {})
+        return response.status_code, response.get_json(silent=True), response.headers
+
+class HttpClient:
+    """Servicios levantados aparte; /api/teacher/... va a teacher_url y el resto a student_url"""
+
+    def __init__(self, student_url, teacher_url):
+        self.student_url = student_url.rstrip("/")
+        self.teacher_url = teacher_url.rstrip("/")
+
+    def request(self, method, path, body=None, headers=None):
+        base = self.teacher_url if path.startswith("/api/teacher/") else self.student_url
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(base + path, data=data, method=method, headers=dict(headers or {}))
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                status, raw, response_headers = response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            # 304 y errores también se miden
+            status, raw, response_headers = e.code, e.read(), e.headers
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError:
+            payload = None
+        return status, payload, response_headers
+
+class Recorder:
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def call(self, client, endpoint, method, path, body=None, headers=None):
+        start = time.perf_counter()
+        try:
+            status, payload, response_headers = client.request(method, path, body, headers)
+        except Exception:
+            status, payload, response_headers = None, None, {}
+        elapsed = (time.perf_counter() - start) * 1000
+        db_stats = report.parse_db_header(response_headers.get("X-DB-Queries"))
+        with self._lock:
+            self.samples.append({
+                "endpoint": endpoint,
+                "ms": elapsed,
+                "status": status,
+                "queries": db_stats.get("count"),
+                "db_ms": db_stats.get("time_ms"),
+            })
+        return status, payload, response_headers
+
+def _discover(role, limit):
+    """Ids de usuarios con el rol dado, primero los de benchmarks.datagen"""
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit("Database connection failed")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT id FROM users
+            WHERE role = %s AND active = 1 AND SUBSTR(username, 1, %s) = %s
+            ORDER BY id LIMIT %s
+        """, (role, len(USER_PREFIX), USER_PREFIX, limit))
+        ids = [row["id"] for row in cursor.fetchall()]
+        if not ids:
+            cursor.execute("SELECT id FROM users WHERE role = %s AND active = 1 ORDER BY id LIMIT %s",
+                           (role, limit))
+            ids = [row["id"] for row in cursor.fetchall()]
+        return ids
+    finally:
+        cursor.close()
+        conn.close()
+
+def _pause(args, rng):
+    if args.think_ms:
+        time.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+def student_loop(client, recorder, args, student_id, deadline, seed):
+    rng = random.Random(seed)
+    etag, lessons = None, []
+    while time.monotonic() < deadline:
+        status, payload, headers = recorder.call(
+            client, "GET /api/student/lessons/<id>", "GET", f"/api/student/lessons/{student_id}",
+            headers={"If-None-Match": etag} if etag else None)
+        if status == 200:
+            etag, lessons = headers.get("ETag"), payload.get("lessons", [])
+        if not lessons:
+            time.sleep(1)
+            continue
+        lesson = rng.choice(lessons)
+        status, payload, _ = recorder.call(
+            client, "POST /api/student/start-session", "POST", "/api/student/start-session",
+            {"student_id": student_id, "lesson_id": lesson["id"]})
+        if status != 200:
+            continue
+        session_id = payload["session_id"]
+
+        while time.monotonic() < deadline:
+            _pause(args, rng)
+            status, prompt, _ = recorder.call(
+                client, "GET /api/session_prompt/<id>", "GET", f"/api/session_prompt/{session_id}")
+            if status != 200 or prompt.get("finished"):
+                break
+            _pause(args, rng)
+            if prompt["attempts"] >= prompt["max_attempts"] and rng.random() < args.skip:
+                recorder.call(client, "POST /api/skip/<id>", "POST", f"/api/skip/{session_id}", {})
+                continue
+            target = (prompt.get("target") or "A").upper()
+            answer = target if rng.random() < args.accuracy else rng.choice(LETTERS.replace(target, "") or "A")
+            status, _, _ = recorder.call(
+                client, "POST /api/submit/<id>", "POST", f"/api/submit/{session_id}", {"answer": answer})
+            if status == 503:
+                time.sleep(1)
+
+def teacher_loop(client, recorder, args, teacher_id, deadline, seed):
+    rng = random.Random(seed)
+    etag = None
+    # Los docentes no consultan todos al mismo tiempo
+    time.sleep(rng.uniform(0, args.poll))
+    while time.monotonic() < deadline:
+        recorder.call(client, "GET /api/teacher/dashboard", "GET",
+                      f"/api/teacher/dashboard?page=1&per_page={args.dashboard_page}")
+        recorder.call(client, "GET /api/teacher/classes/<id>", "GET", f"/api/teacher/classes/{teacher_id}")
+        status, _, headers = recorder.call(
+            client, "GET /api/teacher/lessons", "GET", "/api/teacher/lessons",
+            headers={"If-None-Match": etag} if etag else None)
+        if status == 200:
+            etag = headers.get("ETag")
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            time.sleep(min(args.poll, remaining))
+
+def run(args):
+    import attempt_writer
+
+    if args.url or args.student_url or args.teacher_url:
+        client = HttpClient(args.url or args.student_url or "http://localhost:5003",
+                            args.url or args.teacher_url or "http://localhost:5002")
+        in_process = False
+    else:
+        client = InProcessClient()
+        in_process = True
+
+    student_ids = _discover("student", args.students)
+    teacher_ids = _discover("teacher", args.teachers) if args.teachers else []
+    if not student_ids:
+        raise SystemExit("No hay estudiantes en la base (ver benchmarks.datagen)")
+    print(f"{args.students} estudiantes y {args.teachers} docentes virtuales durante {args.duration}s "
+          f"({'en proceso' if in_process else 'HTTP'})")
+
+    if in_process and attempt_writer.ENABLED:
+        attempt_writer.start()
+    recorder = Recorder()
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(target=student_loop, daemon=True,
+                         args=(client, recorder, args, student_ids[i % len(student_ids)], deadline, args.seed + i))
+        for i in range(args.students)
+    ] + [
+        threading.Thread(target=teacher_loop, daemon=True,
+                         args=(client, recorder, args, teacher_ids[i % len(teacher_ids)], deadline,
+                               args.seed + 100000 + i))
+        for i in range(args.teachers if teacher_ids else 0)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duration = time.monotonic() - start
+    if in_process and attempt_writer.ENABLED:
+        attempt_writer.stop()
+
+    config = {key: value for key, value in vars(args).items() if key != "out"}
+    config["mode"] = "in-process" if in_process else "http"
+    result = report.summarize(recorder.samples, duration, config)
+    report.print_report(result)
+    if args.out:
+        report.save(result, args.out)
+        print(f"Reporte guardado en {args.out}")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga sobre el ciclo de lecciones y el dashboard")
+    parser.add_argument("--students", type=int, default=20, help="estudiantes virtuales (hilos)")
+    parser.add_argument("--teachers", type=int, default=2, help="docentes virtuales (hilos)")
+    parser.add_argument("--duration", type=float, default=30, help="segundos")
+    parser.add_argument("--think-ms", type=float, default=0, help="pausa media entre acciones del estudiante")
+    parser.add_argument("--poll", type=float, default=2, help="segundos entre consultas de cada docente")
+    parser.add_argument("--dashboard-page", type=int, default=50, help="per_page del dashboard")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="probabilidad de responder bien")
+    parser.add_argument("--skip", type=float, default=0.3, help="probabilidad de saltar al agotar los intentos")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="gateway con todas las rutas (p. ej. http://localhost:8080)")
+    parser.add_argument("--student-url", help="student_service (p. ej. http://localhost:5003)")
+    parser.add_argument("--teacher-url", help="teacher_service (p. ej. http://localhost:5002)")
+    parser.add_argument("--out", help="archivo JSON del reporte")
+    run(parser.parse_args())
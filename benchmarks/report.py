@@ -0,0 +1,146 @@
+"""Reporte de una corrida de carga: latencias p50/p95/p99, throughput y
+consultas por request de cada endpoint, guardado como JSON.
+
+    python -m benchmarks.report runs/base.json                 # mostrar una corrida
+    python -m benchmarks.report runs/base.json runs/nuevo.json # comparar dos corridas
+
+queries_per_request sale del encabezado X-DB-Queries (db.py); si el servicio no
+lo envía (DB_QUERY_STATS_HEADER=0 y sin DEBUG) queda en null.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+
+ENV_KEYS = ("DB_BACKEND", "DB_POOL_SIZE", "DB_POOL_MAX_OVERFLOW", "ATTEMPT_WRITE_BEHIND",
+            "ATTEMPT_FLUSH_MS", "ATTEMPT_FLUSH_ROWS", "LESSON_CACHE_CHECK_INTERVAL", "DB_QUERY_STATS")
+
+def percentile(values, p):
+    """Percentil p (0-100) con interpolación lineal; values ya ordenados"""
+    if not values:
+        return None
+    k = (len(values) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+def parse_db_header(value):
+    """'count=3; time_ms=1.2; rows=4; n_plus_one=0' -> {"count": 3.0, ...}"""
+    stats = {}
+    for part in (value or "").split(";"):
+        key, _, number = part.strip().partition("=")
+        try:
+            stats[key] = float(number)
+        except ValueError:
+            pass
+    return stats
+
+def _mean(values):
+    return round(sum(values) / len(values), 3) if values else None
+
+def _endpoint_summary(samples, duration):
+    latencies = sorted(s["ms"] for s in samples)
+    statuses = {}
+    for s in samples:
+        statuses[str(s["status"])] = statuses.get(str(s["status"]), 0) + 1
+    queries = [s["queries"] for s in samples if s["queries"] is not None]
+    db_ms = [s["db_ms"] for s in samples if s["db_ms"] is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if s["status"] is None or s["status"] >= 500),
+        "statuses": statuses,
+        "throughput_rps": round(len(samples) / duration, 3) if duration else None,
+        "latency_ms": {
+            "mean": _mean(latencies),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "queries_per_request": _mean(queries),
+        "db_time_ms": _mean(db_ms),
+    }
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def summarize(samples, duration, config=None):
+    """samples: [{"endpoint", "ms", "status", "queries", "db_ms"}]"""
+    endpoints = {}
+    for s in samples:
+        endpoints.setdefault(s["endpoint"], []).append(s)
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "env": {key: os.environ[key] for key in ENV_KEYS if key in os.environ},
+        "config": config or {},
+        "duration_s": round(duration, 3),
+        "total": _endpoint_summary(samples, duration) if samples else None,
+        "endpoints": {name: _endpoint_summary(rows, duration) for name, rows in sorted(endpoints.items())},
+    }
+
+def save(report, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _row(name, summary):
+    if not summary:
+        return f"{name:<40} {'-':>8}"
+    lat = summary["latency_ms"]
+    qpr = summary["queries_per_request"]
+    return (f"{name:<40} {summary['requests']:>8} {summary['errors']:>6} {summary['throughput_rps']:>9.1f} "
+            f"{lat['p50']:>8.1f} {lat['p95']:>8.1f} {lat['p99']:>8.1f} {'-' if qpr is None else qpr:>6}")
+
+def _delta(before, after):
+    if before is None or after is None:
+        return "-"
+    if not before:
+        return f"{after:+.1f}"
+    return f"{(after - before) * 100 / before:+.0f}%"
+
+def print_report(report):
+    print(f"git {report['git']}  {report['created_at']}  {report['duration_s']}s  {report['config']}")
+    print(f"{'endpoint':<40} {'requests':>8} {'errors':>6} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6}")
+    for name, summary in report["endpoints"].items():
+        print(_row(name, summary))
+    print(_row("TOTAL", report["total"]))
+
+def print_comparison(base, other):
+    print(f"base {base['git']} ({base['created_at']})  vs  {other['git']} ({other['created_at']})")
+    print(f"{'endpoint':<40} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>8}")
+    names = sorted(set(base["endpoints"]) | set(other["endpoints"]))
+    for name in names + ["TOTAL"]:
+        a = base["total"] if name == "TOTAL" else base["endpoints"].get(name)
+        b = other["total"] if name == "TOTAL" else other["endpoints"].get(name)
+        if not a or not b:
+            print(f"{name:<40} {'solo en ' + ('base' if a else 'nuevo'):>8}")
+            continue
+        print(f"{name:<40} {_delta(a['throughput_rps'], b['throughput_rps']):>8} "
+              f"{_delta(a['latency_ms']['p50'], b['latency_ms']['p50']):>8} "
+              f"{_delta(a['latency_ms']['p95'], b['latency_ms']['p95']):>8} "
+              f"{_delta(a['latency_ms']['p99'], b['latency_ms']['p99']):>8} "
+              f"{_delta(a['queries_per_request'], b['queries_per_request']):>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mostrar o comparar reportes de benchmarks")
+    parser.add_argument("report", help="reporte JSON (base si se pasan dos)")
+    parser.add_argument("other", nargs="?", help="reporte JSON a comparar con el primero")
+    args = parser.parse_args()
+    if args.other:
+        print_comparison(load(args.report), load(args.other))
+    else:
+        print_report(load(args.report))
@@ -1,5 +1,10 @@
 import mysql.connector
 from mysql.connector import Error
+from functools import lru_cache
+import logging
+import re
+import sqlite3
+import threading
 import time
 import os
 
@@ -9,6 +14,171 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_NAME = os.getenv("DB_NAME", "braille_db")
 DB_PORT = int(os.getenv("DB_PORT", 3306))
 
+# "mysql" (por defecto) o "sqlite": con sqlite las mismas vistas corren sobre un
+# archivo local creado con `python db_sqlite.py --init` (ver db_sqlite.py)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "braille.db"))
+
+# Pool de conexiones: POOL_SIZE conexiones persistentes y hasta POOL_MAX_OVERFLOW
+# conexiones extra que se cierran al devolverse. Si no hay ninguna libre, el
+# request espera hasta POOL_TIMEOUT segundos.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 5))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# Conexiones ociosas más de POOL_RECYCLE segundos se verifican con ping antes de usarse
+POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", 300))
+
+# Instrumentación de consultas: latencia, filas y huella (SQL normalizado) de cada
+# sentencia, acumuladas por request. QUERY_SLOW_MS registra las consultas lentas;
+# una misma huella ejecutada más de QUERY_N_PLUS_ONE veces en un request se
+# reporta como posible N+1.
+QUERY_STATS = os.getenv("DB_QUERY_STATS", "1").lower() in ("1", "true", "yes")
+QUERY_SLOW_MS = float(os.getenv("DB_QUERY_SLOW_MS", 200))
+QUERY_N_PLUS_ONE = int(os.getenv("DB_QUERY_N_PLUS_ONE", 10))
+# Encabezado X-DB-Queries en las respuestas: siempre con DEBUG de Flask, o forzado aquí
+QUERY_STATS_HEADER = os.getenv("DB_QUERY_STATS_HEADER", "0").lower() in ("1", "true", "yes")
+# /api/db/pool y /api/db/queries exponen el texto de las consultas y el estado del
+# pool: solo se registran si se habilitan explícitamente (no tienen autenticación)
+STATS_ENDPOINTS = os.getenv("DB_STATS_ENDPOINTS", "0").lower() in ("1", "true", "yes")
+
+query_log = logging.getLogger("db.queries")
+
+_FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?+)"),
+    (re.compile(r"(\(\?\+\))(?:\s*,\s*\(\?\+\))+"), r"\1+"),
+    (re.compile(r"\s+"), " "),
+]
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """SQL normalizado: literales y parámetros como ?, listas IN/VALUES colapsadas"""
+    text = sql.strip()
+    for pattern, repl in _FINGERPRINT_RULES:
+        text = pattern.sub(repl, text)
+    return text.lower()
+
+_totals_lock = threading.Lock()
+_totals = {}  # huella -> [ejecuciones, ms totales, ms máximo, filas]
+
+def _request_stats():
+    try:
+        from flask import g, has_app_context
+    except ImportError:
+        return None
+    if not has_app_context():
+        return None
+    stats = g.get("_db_query_stats")
+    if stats is None:
+        stats = g._db_query_stats = {"count": 0, "time_ms": 0.0, "rows": 0,
+                                     "fingerprints": {}, "n_plus_one": []}
+    return stats
+
+def _record(sql, elapsed_ms, rows):
+    fp = fingerprint(sql)
+    with _totals_lock:
+        total = _totals.setdefault(fp, [0, 0.0, 0.0, 0])
+        total[0] += 1
+        total[1] += elapsed_ms
+        total[2] = max(total[2], elapsed_ms)
+        total[3] += max(rows, 0)
+    if elapsed_ms >= QUERY_SLOW_MS:
+        query_log.warning("consulta lenta (%.1f ms, %d filas): %s", elapsed_ms, rows, fp)
+
+    stats = _request_stats()
+    if stats is None:
+        return
+    stats["count"] += 1
+    stats["time_ms"] += elapsed_ms
+    stats["rows"] += max(rows, 0)
+    seen = stats["fingerprints"][fp] = stats["fingerprints"].get(fp, 0) + 1
+    if seen == QUERY_N_PLUS_ONE + 1:
+        stats["n_plus_one"].append(fp)
+        query_log.warning("posible N+1: %s ejecutada más de %d veces en un request",
+                          fp, QUERY_N_PLUS_ONE)
+
+class InstrumentedCursor:
+    """Cursor que mide cada execute(); las filas se cuentan al leerlas"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._stats = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._add_rows(1)
+            yield row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _add_rows(self, n):
+        if self._stats is not None:
+            self._stats["rows"] += n
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            # Para INSERT/UPDATE/DELETE rowcount ya tiene las filas afectadas
+            rows = self._cursor.rowcount if self._cursor.rowcount and self._cursor.rowcount > 0 else 0
+            _record(sql if isinstance(sql, str) else sql.decode("utf-8", "replace"), elapsed_ms, rows)
+            self._stats = _request_stats()
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_params, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            _record(sql, elapsed_ms, max(self._cursor.rowcount or 0, 0))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._add_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._add_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._add_rows(len(rows))
+        return rows
+
+def query_totals(limit=50):
+    """Huellas con más tiempo acumulado en el proceso"""
+    with _totals_lock:
+        items = sorted(_totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    return [
+        {"fingerprint": fp, "count": count, "total_ms": round(total_ms, 3),
+         "avg_ms": round(total_ms / count, 3), "max_ms": round(max_ms, 3), "rows": rows}
+        for fp, (count, total_ms, max_ms, rows) in items
+    ]
+
+def request_query_stats():
+    """Totales de consultas del request actual (o None fuera de un request)"""
+    try:
+        from flask import g, has_app_context
+    except ImportError:
+        return None
+    if not has_app_context():
+        return None
+    return g.get("_db_query_stats")
+
 class CursorWrapper:
     def __init__(self, cursor, conn):
         self._cursor = cursor
@@ -62,9 +232,63 @@ class DB:
         except:
             pass
 
-def get_db_connection():
-    try:
-        conn = mysql.connector.connect(
+class PoolTimeout(Error):
+    pass
+
+class PooledConnection:
+    """Conexión prestada por el pool. close() la devuelve en lugar de cerrarla."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        # Atributos propios con "_"; el resto (p. ej. autocommit) va a la conexión real
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw, name, value)
+
+    @property
+    def closed(self):
+        return self._released
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        return InstrumentedCursor(cursor) if QUERY_STATS else cursor
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._raw)
+
+class ConnectionPool:
+    def __init__(self, size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self._idle = []  # [(raw_conn, returned_at)]
+        self._open = 0
+        self._in_use = 0
+        self._waiters = 0
+        self._cond = threading.Condition()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _connect(self):
+        if DB_BACKEND == "sqlite":
+            import db_sqlite
+            return db_sqlite.connect(DB_SQLITE_PATH)
+        return mysql.connector.connect(
             host=DB_HOST,
             user=DB_USER,
             password=DB_PASSWORD,
@@ -72,9 +296,122 @@ def get_db_connection():
             port=DB_PORT,
             autocommit=False
         )
-        return conn
-    except Error:
+
+    def checkout(self):
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        raw = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, returned_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout("Connection pool exhausted")
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+            self._in_use += 1
+
+        try:
+            if raw is None:
+                raw = self._connect()
+            elif time.monotonic() - returned_at > self.recycle:
+                try:
+                    raw.ping(reconnect=True, attempts=1)
+                except Exception:
+                    # La conexión vieja no responde: cerrarla antes de abrir otra
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+                    raw = None
+                    raw = self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.perf_counter() - start
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return PooledConnection(self, raw)
+
+    def _release(self, raw):
+        # Descartar cualquier transacción sin confirmar antes de reutilizar la conexión
+        healthy = True
+        try:
+            raw.rollback()
+        except Exception:
+            healthy = False
+        with self._cond:
+            self._in_use -= 1
+            if healthy and len(self._idle) < self.size:
+                self._idle.append((raw, time.monotonic()))
+                raw = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if raw is not None:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiters": self._waiters,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "checkout_avg_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0,
+                "checkout_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+    def dispose(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for raw, _ in idle:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+pool = ConnectionPool()
+
+def _track(conn):
+    # Dentro de un request de Flask, registrar la conexión para devolverla en el teardown
+    try:
+        from flask import g, has_app_context
+    except ImportError:
+        return
+    if has_app_context():
+        g.setdefault("_db_connections", []).append(conn)
+
+def get_db_connection():
+    try:
+        conn = pool.checkout()
+    except (Error, sqlite3.Error):
         return None
+    _track(conn)
+    return conn
 
 def get_db():
     conn = get_db_connection()
@@ -82,11 +419,174 @@ def get_db():
         raise RuntimeError("Database connection failed")
     return DB(conn)
 
+def release_request_connections(exc=None):
+    try:
+        from flask import g
+    except ImportError:
+        return
+    for conn in g.pop("_db_connections", []):
+        conn.close()
+
+def pool_stats():
+    return pool.stats()
+
+def _query_stats_header(response):
+    from flask import current_app
+    stats = request_query_stats()
+    if stats and (current_app.debug or QUERY_STATS_HEADER):
+        response.headers["X-DB-Queries"] = (
+            f"count={stats['count']}; time_ms={stats['time_ms']:.1f}; rows={stats['rows']}; "
+            f"n_plus_one={len(stats['n_plus_one'])}"
+        )
+        response.headers["Server-Timing"] = f"db;dur={stats['time_ms']:.1f}"
+    return response
+
+def init_app(app):
+    """Registrar el teardown que devuelve las conexiones, el encabezado con los
+    totales de consultas y, con DB_STATS_ENDPOINTS=1, los endpoints de
+    estadísticas del pool y de consultas"""
+    from flask import jsonify, request
+    app.teardown_appcontext(release_request_connections)
+    app.after_request(_query_stats_header)
+    if not STATS_ENDPOINTS:
+        return
+    app.add_url_rule("/api/db/pool", "db_pool_stats", lambda: jsonify(pool_stats()))
+    app.add_url_rule("/api/db/queries", "db_query_stats",
+                     lambda: jsonify(query_totals(int(request.args.get("limit", 50)))))
+
+# Registro de capacidades del esquema: columnas de cada tabla, leídas una vez al iniciar
+# (y de nuevo tras una migración) para no consultar metadatos en cada request. Cuando
+# quien consulta pasa su cursor, cada CAPABILITIES_CHECK_INTERVAL segundos se compara
+# por ese cursor la última versión de schema_version: si migrate.py aplicó algo desde
+# otro proceso, el registro se vuelve a leer. Sin cursor se usa el registro tal como
+# está, para no pedir una segunda conexión al pool en medio de un request.
+CAPABILITIES_CHECK_INTERVAL = float(os.getenv("DB_CAPABILITIES_CHECK_INTERVAL", 30))
+_capabilities = {}
+_capabilities_loaded = False
+_capabilities_lock = threading.Lock()
+_schema_version = None
+_capabilities_checked_at = 0.0
+
+def _read_schema_version(cursor):
+    try:
+        cursor.execute("SELECT COALESCE(MAX(version), 0) as version FROM schema_version")
+        row = cursor.fetchone()
+    except (Error, sqlite3.Error):
+        # Base sin schema_version (anterior a migrate.py)
+        return None
+    return row["version"] if isinstance(row, dict) else row[0]
+
+def _load_capabilities(cursor):
+    global _capabilities_loaded, _schema_version, _capabilities_checked_at
+    if DB_BACKEND == "sqlite":
+        import db_sqlite
+        rows = db_sqlite.table_columns(cursor)
+    else:
+        cursor.execute("""
+            SELECT TABLE_NAME as table_name, COLUMN_NAME as column_name
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """)
+        rows = cursor.fetchall()
+    columns = {}
+    for row in rows:
+        table, column = (row["table_name"], row["column_name"]) if isinstance(row, dict) else row
+        columns.setdefault(table.lower(), set()).add(column.lower())
+    schema_version = _read_schema_version(cursor)
+    with _capabilities_lock:
+        _capabilities.clear()
+        _capabilities.update(columns)
+        _capabilities_loaded = True
+        _schema_version = schema_version
+        _capabilities_checked_at = time.monotonic()
+
+def refresh_capabilities(conn=None, cursor=None):
+    """Volver a leer el registro por el cursor o la conexión dados (si no, una del pool)"""
+    if cursor is not None:
+        _load_capabilities(cursor)
+        return True
+    own = conn is None
+    if own:
+        conn = get_db_connection()
+        if not conn:
+            return False
+    cursor = conn.cursor()
+    try:
+        _load_capabilities(cursor)
+    finally:
+        cursor.close()
+        if own:
+            conn.close()
+    return True
+
+def _check_capabilities(cursor):
+    """Volver a leer el registro si cambió schema_version (como mucho una vez por intervalo)"""
+    global _capabilities_checked_at
+    if not _capabilities_loaded:
+        refresh_capabilities(cursor=cursor)
+        return
+    if cursor is None or time.monotonic() - _capabilities_checked_at < CAPABILITIES_CHECK_INTERVAL:
+        return
+    _capabilities_checked_at = time.monotonic()
+    if _read_schema_version(cursor) != _schema_version:
+        _load_capabilities(cursor)
+
+def has_column(table, column, cursor=None):
+    _check_capabilities(cursor)
+    return column.lower() in _capabilities.get(table.lower(), ())
+
+def has_table(table, cursor=None):
+    _check_capabilities(cursor)
+    return table.lower() in _capabilities
+
+INSERT_BATCH_SIZE = int(os.getenv("DB_INSERT_BATCH_SIZE", 500))
+
+def insert_many(cursor, sql, rows, suffix="", batch_size=INSERT_BATCH_SIZE):
+    """INSERT de varias filas por sentencia.
+
+    sql es el INSERT hasta VALUES inclusive, p. ej. "INSERT INTO t (a, b) VALUES";
+    suffix se agrega al final (p. ej. "ON DUPLICATE KEY UPDATE ...").
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    placeholder = "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start:start + batch_size]
+        params = [value for row in chunk for value in row]
+        cursor.execute(f"{sql} {', '.join([placeholder] * len(chunk))} {suffix}", params)
+    return len(rows)
+
+def bump_version(cursor, name):
+    """Incrementar un contador de cache_versions dentro de la transacción actual"""
+    cursor.execute("""
+        INSERT INTO cache_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (name,))
+
+def read_versions(cursor, names):
+    """Leer varios contadores de cache_versions en una consulta. Los que no existen valen 0."""
+    names = list(names)
+    cursor.execute(
+        "SELECT name, version FROM cache_versions WHERE name IN (%s)" % ", ".join(["%s"] * len(names)),
+        tuple(names)
+    )
+    versions = dict.fromkeys(names, 0)
+    for row in cursor.fetchall():
+        if isinstance(row, dict):
+            versions[row["name"]] = row["version"]
+        else:
+            versions[row[0]] = row[1]
+    return versions
+
 def now_ms():
     return int(time.time() * 1000)
 
 def init_db():
-    # Test connection
+    # Test connection, warm up the pool and probe the schema once
     conn = get_db_connection()
     if conn:
-        conn.close()
+        try:
+            refresh_capabilities(conn)
+        finally:
+            conn.close()
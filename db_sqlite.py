@@ -0,0 +1,336 @@
+"""Backend SQLite para db.py (DB_BACKEND=sqlite).
+
+Las vistas siguen escribiendo SQL de MySQL con parámetros %s; cada sentencia se
+traduce una vez (caché LRU) al dialecto de SQLite: %s -> ?, NOW(), GREATEST,
+IF(), <=>, ON DUPLICATE KEY UPDATE / VALUES(col) -> ON CONFLICT / excluded.col.
+SELECT ... FOR UPDATE abre una transacción IMMEDIATE para reservar la escritura,
+que es lo más parecido a un bloqueo de fila en SQLite.
+
+El esquema se genera traduciendo DB.sql:
+
+    python db_sqlite.py --init [--path braille.db] [--schema DB.sql] [--no-data]
+
+La base usa WAL y pragmas pensados para un servidor con varios hilos.
+"""
+import argparse
+import os
+import re
+import sqlite3
+from functools import lru_cache
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT", 5000))
+SQLITE_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("foreign_keys", "ON"),
+    ("busy_timeout", SQLITE_BUSY_TIMEOUT_MS),
+    ("cache_size", -int(os.getenv("DB_SQLITE_CACHE_KB", 65536))),
+    ("temp_store", "MEMORY"),
+    ("mmap_size", int(os.getenv("DB_SQLITE_MMAP_BYTES", 268435456))),
+)
+
+# --- Traducción de sentencias -------------------------------------------------
+
+_NOW = "CAST(strftime('%Y%m%d%H%M%S', 'now', 'localtime') AS INTEGER)"
+_RULES = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\s*<=>\s*"), " IS "),
+    (re.compile(r"\bNOW\(\)", re.I), _NOW),
+    (re.compile(r"\bGREATEST\s*\(", re.I), "MAX("),
+    (re.compile(r"\bLEAST\s*\(", re.I), "MIN("),
+    (re.compile(r"\bIF\s*\(", re.I), "IIF("),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bLOCK\s+IN\s+SHARE\s+MODE\b", re.I), ""),
+]
+_FOR_UPDATE = re.compile(r"\bFOR\s+UPDATE\b", re.I)
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_REF = re.compile(r"\bVALUES\s*\(\s*`?(\w+)`?\s*\)", re.I)
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """Traducir una sentencia de MySQL. Devuelve (sql, bloquea)."""
+    locking = bool(_FOR_UPDATE.search(sql))
+    if locking:
+        sql = _FOR_UPDATE.sub("", sql)
+    for pattern, repl in _RULES:
+        sql = pattern.sub(repl, sql)
+    match = _ON_DUPLICATE.search(sql)
+    if match:
+        update = _VALUES_REF.sub(r"excluded.\1", sql[match.end():])
+        sql = sql[:match.start()] + "ON CONFLICT DO UPDATE SET" + update
+    return sql, locking
+
+# --- Conexión ------------------------------------------------------------------
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+class SqliteCursor:
+    def __init__(self, conn, dictionary=False):
+        self._conn = conn
+        self._cursor = conn._raw.cursor()
+        if dictionary:
+            self._cursor.row_factory = _dict_row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, sql, params=None):
+        sql, locking = translate(sql)
+        if locking and not self._conn._raw.in_transaction:
+            self._conn._raw.execute("BEGIN IMMEDIATE")
+        self._cursor.execute(sql, tuple(params or ()))
+        return self
+
+    def executemany(self, sql, seq_params):
+        sql, _ = translate(sql)
+        self._cursor.executemany(sql, [tuple(p) for p in seq_params])
+        return self
+
+    def close(self):
+        self._cursor.close()
+
+class SqliteConnection:
+    """Envoltura con la interfaz de mysql-connector que usan las vistas"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SqliteCursor(self, dictionary)
+
+    def ping(self, reconnect=True, attempts=1):
+        self._raw.execute("SELECT 1")
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+def connect(path):
+    raw = sqlite3.connect(path, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+    for name, value in SQLITE_PRAGMAS:
+        raw.execute(f"PRAGMA {name}={value}")
+    return SqliteConnection(raw)
+
+def table_columns(cursor):
+    """Filas (table_name, column_name) del esquema, equivalente a information_schema.COLUMNS"""
+    cursor.execute("""
+        SELECT m.name as table_name, p.name as column_name
+        FROM sqlite_master m
+        JOIN pragma_table_info(m.name) p
+        WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+    """)
+    return cursor.fetchall()
+
+# --- Traducción del esquema (DB.sql) ---------------------------------------------
+
+_COLUMN = re.compile(r"^\s*`(\w+)`\s+(.*?),?\s*$")
+_KEY = re.compile(r"^\s*(UNIQUE\s+)?KEY\s+`(\w+)`\s+\((.*?)\),?\s*$")
+_PRIMARY = re.compile(r"^\s*PRIMARY KEY\s+\((.*?)\),?\s*$")
+_CONSTRAINT = re.compile(r"^\s*(CONSTRAINT\s+`\w+`\s+FOREIGN KEY.*?),?\s*$")
+_TYPES = [
+    (re.compile(r"^(tinyint|smallint|mediumint|int|bigint)(\(\d+\))?( unsigned)?", re.I), "INTEGER"),
+    (re.compile(r"^(varchar|char)\(\d+\)", re.I), "TEXT"),
+    (re.compile(r"^(tinytext|mediumtext|longtext|text|json)", re.I), "TEXT"),
+    (re.compile(r"^enum\(.*?\)(?=\s|$)", re.I), "TEXT"),
+    (re.compile(r"^(timestamp|datetime|date|time)", re.I), "TEXT"),
+    (re.compile(r"^(decimal|float|double)(\(\d+(,\d+)?\))?", re.I), "REAL"),
+]
+
+def _column_type(definition):
+    for pattern, sqlite_type in _TYPES:
+        if pattern.match(definition):
+            definition = pattern.sub(sqlite_type, definition, count=1)
+            break
+    definition = re.sub(r"\s+(CHARACTER SET|COLLATE)\s+\w+", "", definition)
+    definition = re.sub(r"\s+ON UPDATE CURRENT_TIMESTAMP", "", definition, flags=re.I)
+    return definition
+
+def _create_table(table, lines):
+    columns, keys, constraints = [], [], []
+    primary = None
+    for line in lines:
+        m = _PRIMARY.match(line)
+        if m:
+            primary = m.group(1)
+            continue
+        m = _KEY.match(line)
+        if m:
+            keys.append((bool(m.group(1)), m.group(2), m.group(3)))
+            continue
+        m = _CONSTRAINT.match(line)
+        if m:
+            constraints.append(m.group(1))
+            continue
+        m = _COLUMN.match(line)
+        if m:
+            columns.append([m.group(1), _column_type(m.group(2))])
+
+    # int AUTO_INCREMENT con clave primaria propia -> INTEGER PRIMARY KEY AUTOINCREMENT
+    for column in columns:
+        if "AUTO_INCREMENT" in column[1]:
+            column[1] = "INTEGER PRIMARY KEY AUTOINCREMENT"
+            primary = None
+    body = [f"  `{name}` {definition}" for name, definition in columns]
+    if primary:
+        body.append(f"  PRIMARY KEY ({primary})")
+    body.extend(f"  {constraint}" for constraint in constraints)
+
+    statements = [f"CREATE TABLE `{table}` (\n" + ",\n".join(body) + "\n);"]
+    for unique, name, cols in keys:
+        # Los nombres de índice son globales en SQLite
+        statements.append(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX `{table}_{name}` ON `{table}` ({cols});"
+        )
+    return statements
+
+def _mysql_literals(values):
+    """Reescribir los literales de un INSERT de mysqldump (escapes con \\) con comillas de SQLite"""
+    out = []
+    i = 0
+    escapes = {"n": "\n", "r": "\r", "t": "\t", "0": "\0", "Z": "\x1a"}
+    while i < len(values):
+        ch = values[i]
+        if ch != "'":
+            out.append(ch)
+            i += 1
+            continue
+        i += 1
+        text = []
+        while i < len(values):
+            ch = values[i]
+            if ch == "\\" and i + 1 < len(values):
+                text.append(escapes.get(values[i + 1], values[i + 1]))
+                i += 2
+            elif ch == "'" and values[i + 1:i + 2] == "'":
+                text.append("'")
+                i += 2
+            elif ch == "'":
+                i += 1
+                break
+            else:
+                text.append(ch)
+                i += 1
+        out.append("'" + "".join(text).replace("'", "''") + "'")
+    return "".join(out)
+
+def translate_schema(dump, with_data=True):
+    """Convertir un volcado de mysqldump (DB.sql) en sentencias de SQLite"""
+    statements = []
+    lines = dump.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        m = re.match(r"^CREATE TABLE `(\w+)` \($", line)
+        if m:
+            table = m.group(1)
+            body = []
+            i += 1
+            while not lines[i].startswith(")"):
+                body.append(lines[i])
+                i += 1
+            statements.append(f"DROP TABLE IF EXISTS `{table}`;")
+            statements.extend(_create_table(table, body))
+        elif with_data and line.startswith("INSERT INTO "):
+            statements.append(_mysql_literals(line))
+        i += 1
+    return statements
+
+_ALTER = re.compile(r"^ALTER TABLE `?(\w+)`?\s+(.*)$", re.I | re.S)
+_CREATE = re.compile(r"^CREATE TABLE (?:IF NOT EXISTS )?`?(\w+)`?\s*\((.*)\)[^)]*$", re.I | re.S)
+_ADD_COLUMN = re.compile(r"^ADD (?:COLUMN )?`(\w+)`\s+(.*)$", re.I | re.S)
+_ADD_KEY = re.compile(r"^ADD (UNIQUE )?(?:KEY|INDEX) `(\w+)`\s*\((.*)\)$", re.I | re.S)
+_DROP_KEY = re.compile(r"^DROP (?:KEY|INDEX) `(\w+)`$", re.I)
+
+def _clauses(text):
+    # Separar "ADD ..., ADD ..." por las comas que no están entre paréntesis
+    parts, depth, current = [], 0, []
+    for ch in text:
+        if ch == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        depth += (ch == "(") - (ch == ")")
+        current.append(ch)
+    parts.append("".join(current).strip())
+    return [p for p in parts if p]
+
+def translate_migration(statement):
+    """Traducir una sentencia de migrations/*.sql. Devuelve la lista de sentencias de SQLite.
+
+    Cubre CREATE TABLE, ALTER TABLE ADD COLUMN / ADD KEY / DROP KEY (un ALTER por
+    cláusula, índices con el nombre table_name como en translate_schema y con
+    IF [NOT] EXISTS); el resto (INSERT, UPDATE) pasa sin cambios y lo traduce el cursor.
+    """
+    statement = statement.strip().rstrip(";")
+    m = _CREATE.match(statement)
+    if m:
+        table, body = m.groups()
+        statements = _create_table(table, [line + "," for line in _clauses(body)])
+        return [s.replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS ", 1)
+                 .replace("INDEX `", "INDEX IF NOT EXISTS `", 1) for s in statements]
+    m = _ALTER.match(statement)
+    if not m:
+        return [statement]
+    table, rest = m.groups()
+    statements = []
+    for clause in _clauses(rest):
+        add_column = _ADD_COLUMN.match(clause)
+        add_key = _ADD_KEY.match(clause)
+        drop_key = _DROP_KEY.match(clause)
+        if add_key:
+            unique, name, cols = add_key.groups()
+            statements.append(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS "
+                              f"`{table}_{name}` ON `{table}` ({cols})")
+        elif drop_key:
+            statements.append(f"DROP INDEX IF EXISTS `{table}_{drop_key.group(1)}`")
+        elif add_column:
+            statements.append(f"ALTER TABLE `{table}` ADD COLUMN `{add_column.group(1)}` "
+                              f"{_column_type(add_column.group(2))}")
+        else:
+            raise ValueError(f"ALTER TABLE no soportado en SQLite: {clause}")
+    return statements
+
+def init_database(path, schema_path, with_data=True, log=print):
+    with open(schema_path, encoding="utf-8") as f:
+        statements = translate_schema(f.read(), with_data)
+    conn = connect(path)
+    raw = conn._raw
+    try:
+        # mysqldump inserta en orden alfabético: las claves foráneas se activan al final
+        raw.execute("PRAGMA foreign_keys=OFF")
+        raw.execute("BEGIN")
+        for statement in statements:
+            raw.execute(statement)
+        raw.commit()
+        raw.execute("PRAGMA foreign_keys=ON")
+        problems = raw.execute("PRAGMA foreign_key_check").fetchall()
+        if problems:
+            log(f"Advertencia: {len(problems)} filas con claves foráneas inválidas")
+    finally:
+        conn.close()
+    log(f"Base SQLite creada en {path} ({len(statements)} sentencias)")
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Crear la base SQLite a partir de DB.sql")
+    parser.add_argument("--init", action="store_true", help="crear (o recrear) las tablas")
+    parser.add_argument("--path", default=os.getenv("DB_SQLITE_PATH", os.path.join(here, "braille.db")))
+    parser.add_argument("--schema", default=os.path.join(here, "DB.sql"))
+    parser.add_argument("--no-data", action="store_true", help="solo el esquema, sin los datos de DB.sql")
+    args = parser.parse_args()
+    if not args.init:
+        parser.print_help()
+    else:
+        init_database(args.path, args.schema, not args.no_data)
@@ -0,0 +1,547 @@
+"""Gateway asyncio de los dispositivos Braille (ESP32) en el puerto 5004.
+
+    python device_gateway.py [--port 5004] [--fake 3] [--fake-serial 1]
+
+Implementa la API que usa deviceService en el frontend (/api/device_status,
+/api/estado, /api/toggle/<punto>, /api/letra, /api/clear) y además un canal
+WebSocket persistente, /ws?device=<nombre>, con tramas binarias que llevan la
+celda de 6 puntos entera o una palabra de varias celdas.
+
+Los dispositivos se configuran en BRAILLE_DEVICES como nombre=url separados por
+comas; sin ?device=<nombre> las rutas usan el primero:
+
+    BRAILLE_DEVICES="esp32=tcp://192.168.4.1:3333,aula2=serial:///dev/ttyUSB0?baud=115200"
+
+Cada dispositivo tiene un enlace propio (TCP o puerto serie) que se abre cuando
+hace falta y se vuelve a abrir después de un error, y un lock: hay una sola
+trama en vuelo por dispositivo y muchos dispositivos en paralelo en el mismo
+loop. Los toggles se agrupan: los que llegan dentro de DEVICE_COALESCE_MS, o
+mientras hay una trama en vuelo, se mandan como una sola celda con el estado
+final y todos los requests esperan esa misma confirmación.
+
+Una celda es un byte con un bit por punto (bit 0 = punto 1 ... bit 5 = punto 6).
+Tramas del cliente WebSocket (y del gateway al dispositivo, salvo TOGGLE):
+
+    0x00                     PING
+    0x01 celda               CELL: mostrar una celda
+    0x02 n celda*n           WORD: mostrar una palabra de n celdas
+    0x03 punto               TOGGLE: invertir un punto (0-5) de la primera celda
+    0x04                     CLEAR
+
+El dispositivo contesta cada trama con 0x06 celda (ACK, con la primera celda que
+muestra) o 0x15 código (NAK). El gateway manda a todos los WebSocket del
+dispositivo 0x81 n celda*n cada vez que el dispositivo confirma un cambio, y
+0xFF mensaje (UTF-8) si algo falla.
+
+--fake y --fake-serial levantan dispositivos simulados (FakeDevice) por TCP y
+por pseudo-terminal, para probar sin el hardware.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+
+DEVICE_GATEWAY_HOST = os.getenv("DEVICE_GATEWAY_HOST", "0.0.0.0")
+DEVICE_GATEWAY_PORT = int(os.getenv("DEVICE_GATEWAY_PORT", 5004))
+BRAILLE_DEVICES = os.getenv("BRAILLE_DEVICES", "esp32=tcp://192.168.4.1:3333")
+DEVICE_COALESCE_MS = int(os.getenv("DEVICE_COALESCE_MS", 25))
+DEVICE_TIMEOUT_S = float(os.getenv("DEVICE_TIMEOUT_S", 2))
+DEVICE_WORD_MAX = int(os.getenv("DEVICE_WORD_MAX", 40))
+CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
+
+OP_PING, OP_CELL, OP_WORD, OP_TOGGLE, OP_CLEAR = 0x00, 0x01, 0x02, 0x03, 0x04
+OP_ACK, OP_NAK = 0x06, 0x15
+OP_STATE, OP_ERROR = 0x81, 0xFF
+DOTS = 6
+CELL_MASK = (1 << DOTS) - 1
+
+# Puntos de cada letra (braille español; la Ñ no está en el rango A-Z del frontend)
+LETTER_DOTS = {
+    "A": "1", "B": "12", "C": "14", "D": "145", "E": "15", "F": "124", "G": "1245",
+    "H": "125", "I": "24", "J": "245", "K": "13", "L": "123", "M": "134", "N": "1345",
+    "Ñ": "12456", "O": "135", "P": "1234", "Q": "12345", "R": "1235", "S": "234",
+    "T": "2345", "U": "136", "V": "1236", "W": "2456", "X": "1346", "Y": "13456", "Z": "1356",
+}
+LETTERS = {letter: sum(1 << (int(d) - 1) for d in dots) for letter, dots in LETTER_DOTS.items()}
+
+class DeviceError(Exception):
+    pass
+
+def estados(cell):
+    """Celda como la lista de 6 booleanos que usa el frontend"""
+    return [bool(cell >> i & 1) for i in range(DOTS)]
+
+def parse_frame(data):
+    """Trama del cliente -> (op, argumento). Lanza ValueError si no es válida."""
+    if not data:
+        raise ValueError("Trama vacía")
+    op, body = data[0], data[1:]
+    if op in (OP_PING, OP_CLEAR) and not body:
+        return op, None
+    if op == OP_CELL and len(body) == 1 and body[0] <= CELL_MASK:
+        return op, [body[0]]
+    if op == OP_TOGGLE and len(body) == 1 and body[0] < DOTS:
+        return op, body[0]
+    if op == OP_WORD and body and 0 < body[0] <= DEVICE_WORD_MAX and len(body) == body[0] + 1:
+        cells = list(body[1:])
+        if all(cell <= CELL_MASK for cell in cells):
+            return op, cells
+    raise ValueError(f"Trama inválida (op 0x{op:02x}, {len(body)} bytes)")
+
+def encode_cells(cells):
+    """Trama CELL o WORD para el dispositivo"""
+    if len(cells) == 1:
+        return bytes((OP_CELL, cells[0]))
+    return bytes((OP_WORD, len(cells), *cells))
+
+def state_frame(cells):
+    return bytes((OP_STATE, len(cells), *cells))
+
+def error_frame(message):
+    return bytes((OP_ERROR,)) + str(message).encode("utf-8")[:250]
+
+async def _open_serial(path, baud):
+    """Puerto serie como par de streams, sin pyserial (termios en modo raw)"""
+    import termios
+    import tty
+
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    try:
+        try:
+            tty.setraw(fd)
+        except termios.error as e:
+            # No es una terminal (termios.error no hereda de OSError)
+            raise DeviceError(f"No se pudo configurar el puerto serie {path}: {e}")
+        speed = getattr(termios, f"B{baud}", None)
+        if speed is None:
+            raise DeviceError(f"Velocidad no soportada: {baud}")
+        attrs = termios.tcgetattr(fd)
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+        write_fd = os.dup(fd)
+    except BaseException:
+        os.close(fd)
+        raise
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), open(fd, "rb", buffering=0))
+    transport, protocol = await loop.connect_write_pipe(
+        lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()), open(write_fd, "wb", buffering=0))
+    return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+
+class Device:
+    """Un dispositivo: su enlace, la celda confirmada y la tanda de cambios pendiente"""
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url
+        self.cells = [0]          # lo último que confirmó el dispositivo
+        self.desired = None       # celdas de la tanda pendiente
+        self.sending = None       # celdas de la trama en vuelo
+        self.pending = None       # future que resuelven todos los requests de la tanda
+        self.reader = self.writer = None
+        self.lock = asyncio.Lock()
+        self.watchers = set()     # WebSockets abiertos de este dispositivo
+        self.error = None
+        self.latency_ms = None
+        self.stats = {"writes": 0, "frames": 0, "errors": 0, "reconnects": 0}
+
+    @property
+    def connected(self):
+        return self.writer is not None
+
+    async def _connect(self):
+        # Con el lock tomado
+        try:
+            parts = urlsplit(self.url)
+            if parts.scheme == "tcp":
+                opening = asyncio.open_connection(parts.hostname, parts.port)
+            elif parts.scheme == "serial":
+                baud = int(parse_qs(parts.query).get("baud", ["115200"])[0])
+                opening = _open_serial(parts.path, baud)
+            else:
+                raise DeviceError(f"URL de dispositivo no soportada: {self.url}")
+        except ValueError as e:
+            # Puerto o velocidad que no son números
+            raise DeviceError(f"URL de dispositivo inválida {self.url}: {e}")
+        try:
+            self.reader, self.writer = await asyncio.wait_for(opening, DEVICE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            raise DeviceError("Tiempo de espera agotado al conectar")
+        except OSError as e:
+            raise DeviceError(f"No se pudo conectar: {e}")
+        self.stats["reconnects"] += 1
+        # Al conectar se lee lo que muestra el dispositivo
+        self.cells = [await self._send(bytes((OP_PING,)), retry=False)]
+
+    def _close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def _send(self, frame, retry=True):
+        """Mandar una trama y esperar el ACK (con el lock tomado). Devuelve la celda del ACK."""
+        if self.writer is None:
+            await self._connect()
+            retry = False
+        try:
+            started = time.perf_counter()
+            self.writer.write(frame)
+            await self.writer.drain()
+            reply = await asyncio.wait_for(self.reader.readexactly(2), DEVICE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            self._close()
+            raise DeviceError("El dispositivo no respondió")
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self._close()
+            if retry:
+                # El enlace se cortó mientras estaba ocioso: las tramas llevan el estado
+                # entero, así que reconectar y repetirla no cambia el resultado
+                return await self._send(frame, retry=False)
+            raise DeviceError(f"Se perdió la conexión: {e or 'cerrada'}")
+        self.stats["frames"] += 1
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        if reply[0] == OP_NAK:
+            raise DeviceError(f"El dispositivo rechazó la trama (código {reply[1]})")
+        if reply[0] != OP_ACK:
+            self._close()
+            raise DeviceError(f"Respuesta inesperada: {reply.hex()}")
+        return reply[1] & CELL_MASK
+
+    async def ping(self):
+        """Estado de la conexión (abre el enlace si hace falta)"""
+        async with self.lock:
+            try:
+                cell = await self._send(bytes((OP_PING,)))
+                if self.sending is None and self.desired is None:
+                    self.cells[0] = cell
+                self.error = None
+            except Exception as e:
+                # Cualquier falla del enlace es "no conectado", no un 500
+                self._close()
+                self.error = str(e) or type(e).__name__
+                self.stats["errors"] += 1
+        return self.error is None
+
+    def _base(self):
+        if self.desired is not None:
+            return self.desired
+        return self.sending if self.sending is not None else self.cells
+
+    async def write(self, cells, coalesce_ms=0):
+        """Sumar un estado a la tanda pendiente y esperar a que el dispositivo lo confirme"""
+        self.desired = list(cells)
+        self.stats["writes"] += 1
+        pending = self.pending
+        if pending is None:
+            pending = self.pending = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._flush(coalesce_ms / 1000))
+        # shield: si un request se cancela, la tanda se manda igual para los demás
+        return await asyncio.shield(pending)
+
+    async def toggle(self, dot):
+        base = self._base()
+        return await self.write([base[0] ^ (1 << dot)] + base[1:], DEVICE_COALESCE_MS)
+
+    async def _flush(self, delay):
+        if delay:
+            await asyncio.sleep(delay)
+        async with self.lock:
+            # Lo que llegó hasta ahora (incluido lo que esperó la trama anterior) va junto
+            cells, pending = self.desired, self.pending
+            self.desired = self.pending = None
+            self.sending = cells
+            try:
+                cells[0] = await self._send(encode_cells(cells))
+            except Exception as e:
+                # Los que esperan la tanda tienen que enterarse siempre: un error que no
+                # sea DeviceError también se entrega como DeviceError (503)
+                if not isinstance(e, DeviceError):
+                    self._close()
+                    e = DeviceError(f"Error del enlace: {e or type(e).__name__}")
+                self.error = str(e)
+                self.stats["errors"] += 1
+                pending.set_exception(e)
+                await self._broadcast(error_frame(e))
+                return
+            finally:
+                self.sending = None
+            self.cells = cells
+            self.error = None
+            pending.set_result(list(cells))
+            # Dentro del lock: los clientes reciben los estados en el orden del dispositivo
+            await self._broadcast(state_frame(cells))
+
+    async def _broadcast(self, frame):
+        watchers = list(self.watchers)
+        if not watchers:
+            return
+        results = await asyncio.gather(
+            *(asyncio.wait_for(ws.send_bytes(frame), DEVICE_TIMEOUT_S) for ws in watchers),
+            return_exceptions=True)
+        for ws, result in zip(watchers, results):
+            if isinstance(result, BaseException):
+                self.watchers.discard(ws)
+
+    async def close(self):
+        async with self.lock:
+            self._close()
+
+    def info(self):
+        return dict(self.stats, name=self.name, url=self.url, conectado=self.connected,
+                    estados=estados(self.cells[0]), celdas=list(self.cells),
+                    tiempo_respuesta_ms=self.latency_ms, error=self.error, websockets=len(self.watchers))
+
+def parse_devices(spec):
+    devices = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, url = item.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"BRAILLE_DEVICES: se esperaba nombre=url, no {item!r}")
+        devices[name.strip()] = Device(name.strip(), url.strip())
+    return devices
+
+class FakeDevice:
+    """Dispositivo simulado que habla el protocolo de tramas (para pruebas sin hardware)"""
+
+    def __init__(self, delay_ms=0):
+        self.delay = delay_ms / 1000
+        self.cells = [0]
+        self.frames = 0
+        self.server = None
+        self.slaves = []
+        self.tasks = set()
+
+    async def _reply(self, reader, writer):
+        op = (await reader.readexactly(1))[0]
+        if op == OP_CELL:
+            self.cells = list(await reader.readexactly(1))
+        elif op == OP_WORD:
+            n = (await reader.readexactly(1))[0]
+            self.cells = list(await reader.readexactly(n))
+        elif op != OP_PING:
+            writer.write(bytes((OP_NAK, op)))
+            return
+        self.frames += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        writer.write(bytes((OP_ACK, self.cells[0] if self.cells else 0)))
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                await self._reply(reader, writer)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_tcp(self, host="127.0.0.1", port=0):
+        """Escuchar por TCP; devuelve la URL para BRAILLE_DEVICES"""
+        self.server = await asyncio.start_server(self.handle, host, port)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"tcp://{host}:{port}"
+
+    async def serve_pty(self):
+        """Atender en un pseudo-terminal; devuelve la URL serial:// del lado esclavo"""
+        import pty
+        import tty
+
+        master, slave = pty.openpty()
+        tty.setraw(master)
+        path = os.ttyname(slave)
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), open(master, "rb", buffering=0))
+        transport, protocol = await loop.connect_write_pipe(
+            lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()), open(os.dup(master), "wb", buffering=0))
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        # El esclavo queda abierto: si no, el maestro lee EOF entre conexiones
+        self.slaves.append(slave)
+        task = asyncio.create_task(self.handle(reader, writer))
+        self.tasks.add(task)
+        return f"serial://{path}?baud=115200"
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+        for task in self.tasks:
+            task.cancel()
+        for slave in self.slaves:
+            os.close(slave)
+
+def _device(request_or_ws):
+    devices = request_or_ws.app.state.devices
+    name = request_or_ws.query_params.get("device")
+    if name is None:
+        return next(iter(devices.values()), None)
+    return devices.get(name)
+
+def _not_found():
+    return JSONResponse({"error": "Dispositivo no encontrado"}, status_code=404)
+
+def _unavailable(e):
+    return JSONResponse({"error": str(e)}, status_code=503)
+
+async def device_status(request):
+    device = _device(request)
+    if device is None:
+        return _not_found()
+    if await device.ping():
+        return JSONResponse({"conectado": True, "tiempo_respuesta_ms": device.latency_ms, "dispositivo": device.name})
+    return JSONResponse({"conectado": False, "error": device.error, "dispositivo": device.name})
+
+async def estado(request):
+    device = _device(request)
+    if device is None:
+        return _not_found()
+    return JSONResponse({"estados": estados(device.cells[0]), "celdas": list(device.cells)})
+
+async def toggle(request):
+    device = _device(request)
+    if device is None:
+        return _not_found()
+    punto = request.path_params["punto"]
+    if punto >= DOTS:
+        return JSONResponse({"error": f"Punto inválido: {punto}"}, status_code=400)
+    try:
+        cells = await device.toggle(punto)
+    except DeviceError as e:
+        return _unavailable(e)
+    return JSONResponse({"punto": punto, "estado": bool(cells[0] >> punto & 1), "estados": estados(cells[0])})
+
+async def letra(request):
+    device = _device(request)
+    if device is None:
+        return _not_found()
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    letter = str((data or {}).get("letra") or "").strip().upper()
+    if letter not in LETTERS:
+        return JSONResponse({"error": "Letra inválida"}, status_code=400)
+    try:
+        cells = await device.write([LETTERS[letter]])
+    except DeviceError as e:
+        return _unavailable(e)
+    return JSONResponse({"letra": letter, "estados": estados(cells[0])})
+
+async def clear(request):
+    device = _device(request)
+    if device is None:
+        return _not_found()
+    try:
+        cells = await device.write([0])
+    except DeviceError as e:
+        return _unavailable(e)
+    return JSONResponse({"estados": estados(cells[0])})
+
+async def devices_info(request):
+    return JSONResponse({"devices": [device.info() for device in request.app.state.devices.values()]})
+
+async def _apply(device, websocket, op, arg):
+    try:
+        if op == OP_TOGGLE:
+            await device.toggle(arg)
+        elif op == OP_CLEAR:
+            await device.write([0])
+        elif op == OP_PING:
+            await device.ping()
+            await websocket.send_bytes(state_frame(device.cells))
+        else:
+            await device.write(arg)
+    except DeviceError:
+        pass  # _flush ya avisó a todos los WebSocket del dispositivo
+    except Exception as e:
+        print(f"device_gateway: error en WebSocket de {device.name}: {e}")
+
+async def device_socket(websocket):
+    device = _device(websocket)
+    if device is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    device.watchers.add(websocket)
+    tasks = set()
+    try:
+        await websocket.send_bytes(state_frame(device.cells))
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None:
+                await websocket.send_bytes(error_frame("Solo se aceptan tramas binarias"))
+                continue
+            try:
+                op, arg = parse_frame(data)
+            except ValueError as e:
+                await websocket.send_bytes(error_frame(e))
+                continue
+            # Sin esperar la confirmación: los toggles seguidos del mismo cliente se agrupan
+            task = asyncio.create_task(_apply(device, websocket, op, arg))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        device.watchers.discard(websocket)
+
+def create_app(devices=None, fakes=0, fake_serial=0):
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        simulated = []
+        for kind, count in (("tcp", fakes), ("serial", fake_serial)):
+            for _ in range(count):
+                fake = FakeDevice()
+                url = await (fake.serve_tcp() if kind == "tcp" else fake.serve_pty())
+                name = f"fake{len(simulated) + 1}"
+                app.state.devices[name] = Device(name, url)
+                simulated.append(fake)
+        try:
+            yield
+        finally:
+            for device in app.state.devices.values():
+                await device.close()
+            for fake in simulated:
+                await fake.close()
+
+    app = Starlette(
+        routes=[
+            Route("/api/device_status", device_status),
+            Route("/api/estado", estado),
+            Route("/api/toggle/{punto:int}", toggle),
+            Route("/api/letra", letra, methods=["POST"]),
+            Route("/api/clear", clear),
+            Route("/api/devices", devices_info),
+            WebSocketRoute("/ws", device_socket),
+        ],
+        middleware=[Middleware(CORSMiddleware, allow_origins=CORS_ORIGINS, allow_methods=["*"],
+                               allow_headers=["*"])],
+        lifespan=lifespan,
+    )
+    app.state.devices = parse_devices(BRAILLE_DEVICES) if devices is None else devices
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Gateway de dispositivos Braille")
+    parser.add_argument("--host", default=DEVICE_GATEWAY_HOST)
+    parser.add_argument("--port", type=int, default=DEVICE_GATEWAY_PORT)
+    parser.add_argument("--fake", type=int, default=0, help="Dispositivos simulados por TCP")
+    parser.add_argument("--fake-serial", type=int, default=0, help="Dispositivos simulados por pseudo-terminal")
+    args = parser.parse_args()
+
+    devices = {} if args.fake or args.fake_serial else None
+    app = create_app(devices, args.fake, args.fake_serial)
+    print(f"🔌 Device Gateway running on http://localhost:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,29 @@
+"""GET condicional (ETag / 304) para los endpoints que el frontend consulta seguido.
+
+El ETag se arma con contadores baratos (cache_versions, versión de la lección,
+marcadores por estudiante) que se leen antes de la consulta pesada; si el
+cliente ya tiene esa versión se responde 304 sin ejecutarla.
+"""
+import hashlib
+
+from flask import request, Response
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:24]
+
+def not_modified(etag):
+    """Respuesta 304 si If-None-Match coincide con etag, si no None"""
+    if not request.if_none_match.contains(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def tagged(response, etag):
+    """Agregar ETag a una respuesta (o a una tupla (respuesta, status))"""
+    target = response[0] if isinstance(response, tuple) else response
+    target.set_etag(etag)
+    # El navegador guarda la respuesta pero la revalida en cada uso
+    target.headers["Cache-Control"] = "no-cache"
+    return response
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Users, Search, Filter, TrendingUp } from 'lucide-react';
 import './StudentsView.css';
 
@@ -8,14 +8,53 @@ const StudentsView = () => {
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedClass, setSelectedClass] = useState(null);
+  const [live, setLive] = useState({});
+  const reloadTimer = useRef(null);
 
   useEffect(() => {
     loadClasses();
   }, []);
 
-  const loadClasses = async () => {
+  // Progreso en vivo: el servidor agrupa las respuestas de cada estudiante por intervalo
+  useEffect(() => {
+    const userData = JSON.parse(localStorage.getItem('userData'));
+    const teacherId = userData?.id;
+    if (!teacherId) return;
+
+    const source = new EventSource(`http://localhost:5002/api/teacher/classes/${teacherId}/events`);
+    source.addEventListener('progress', (e) => {
+      const event = JSON.parse(e.data);
+      setLive(prev => {
+        const current = prev[event.student_id] || { attempts: 0, corrects: 0 };
+        return {
+          ...prev,
+          [event.student_id]: {
+            attempts: current.attempts + event.attempts,
+            corrects: current.corrects + event.corrects,
+            step: event.current_step,
+            finished: event.finished
+          }
+        };
+      });
+      // Lecciones completadas y puntos salen del resumen: recargar una sola vez por ráfaga
+      if (event.finished) scheduleReload();
+    });
+    source.addEventListener('resync', () => scheduleReload());
+
+    return () => {
+      source.close();
+      clearTimeout(reloadTimer.current);
+    };
+  }, []);
+
+  const scheduleReload = () => {
+    clearTimeout(reloadTimer.current);
+    reloadTimer.current = setTimeout(() => loadClasses(false), 2000);
+  };
+
+  const loadClasses = async (showSpinner = true) => {
     try {
-      setLoading(true);
+      if (showSpinner) setLoading(true);
       const userData = JSON.parse(localStorage.getItem('userData'));
       const teacherId = userData?.id;
       
@@ -154,6 +193,12 @@ const StudentsView = () => {
                       </div>
                     </div>
 
+                    {live[student.id] && !live[student.id].finished && (
+                      <p className="student-live">
+                        En vivo: paso {live[student.id].step + 1} · {live[student.id].corrects}/{live[student.id].attempts} aciertos
+                      </p>
+                    )}
+
                     <div className="student-actions">
                       <button className="btn btn-primary">
                         Ver Detalles
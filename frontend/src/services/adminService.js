@@ -37,6 +37,24 @@ async function fetchAPI(endpoint, options = {}) {
   return handleResponse(response);
 }
 
+/**
+ * Recorrer un listado paginado por id (/admin/users, /admin/devices, /admin/classes)
+ * siguiendo next_after hasta la última página
+ * @param {string} endpoint - Ruta con sus filtros, p. ej. '/admin/users?role=student'
+ */
+async function fetchAllPages(endpoint, limit = 500) {
+  const items = [];
+  const separator = endpoint.includes('?') ? '&' : '?';
+  let after = null;
+  do {
+    const cursor = after !== null ? `&after=${encodeURIComponent(after)}` : '';
+    const page = await fetchAPI(`${endpoint}${separator}limit=${limit}${cursor}`);
+    items.push(...page.items);
+    after = page.next_after;
+  } while (after !== null && after !== undefined);
+  return items;
+}
+
 // ===========================
 // GESTIÓN DE LECCIONES/CLASES
 // ===========================
@@ -46,12 +64,12 @@ export const classesAPI = {
    * Obtener todas las lecciones/clases con profesores y estudiantes
    */
   getAll: async () => {
-    const data = await fetchAPI('/admin');
-    return {
-      classes: data.classes || [],
-      teachers: data.teachers || [],
-      students: data.students || []
-    };
+    const [classes, teachers, students] = await Promise.all([
+      fetchAllPages('/admin/classes?fields=id,name,teacher_id,teacher_name,students_count&order=desc'),
+      fetchAllPages('/admin/users?role=teacher'),
+      fetchAllPages('/admin/users?role=student')
+    ]);
+    return { classes, teachers, students };
   },
 
   /**
@@ -131,10 +149,10 @@ export const usersAPI = {
    * @param {string} role - 'teacher', 'student', o 'admin'
    */
   getByRole: async (role) => {
-    const data = await fetchAPI('/admin');
-    if (role === 'teacher') return data.teachers || [];
-    if (role === 'student') return data.students || [];
-    return data.users || [];
+    if (role === 'teacher' || role === 'student') {
+      return fetchAllPages(`/admin/users?role=${role}`);
+    }
+    return fetchAllPages('/admin/users?order=desc');
   },
 
   /**
@@ -229,8 +247,7 @@ export const devicesAPI = {
    * Obtener todos los dispositivos
    */
   getAll: async () => {
-    const data = await fetchAPI('/admin');
-    return data.devices || [];
+    return fetchAllPages('/admin/devices');
   }
 };
 
@@ -1,5 +1,5 @@
 const API_BASE_URL = 'http://127.0.0.1:8000/api';
-const DEVICES_BASE_URL = 'http://localhost:5004'; // Backend de dispositivos (Flask)
+const DEVICES_BASE_URL = 'http://localhost:5004'; // Gateway de dispositivos (device_gateway.py)
 
 export const checkBackendConnection = async () => {
   try {
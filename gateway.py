@@ -0,0 +1,137 @@
+"""Gateway ASGI opcional: los tres servicios Flask y el user_service de FastAPI
+en un solo proceso.
+
+    python gateway.py [--port 8080] [--workers 4]
+    uvicorn gateway:app --port 8080 --workers 4
+
+Las rutas de FastAPI (/api/login/, /api/usuarios/...) se resuelven primero y
+todo lo demás pasa a la app Flask con los blueprints de admin, teacher y
+student. Cada worker tiene un solo pool de conexiones (db.pool, que también usa
+SQLAlchemy), una sola caché de lecciones y una de usuarios; los cambios de
+usuarios hechos desde admin invalidan la caché de tokens en el mismo proceso.
+
+La escritura diferida de intentos (ATTEMPT_WRITE_BEHIND) guarda el estado de
+las sesiones en memoria, por eso solo se permite con un worker. Los eventos en
+vivo para docentes (live_events.py) se entregan en memoria con un worker; con
+varios hace falta LIVE_EVENTS_BACKEND=db (u off). create_app() lo verifica con
+los workers pedidos (--workers de uvicorn o de este script, o WEB_CONCURRENCY),
+así que también vale para `uvicorn gateway:app --workers N`.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(ROOT, "backend")
+for path in (ROOT, BACKEND):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# user_service.database usa db.pool en lugar de crear su propio engine con pool
+os.environ.setdefault("USER_SERVICE_SHARED_POOL", "1")
+
+GATEWAY_HOST = os.getenv("GATEWAY_HOST", "0.0.0.0")
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", 8080))
+GATEWAY_WORKERS = int(os.getenv("GATEWAY_WORKERS", 1))
+# Hilos para los requests de Flask (el límite por defecto del threadpool de Starlette)
+GATEWAY_WSGI_THREADS = int(os.getenv("GATEWAY_WSGI_THREADS", 40))
+CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
+
+from flask import Flask
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from a2wsgi import WSGIMiddleware
+
+from db import init_db, init_app
+import attempt_writer
+import live_events
+import user_events
+from user_service import models, database, hashing, user_cache
+from user_service.routes import router
+
+def create_flask_app():
+    flask_app = Flask(__name__)
+    flask_app.config['SECRET_KEY'] = os.getenv("GATEWAY_SECRET_KEY", "gateway-secret-key")
+    init_app(flask_app)
+
+    from admin_views import admin_bp
+    from teacher_views import teacher_bp
+    from student_views import student_bp
+    flask_app.register_blueprint(admin_bp)
+    flask_app.register_blueprint(teacher_bp)
+    flask_app.register_blueprint(student_bp)
+    return flask_app
+
+def requested_workers():
+    """Workers pedidos: --workers en la línea de comandos (los workers de uvicorn la
+    heredan), WEB_CONCURRENCY (el valor por defecto de uvicorn) o GATEWAY_WORKERS"""
+    argv = sys.argv
+    for i, arg in enumerate(argv):
+        if arg == "--workers" and i + 1 < len(argv):
+            return int(argv[i + 1])
+        if arg.startswith("--workers="):
+            return int(arg.split("=", 1)[1])
+    return int(os.getenv("WEB_CONCURRENCY", GATEWAY_WORKERS))
+
+def check_workers(workers):
+    if workers <= 1:
+        return
+    if attempt_writer.ENABLED:
+        raise SystemExit("ATTEMPT_WRITE_BEHIND requiere un solo worker")
+    if live_events.LIVE_EVENTS_BACKEND == "memory":
+        raise SystemExit("Con varios workers los eventos en vivo necesitan LIVE_EVENTS_BACKEND=db (u off)")
+
+def create_app(workers=None):
+    check_workers(requested_workers() if workers is None else workers)
+    init_db()
+    models.Base.metadata.create_all(bind=database.engine)
+    user_events.subscribe(user_cache.invalidate)
+
+    app = FastAPI(title="Braille Gateway")
+
+    # CORS para todas las rutas, incluidas las de Flask (que aquí no usan flask_cors)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.get("/api/")
+    def api_root():
+        return {"message": "API funcionando correctamente"}
+
+    app.include_router(router, prefix="/api", tags=["Usuarios"])
+
+    @app.on_event("startup")
+    def startup_event():
+        if attempt_writer.ENABLED:
+            attempt_writer.start()
+
+    @app.on_event("shutdown")
+    def shutdown_event():
+        if attempt_writer.ENABLED:
+            attempt_writer.stop()
+        hashing.shutdown()
+
+    # Va al final: recibe todo lo que no resolvió FastAPI
+    app.mount("/", WSGIMiddleware(create_flask_app(), workers=GATEWAY_WSGI_THREADS))
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Gateway ASGI de los servicios")
+    parser.add_argument("--host", default=GATEWAY_HOST)
+    parser.add_argument("--port", type=int, default=GATEWAY_PORT)
+    parser.add_argument("--workers", type=int, default=GATEWAY_WORKERS)
+    args = parser.parse_args()
+
+    print(f"🚀 Gateway running on http://localhost:{args.port} ({args.workers} workers)")
+    if args.workers > 1:
+        uvicorn.run("gateway:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
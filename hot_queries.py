@@ -0,0 +1,62 @@
+"""Registro de consultas calientes y chequeo de sus planes con EXPLAIN.
+
+Las vistas registran al importarse las consultas que corren en cada request
+(register devuelve el mismo SQL, así la vista ejecuta exactamente lo
+registrado) junto con parámetros de ejemplo y las tablas (o alias) que tienen
+que resolverse con un índice. check() ejecuta EXPLAIN de cada una y reporta las
+que recorren alguna de esas tablas completa:
+
+    python migrate.py --check
+"""
+from db import DB_BACKEND
+
+HOT_QUERIES = {}
+
+def register(name, sql, params, tables):
+    HOT_QUERIES[name] = (sql, tuple(params), tuple(tables))
+    return sql
+
+def _load_views():
+    # Importar las vistas registra sus consultas
+    import student_views  # noqa: F401
+    import teacher_views  # noqa: F401
+
+def _full_scans(cursor, sql, params, tables):
+    """Tablas de `tables` que el plan recorre completas"""
+    scans = []
+    if DB_BACKEND == "sqlite":
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        for row in cursor.fetchall():
+            detail = row["detail"] if isinstance(row, dict) else row[-1]
+            words = detail.split()
+            # "SCAN s" o "SCAN s USING COVERING INDEX ..." recorren toda la tabla (o el índice)
+            if len(words) > 1 and words[0] == "SCAN" and words[1] in tables:
+                scans.append((words[1], detail))
+    else:
+        cursor.execute("EXPLAIN " + sql, params)
+        for row in cursor.fetchall():
+            # type ALL/index sin ningún índice aplicable: un plan barato en una tabla
+            # chica no cuenta, lo que falla es que no exista un índice que sirva
+            if row["table"] in tables and row["type"] in ("ALL", "index") and not row["possible_keys"]:
+                scans.append((row["table"], f"type={row['type']} key={row['key']} rows={row['rows']}"))
+    return scans
+
+def check(conn, log=print):
+    """EXPLAIN de todas las consultas registradas. Devuelve {nombre: [(tabla, detalle)]} con las que fallan."""
+    _load_views()
+    failures = {}
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for name, (sql, params, tables) in sorted(HOT_QUERIES.items()):
+            scans = _full_scans(cursor, sql, params, tables)
+            if scans:
+                failures[name] = scans
+                for table, detail in scans:
+                    log(f"FALLA {name}: recorre {table} completa ({detail})")
+            else:
+                log(f"ok    {name}")
+    finally:
+        cursor.close()
+        # EXPLAIN de un SELECT ... FOR UPDATE no bloquea, pero en SQLite abre la transacción
+        conn.rollback()
+    return failures
@@ -0,0 +1,274 @@
+"""Importación de estudiantes desde CSV en segundo plano.
+
+El CSV se copia a un archivo temporal y se procesa en un hilo por bloques de
+IMPORT_CHUNK_SIZE filas: una consulta por bloque para detectar usuarios
+existentes, hashes scrypt calculados en un pool de procesos (uno por núcleo)
+e INSERT multi-fila. El avance y los errores por fila se consultan con el id
+del job.
+
+El estado del job se guarda en la tabla import_jobs (después de cada bloque),
+así cualquier worker del servicio puede informarlo aunque el job corra en otro.
+Sin esa tabla (migración 010 sin aplicar) queda solo en memoria del proceso que
+lo corre y el servicio tiene que tener un único worker.
+"""
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from db import get_db_connection, has_table, insert_many
+from passwords import get_password_hash
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 500))
+IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", os.cpu_count() or 1))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 1000))
+IMPORT_JOBS_KEEP = int(os.getenv("IMPORT_JOBS_KEEP", 50))
+
+# created_at toma su DEFAULT CURRENT_TIMESTAMP
+USER_INSERT = "INSERT INTO users (username, full_name, role, password, active, CI) VALUES"
+JOB_INSERT = """
+    INSERT INTO import_jobs (id, status, row_count, imported, skipped, error_count, errors, started_at)
+    VALUES (%s, %s, 0, 0, 0, 0, '[]', %s)
+"""
+JOB_UPDATE = """
+    UPDATE import_jobs
+    SET status = %s, row_count = %s, imported = %s, skipped = %s, error_count = %s, errors = %s,
+        finished_at = %s
+    WHERE id = %s
+"""
+
+_jobs = OrderedDict()
+_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+def _hash_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn y no fork: el servidor ya tiene hilos (y locks tomados) al crear el pool
+            _executor = ProcessPoolExecutor(max_workers=IMPORT_HASH_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+def start(stream):
+    """Guardar el CSV recibido y lanzar el job. Devuelve el estado inicial."""
+    tmp = tempfile.NamedTemporaryFile(prefix="import_students_", suffix=".csv", delete=False)
+    with tmp:
+        shutil.copyfileobj(stream, tmp)
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "rows": 0,
+        "imported": 0,
+        "skipped": 0,
+        "errors": [],
+        "error_count": 0,
+        "started_at": time.time(),
+        "finished_at": None,
+    }
+    if has_table("import_jobs"):
+        try:
+            _insert(job)
+        except Exception:
+            os.unlink(tmp.name)
+            raise
+    with _lock:
+        _jobs[job["id"]] = job
+        while len(_jobs) > IMPORT_JOBS_KEEP:
+            _jobs.popitem(last=False)
+
+    threading.Thread(target=_run, args=(job, tmp.name), daemon=True).start()
+    return dict(job)
+
+def get(job_id):
+    # Los jobs de este proceso se leen de memoria (lo más reciente); los demás, de la base
+    with _lock:
+        job = _jobs.get(job_id)
+        if job:
+            return dict(job, errors=list(job["errors"]))
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if not has_table("import_jobs", cursor):
+            return None
+        cursor.execute("SELECT * FROM import_jobs WHERE id = %s", (job_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+    if not row:
+        return None
+    return {
+        "id": row["id"],
+        "status": row["status"],
+        "rows": row["row_count"],
+        "imported": row["imported"],
+        "skipped": row["skipped"],
+        "errors": json.loads(row["errors"] or "[]"),
+        "error_count": row["error_count"],
+        "started_at": row["started_at"] / 1000,
+        "finished_at": row["finished_at"] / 1000 if row["finished_at"] is not None else None,
+    }
+
+def _insert(job):
+    """Registrar el job y borrar los más viejos que los últimos IMPORT_JOBS_KEEP"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(JOB_INSERT, (job["id"], job["status"], int(job["started_at"] * 1000)))
+        cursor.execute("SELECT started_at FROM import_jobs ORDER BY started_at DESC LIMIT 1 OFFSET %s",
+                       (IMPORT_JOBS_KEEP - 1,))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute("DELETE FROM import_jobs WHERE started_at < %s AND status NOT IN ('queued', 'running')",
+                           (row[0],))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def _save(conn, job):
+    """Guardar el avance del job en import_jobs (en una transacción propia)"""
+    with _lock:
+        values = (job["status"], job["rows"], job["imported"], job["skipped"], job["error_count"],
+                  json.dumps(job["errors"]),
+                  int(job["finished_at"] * 1000) if job["finished_at"] is not None else None, job["id"])
+    cursor = conn.cursor()
+    try:
+        if not has_table("import_jobs", cursor):
+            return
+        cursor.execute(JOB_UPDATE, values)
+        conn.commit()
+    except Exception as e:
+        # El avance no guardado no frena la importación: se reintenta en el próximo bloque
+        print(f"import_jobs: no se pudo guardar el estado de {job['id']}: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+
+def _error(job, line, message):
+    with _lock:
+        job["error_count"] += 1
+        if len(job["errors"]) < IMPORT_MAX_ERRORS:
+            job["errors"].append({"row": line, "error": message})
+
+def _chunks(reader):
+    chunk = []
+    # La fila 1 es el encabezado
+    for line, row in enumerate(reader, start=2):
+        chunk.append((line, row))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _run(job, path):
+    job["status"] = "running"
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        _save(conn, job)
+        seen = set()
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for chunk in _chunks(csv.DictReader(f)):
+                _import_chunk(job, conn, chunk, seen)
+                _save(conn, job)
+        job["status"] = "done"
+    except Exception as e:
+        job["status"] = "failed"
+        _error(job, None, str(e))
+    finally:
+        job["finished_at"] = time.time()
+        if conn is None:
+            conn = get_db_connection()
+        if conn:
+            _save(conn, job)
+            conn.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+def _import_chunk(job, conn, chunk, seen):
+    candidates = []
+    for line, row in chunk:
+        username = (row.get('username') or "").strip()
+        full_name = (row.get('full_name') or "").strip()
+        ci = (row.get('ci') or "").strip() or None
+        password = row.get('password') or "password"
+        if not username:
+            job["skipped"] += 1
+            _error(job, line, "username vacío")
+            continue
+        if username in seen:
+            job["skipped"] += 1
+            _error(job, line, f"username '{username}' repetido en el archivo")
+            continue
+        if ci is not None and not ci.isdigit():
+            job["skipped"] += 1
+            _error(job, line, f"CI inválido '{ci}'")
+            continue
+        seen.add(username)
+        candidates.append((line, username, full_name, password, ci))
+    job["rows"] += len(chunk)
+    if not candidates:
+        return
+
+    # Una sola consulta por bloque para descartar los que ya existen
+    cursor = conn.cursor()
+    usernames = [c[1] for c in candidates]
+    cursor.execute(
+        "SELECT username FROM users WHERE username IN (%s)" % ", ".join(["%s"] * len(usernames)),
+        usernames
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    job["skipped"] += sum(1 for c in candidates if c[1] in existing)
+    candidates = [c for c in candidates if c[1] not in existing]
+    if not candidates:
+        cursor.close()
+        return
+
+    hashes = list(_hash_pool().map(
+        get_password_hash,
+        [c[3] for c in candidates],
+        chunksize=max(1, len(candidates) // (IMPORT_HASH_WORKERS * 4))
+    ))
+    rows = [
+        (username, full_name, 'student', pwd, 1, ci)
+        for (line, username, full_name, _, ci), pwd in zip(candidates, hashes)
+    ]
+
+    try:
+        insert_many(cursor, USER_INSERT, rows)
+        conn.commit()
+        job["imported"] += len(rows)
+    except Exception:
+        # Si falla el bloque, insertar fila por fila para aislar los errores
+        conn.rollback()
+        for (line, *_), row in zip(candidates, rows):
+            try:
+                insert_many(cursor, USER_INSERT, [row])
+                conn.commit()
+                job["imported"] += 1
+            except Exception as e:
+                conn.rollback()
+                job["skipped"] += 1
+                _error(job, line, str(e))
+    finally:
+        cursor.close()
@@ -0,0 +1,181 @@
+"""Importación y exportación masiva de lecciones.
+
+Un bundle es una lista de lecciones, cada una con sus pasos:
+
+    {"id": "ef2b0d3f", "title": "...", "description": "...", "difficulty": "beginner",
+     "order_index": 0, "active": 1,
+     "steps": [{"type": "input", "target": "A", "prompt": "...", "hint": "...", "max_attempts": 3}]}
+
+Se acepta como JSON ({"lessons": [...]} o directamente la lista) o como NDJSON
+(una lección por línea). "id" es opcional: si falta se genera uno nuevo, si
+existe la lección se reemplaza junto con sus pasos.
+"""
+import json
+import os
+import uuid
+
+from db import insert_many, bump_version
+import lesson_cache
+import assignments
+
+LESSON_IMPORT_CHUNK = int(os.getenv("LESSON_IMPORT_CHUNK", 100))
+LESSON_EXPORT_CHUNK = int(os.getenv("LESSON_EXPORT_CHUNK", 200))
+
+DIFFICULTIES = ("beginner", "intermediate", "advanced")
+STEP_COLUMNS = "(lesson_id, step_index, type, target, prompt, hint, max_attempts)"
+
+def new_lesson_id():
+    # 8 caracteres alfanuméricos, igual que la creación individual
+    return str(uuid.uuid4()).replace('-', '')[:8]
+
+def step_rows(lesson_id, steps):
+    return [
+        (
+            lesson_id,
+            idx,
+            step.get("type", "input"),
+            (step.get("target") or "").strip(),
+            (step.get("prompt") or "").strip(),
+            (step.get("hint") or "").strip(),
+            step.get("max_attempts", 3)
+        )
+        for idx, step in enumerate(steps)
+    ]
+
+def insert_steps(cursor, rows):
+    """Insertar los pasos de una o varias lecciones con INSERT multi-fila"""
+    return insert_many(cursor, f"INSERT INTO lesson_steps {STEP_COLUMNS} VALUES", rows)
+
+def parse_bundle(body, fmt="json"):
+    """Convertir el cuerpo recibido (JSON o NDJSON) en una lista de lecciones (dicts)"""
+    text = body.decode("utf-8") if isinstance(body, bytes) else body
+    if fmt == "ndjson":
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("lessons", [])
+    if not isinstance(data, list):
+        raise ValueError("El bundle debe ser una lista de lecciones")
+    return data
+
+def _validate(index, data):
+    if not isinstance(data, dict):
+        raise ValueError(f"Lección {index + 1}: formato inválido")
+    title = (data.get("title") or "").strip()
+    steps = data.get("steps") or []
+    if not title:
+        raise ValueError(f"Lección {index + 1}: el título es requerido")
+    if not steps:
+        raise ValueError(f"Lección {index + 1}: debe tener al menos un paso")
+    difficulty = data.get("difficulty") or "beginner"
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"Lección {index + 1}: dificultad inválida '{difficulty}'")
+    lesson_id = str(data.get("id") or new_lesson_id())
+    rows = step_rows(lesson_id, steps)
+    for row in rows:
+        if not row[3] or not row[4]:
+            raise ValueError(f"Lección {index + 1}: el paso {row[1] + 1} necesita 'target' y 'prompt'")
+    lesson = (
+        lesson_id,
+        title,
+        (data.get("description") or "").strip(),
+        difficulty,
+        data.get("order_index", 0),
+        1 if data.get("active", 1) else 0
+    )
+    return lesson, rows
+
+def import_lessons(conn, lessons, chunk_size=LESSON_IMPORT_CHUNK):
+    """Importar lecciones en transacciones de chunk_size lecciones.
+
+    Las lecciones inválidas se informan en "errors" y no detienen la importación.
+    """
+    report = {"imported": 0, "steps": 0, "errors": [], "lesson_ids": []}
+    valid = []
+    for index, data in enumerate(lessons):
+        try:
+            valid.append(_validate(index, data))
+        except ValueError as e:
+            report["errors"].append(str(e))
+
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            lesson_ids = [lesson[0] for lesson, _ in chunk]
+            try:
+                insert_many(
+                    cursor,
+                    "INSERT INTO lessons (id, title, description, difficulty, order_index, active) VALUES",
+                    [lesson for lesson, _ in chunk],
+                    suffix="""ON DUPLICATE KEY UPDATE title=VALUES(title), description=VALUES(description),
+                              difficulty=VALUES(difficulty), order_index=VALUES(order_index),
+                              active=VALUES(active), version=version+1"""
+                )
+                cursor.execute(
+                    "DELETE FROM lesson_steps WHERE lesson_id IN (%s)" % ", ".join(["%s"] * len(lesson_ids)),
+                    lesson_ids
+                )
+                steps = insert_steps(cursor, [row for _, rows in chunk for row in rows])
+                lesson_cache.update_step_counts(cursor, lesson_ids)
+                # active puede haber cambiado en lecciones que ya existían
+                assignments.refresh_lessons(cursor, lesson_ids)
+                bump_version(cursor, "lessons")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                report["errors"].append(
+                    f"Lecciones {start + 1}-{start + len(chunk)} (válidas) no importadas: {e}"
+                )
+                continue
+            report["imported"] += len(chunk)
+            report["steps"] += steps
+            report["lesson_ids"].extend(lesson_ids)
+    finally:
+        cursor.close()
+        lesson_cache.invalidate()
+    return report
+
+def export_lessons(conn, fmt="ndjson", active_only=False, chunk_size=LESSON_EXPORT_CHUNK):
+    """Generador que produce el bundle por partes, recorriendo las lecciones por id"""
+    cursor = conn.cursor(dictionary=True)
+    first = True
+    last_id = ""
+    if fmt == "json":
+        yield '{"lessons": ['
+    try:
+        while True:
+            cursor.execute(f"""
+                SELECT id, title, description, difficulty, order_index, active
+                FROM lessons
+                WHERE id > %s {"AND active = 1" if active_only else ""}
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, chunk_size))
+            lessons = cursor.fetchall()
+            if not lessons:
+                break
+            last_id = lessons[-1]["id"]
+
+            cursor.execute(
+                """SELECT lesson_id, type, target, prompt, hint, max_attempts
+                   FROM lesson_steps WHERE lesson_id IN (%s)
+                   ORDER BY lesson_id, step_index""" % ", ".join(["%s"] * len(lessons)),
+                [l["id"] for l in lessons]
+            )
+            steps = {}
+            for step in cursor.fetchall():
+                steps.setdefault(step.pop("lesson_id"), []).append(step)
+
+            for lesson in lessons:
+                lesson["steps"] = steps.get(lesson["id"], [])
+                line = json.dumps(lesson, ensure_ascii=False)
+                if fmt == "json":
+                    yield line if first else "," + line
+                else:
+                    yield line + "\n"
+                first = False
+    finally:
+        cursor.close()
+    if fmt == "json":
+        yield "]}"
@@ -0,0 +1,208 @@
+"""Caché en proceso de lecciones y sus pasos.
+
+La usan los servicios de estudiante y profesor. Cada entrada es una instantánea
+inmutable (namedtuples) de una lección en una versión concreta (lessons.version).
+Las escrituras incrementan lessons.version y el contador 'lessons' de
+cache_versions; cada proceso compara ese contador como mucho una vez cada
+LESSON_CACHE_CHECK_INTERVAL segundos y descarta las lecciones que cambiaron.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from db import bump_version, read_versions, has_column, refresh_capabilities
+
+LESSON_CACHE_MAX_ENTRIES = int(os.getenv("LESSON_CACHE_MAX_ENTRIES", 512))
+LESSON_CACHE_MAX_BYTES = int(os.getenv("LESSON_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+LESSON_CACHE_CHECK_INTERVAL = float(os.getenv("LESSON_CACHE_CHECK_INTERVAL", 1.0))
+
+Lesson = namedtuple("Lesson", "id version title description difficulty order_index created_at active steps")
+Step = namedtuple("Step", "id lesson_id step_index type target prompt hint max_attempts")
+LessonSummary = namedtuple("LessonSummary", "id title description difficulty order_index created_at active step_count")
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # lesson_id -> (Lesson, size_bytes)
+_bytes = 0
+_catalog = None
+_generation = None
+_checked_at = 0.0
+_epoch = 0  # aumenta con cada invalidación local; evita guardar lecturas hechas antes de ella
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _sizeof(values):
+    return sum(sys.getsizeof(v) for v in values)
+
+def _snapshot(lesson_row, step_rows):
+    steps = tuple(
+        Step(s.get("id"), s["lesson_id"], s["step_index"], s.get("type"), s.get("target"),
+             s.get("prompt"), s.get("hint"), s.get("max_attempts", 3))
+        for s in step_rows
+    )
+    lesson = Lesson(
+        lesson_row["id"], lesson_row.get("version", 1), lesson_row.get("title"),
+        lesson_row.get("description"), lesson_row.get("difficulty"), lesson_row.get("order_index"),
+        lesson_row.get("created_at"), lesson_row.get("active", 1), steps
+    )
+    size = _sizeof(lesson) + sum(_sizeof(s) for s in steps)
+    return lesson, size
+
+def _evict(lesson_id):
+    global _bytes
+    entry = _entries.pop(lesson_id, None)
+    if entry:
+        _bytes -= entry[1]
+
+def _sync(cursor):
+    """Descartar entradas cuya versión cambió en otro proceso (chequeo barato y espaciado)"""
+    global _generation, _checked_at, _catalog, _epoch
+    now = time.monotonic()
+    if now - _checked_at < LESSON_CACHE_CHECK_INTERVAL:
+        return
+    _checked_at = now
+    generation = read_versions(cursor, ["lessons"])["lessons"]
+    if generation == _generation:
+        return
+
+    with _lock:
+        cached = {lesson_id: entry[0].version for lesson_id, entry in _entries.items()}
+    current = {}
+    if cached:
+        cursor.execute(
+            "SELECT id, version FROM lessons WHERE id IN (%s)" % ", ".join(["%s"] * len(cached)),
+            tuple(cached)
+        )
+        current = {row["id"]: row["version"] for row in cursor.fetchall()}
+    with _lock:
+        for lesson_id, version in cached.items():
+            if current.get(lesson_id) != version:
+                _evict(lesson_id)
+        _catalog = None
+        _generation = generation
+        _epoch += 1
+
+def get(cursor, lesson_id):
+    """Instantánea de la lección con sus pasos ordenados, o None si no existe"""
+    global _bytes
+    _sync(cursor)
+    with _lock:
+        entry = _entries.get(lesson_id)
+        if entry:
+            _entries.move_to_end(lesson_id)
+            _stats["hits"] += 1
+            return entry[0]
+        _stats["misses"] += 1
+        epoch = _epoch
+
+    cursor.execute("SELECT * FROM lessons WHERE id=%s", (lesson_id,))
+    lesson_row = cursor.fetchone()
+    if not lesson_row:
+        return None
+    cursor.execute("SELECT * FROM lesson_steps WHERE lesson_id=%s ORDER BY step_index", (lesson_id,))
+    lesson, size = _snapshot(lesson_row, cursor.fetchall())
+
+    with _lock:
+        if epoch != _epoch:
+            return lesson
+        _evict(lesson_id)
+        _entries[lesson_id] = (lesson, size)
+        _bytes += size
+        while _entries and (len(_entries) > LESSON_CACHE_MAX_ENTRIES or _bytes > LESSON_CACHE_MAX_BYTES):
+            _evict(next(iter(_entries)))
+            _stats["evictions"] += 1
+    return lesson
+
+def step_at(lesson, step_index):
+    """Paso con el step_index dado, o None si la lección ya terminó"""
+    steps = lesson.steps
+    if 0 <= step_index < len(steps) and steps[step_index].step_index == step_index:
+        return steps[step_index]
+    for step in steps:
+        if step.step_index == step_index:
+            return step
+    return None
+
+def catalog(cursor):
+    """Todas las lecciones (activas o no) con su cantidad de pasos, ordenadas por order_index"""
+    global _catalog
+    _sync(cursor)
+    with _lock:
+        if _catalog is not None:
+            return _catalog
+        epoch = _epoch
+
+    if has_column("lessons", "step_count", cursor):
+        # Cantidad de pasos guardada en la lección (update_step_counts)
+        cursor.execute("""
+            SELECT id, title, description, difficulty, order_index, created_at, active, step_count
+            FROM lessons
+            ORDER BY order_index, created_at DESC
+        """)
+    else:
+        cursor.execute("""
+            SELECT
+                l.id,
+                l.title,
+                l.description,
+                l.difficulty,
+                l.order_index,
+                l.created_at,
+                l.active,
+                COUNT(ls.id) as step_count
+            FROM lessons l
+            LEFT JOIN lesson_steps ls ON l.id = ls.lesson_id
+            GROUP BY l.id, l.title, l.description, l.difficulty, l.order_index, l.created_at, l.active
+            ORDER BY l.order_index, l.created_at DESC
+        """)
+    result = tuple(LessonSummary(**row) for row in cursor.fetchall())
+    with _lock:
+        if epoch == _epoch:
+            _catalog = result
+    return result
+
+def lesson_dict(lesson):
+    data = lesson._asdict()
+    del data["steps"]
+    return data
+
+def steps_list(lesson):
+    return [step._asdict() for step in lesson.steps]
+
+def update_step_counts(cursor, lesson_ids):
+    """Recalcular lessons.step_count después de escribir los pasos"""
+    if not lesson_ids or not has_column("lessons", "step_count", cursor):
+        return
+    cursor.execute(
+        "UPDATE lessons SET step_count = (SELECT COUNT(*) FROM lesson_steps s WHERE s.lesson_id = lessons.id) "
+        "WHERE id IN (%s)" % ", ".join(["%s"] * len(lesson_ids)),
+        tuple(lesson_ids)
+    )
+
+def mark_changed(cursor, lesson_id):
+    """Registrar el cambio de una lección dentro de la transacción que la modifica"""
+    if not has_column("lessons", "version", cursor):
+        # El registro puede ser anterior a una migración: sin lessons.version los demás
+        # procesos no descartan esta lección, así que se confirma antes de saltearla
+        refresh_capabilities(cursor=cursor)
+    update_step_counts(cursor, [lesson_id])
+    if has_column("lessons", "version", cursor):
+        cursor.execute("UPDATE lessons SET version = version + 1 WHERE id=%s", (lesson_id,))
+    # El contador global va siempre, esté o no la columna version
+    bump_version(cursor, "lessons")
+
+def invalidate(lesson_id=None):
+    """Descartar la lección (o toda la caché) en este proceso, después del commit"""
+    global _catalog, _epoch
+    with _lock:
+        _epoch += 1
+        if lesson_id is None:
+            for key in list(_entries):
+                _evict(key)
+        else:
+            _evict(lesson_id)
+        _catalog = None
+
+def stats():
+    with _lock:
+        return dict(_stats, entries=len(_entries), bytes=_bytes)
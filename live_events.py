@@ -0,0 +1,283 @@
+"""Progreso en vivo para los docentes (Server-Sent Events).
+
+El camino de escritura del estudiante (api_submit, api_skip, el cierre de la
+sesión, attempt_writer y answer_batch) llama a record() después de escribir.
+record() solo acumula en memoria: cada LIVE_EVENTS_INTERVAL_MS un hilo junta lo
+de cada estudiante en un único evento "progress" (intentos y aciertos del
+intervalo, paso y puntaje actuales, si terminó la sesión), así una ráfaga de
+respuestas es una sola actualización por estudiante e intervalo.
+
+Los docentes se suscriben a una clase (o a todas las suyas) con
+GET /api/teacher/class/<id>/events o /api/teacher/classes/<teacher_id>/events
+y reciben solo los eventos de los estudiantes de esas clases.
+
+LIVE_EVENTS_BACKEND:
+
+- memory (por defecto): los eventos se entregan dentro del proceso. Sirve
+  cuando estudiantes y docentes comparten proceso (gateway.py). Sin
+  suscriptores, record() no hace nada. Si el proceso que atiende a los docentes
+  no tiene cargado student_views (teacher_service separado) no recibe ningún
+  evento: subscribe() lo avisa en el log.
+- db: los eventos agrupados se insertan en live_events (un INSERT multi-fila
+  por intervalo) y cada proceso con suscriptores lee las filas nuevas por
+  rango de la clave primaria, una consulta por intervalo sin importar cuántos
+  docentes estén conectados. Un id autoincremental se asigna antes del commit,
+  así que una fila puede aparecer después de otra con id mayor: cada lectura
+  vuelve a cubrir los últimos LIVE_EVENTS_POLL_OVERLAP ids y descarta los ya
+  entregados. Es lo que hace falta con student_service y
+  teacher_service separados.
+- off: sin eventos.
+
+Cada conexión SSE ocupa un hilo del servidor; se cierra sola después de
+LIVE_EVENTS_STREAM_MAX_S segundos y EventSource se reconecta (y vuelve a leer
+la lista de estudiantes de la clase).
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from db import get_db_connection, insert_many
+import activity
+
+LIVE_EVENTS_BACKEND = os.getenv("LIVE_EVENTS_BACKEND", "memory").lower()
+LIVE_EVENTS_INTERVAL_MS = int(os.getenv("LIVE_EVENTS_INTERVAL_MS", 1000))
+LIVE_EVENTS_QUEUE_MAX = int(os.getenv("LIVE_EVENTS_QUEUE_MAX", 500))
+LIVE_EVENTS_HEARTBEAT_S = float(os.getenv("LIVE_EVENTS_HEARTBEAT_S", 15))
+LIVE_EVENTS_STREAM_MAX_S = float(os.getenv("LIVE_EVENTS_STREAM_MAX_S", 300))
+LIVE_EVENTS_RETENTION_S = int(os.getenv("LIVE_EVENTS_RETENTION_S", 600))
+LIVE_EVENTS_POLL_OVERLAP = int(os.getenv("LIVE_EVENTS_POLL_OVERLAP", 500))
+
+EVENT_INSERT = "INSERT INTO live_events (student_id, payload, created_at) VALUES"
+POLL_LIMIT = 1000
+
+_cond = threading.Condition()
+_pending = {}         # (student_id, session_id) -> evento acumulado del intervalo
+_subscribers = set()
+_thread = None
+_last_id = None       # última fila de live_events entregada (backend db)
+_seen = set()         # ids entregados dentro de la ventana de relectura
+_warned = False
+_purged_at = 0.0
+_stats = {"recorded": 0, "published": 0, "delivered": 0, "dropped": 0, "polls": 0, "failures": 0}
+
+class Subscriber:
+    """Cola de eventos de una conexión SSE; students es {student_id: [class_id, ...]}"""
+
+    def __init__(self, students):
+        self.students = students
+        self.events = deque()
+        self.overflow = False
+
+    def push(self, event):
+        # Con el lock tomado
+        class_ids = self.students.get(event["student_id"])
+        if class_ids is None:
+            return False
+        if len(self.events) >= LIVE_EVENTS_QUEUE_MAX:
+            # El docente no lee a tiempo: se descarta lo acumulado y se le pide recargar
+            self.events.clear()
+            self.overflow = True
+            _stats["dropped"] += 1
+            return False
+        self.events.append(dict(event, class_ids=class_ids))
+        return True
+
+def enabled():
+    return LIVE_EVENTS_BACKEND in ("memory", "db")
+
+def _start():
+    # Con el lock tomado
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_run, name="live-events", daemon=True)
+        _thread.start()
+
+def record(student_id, lesson_id, session_id, score=None, current_step=None,
+           attempts=0, corrects=0, finished=False):
+    """Sumar una escritura del estudiante al evento del intervalo (llamar después del commit)"""
+    if not enabled() or student_id is None:
+        return
+    with _cond:
+        if LIVE_EVENTS_BACKEND == "memory" and not _subscribers:
+            return
+        event = _pending.get((student_id, session_id))
+        if event is None:
+            event = _pending[(student_id, session_id)] = {
+                "type": "progress", "student_id": student_id, "lesson_id": lesson_id,
+                "session_id": session_id, "attempts": 0, "corrects": 0, "finished": False,
+            }
+        event["attempts"] += attempts
+        event["corrects"] += corrects
+        event["finished"] = event["finished"] or bool(finished)
+        if score is not None:
+            event["score"] = score
+        if current_step is not None:
+            event["current_step"] = current_step
+        event["ts"] = activity.now_ts()
+        _stats["recorded"] += 1
+        _start()
+
+def subscribe(students):
+    """Registrar una conexión; students es {student_id: [class_id, ...]}"""
+    global _last_id, _warned
+    subscriber = Subscriber(students)
+    with _cond:
+        if LIVE_EVENTS_BACKEND == "db" and not _subscribers:
+            # Sin suscriptores no se leyó live_events: se empieza desde ahora
+            _last_id = None
+            _seen.clear()
+        if LIVE_EVENTS_BACKEND == "memory" and not _warned and "student_views" not in sys.modules:
+            print("live_events: LIVE_EVENTS_BACKEND=memory y este proceso no atiende a los "
+                  "estudiantes; los docentes no van a recibir eventos. Usar "
+                  "LIVE_EVENTS_BACKEND=db con student_service y teacher_service separados")
+            _warned = True
+        _subscribers.add(subscriber)
+        _start()
+    return subscriber
+
+def unsubscribe(subscriber):
+    with _cond:
+        _subscribers.discard(subscriber)
+
+def stream(subscriber, heartbeat=LIVE_EVENTS_HEARTBEAT_S, max_seconds=LIVE_EVENTS_STREAM_MAX_S):
+    """Eventos de la suscripción como texto SSE, con comentarios de heartbeat, hasta max_seconds"""
+    deadline = time.monotonic() + max_seconds
+    # EventSource reintenta a los 3 s si la conexión se corta
+    yield "retry: 3000\n\n"
+    written = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            return
+        with _cond:
+            if not subscriber.events and not subscriber.overflow:
+                _cond.wait(min(written + heartbeat, deadline) - now)
+            events = list(subscriber.events)
+            subscriber.events.clear()
+            overflow, subscriber.overflow = subscriber.overflow, False
+        if overflow:
+            yield "event: resync\ndata: {}\n\n"
+        for event in events:
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        if events or overflow:
+            written = time.monotonic()
+        elif time.monotonic() - written >= heartbeat:
+            # Mantiene viva la conexión a través de proxies
+            yield ": heartbeat\n\n"
+            written = time.monotonic()
+
+def _deliver(events):
+    # Con el lock tomado
+    delivered = 0
+    for event in events:
+        for subscriber in _subscribers:
+            delivered += subscriber.push(event)
+    _stats["delivered"] += delivered
+    if delivered or any(s.overflow for s in _subscribers):
+        _cond.notify_all()
+
+def _publish(events):
+    """Eventos agrupados del intervalo: a los suscriptores o a live_events"""
+    if LIVE_EVENTS_BACKEND == "memory":
+        with _cond:
+            _deliver(events)
+            _stats["published"] += len(events)
+        return
+    global _purged_at
+    conn = get_db_connection()
+    if not conn:
+        with _cond:
+            _stats["failures"] += 1
+        return
+    cursor = conn.cursor()
+    try:
+        now = activity.now_ts()
+        insert_many(cursor, EVENT_INSERT, [(e["student_id"], json.dumps(e), now) for e in events])
+        if time.monotonic() - _purged_at > 60:
+            cutoff = datetime.now() - timedelta(seconds=LIVE_EVENTS_RETENTION_S)
+            cursor.execute("DELETE FROM live_events WHERE created_at < %s",
+                           (int(cutoff.strftime("%Y%m%d%H%M%S")),))
+            _purged_at = time.monotonic()
+        conn.commit()
+        with _cond:
+            _stats["published"] += len(events)
+    except Exception as e:
+        print(f"live_events: error al publicar {len(events)} eventos: {e}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        with _cond:
+            _stats["failures"] += 1
+    finally:
+        cursor.close()
+        conn.close()
+
+def _poll():
+    """Backend db: entregar las filas nuevas de live_events a los suscriptores de este proceso"""
+    global _last_id
+    conn = get_db_connection()
+    if not conn:
+        with _cond:
+            _stats["failures"] += 1
+        return
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if _last_id is None:
+            # Lo que ya está en la ventana es anterior a la suscripción: no se entrega
+            cursor.execute("SELECT id FROM live_events ORDER BY id DESC LIMIT %s",
+                           (LIVE_EVENTS_POLL_OVERLAP,))
+            ids = [row["id"] for row in cursor.fetchall()]
+            with _cond:
+                _seen.update(ids)
+                _last_id = max(ids, default=0)
+            return
+        cursor.execute("SELECT id, payload FROM live_events WHERE id > %s ORDER BY id LIMIT %s",
+                       (max(_last_id - LIVE_EVENTS_POLL_OVERLAP, 0), POLL_LIMIT + LIVE_EVENTS_POLL_OVERLAP))
+        rows = cursor.fetchall()
+        with _cond:
+            if _last_id is None:
+                # subscribe() reinició la lectura mientras tanto
+                return
+            rows = [row for row in rows if row["id"] not in _seen]
+            if rows:
+                _last_id = max(_last_id, rows[-1]["id"])
+                _seen.update(row["id"] for row in rows)
+                _deliver([json.loads(row["payload"]) for row in rows])
+            floor = _last_id - LIVE_EVENTS_POLL_OVERLAP
+            _seen.difference_update([i for i in _seen if i <= floor])
+            _stats["polls"] += 1
+    except Exception as e:
+        print(f"live_events: error al leer live_events: {e}")
+        with _cond:
+            _stats["failures"] += 1
+    finally:
+        cursor.close()
+        conn.close()
+
+def _run():
+    while True:
+        time.sleep(LIVE_EVENTS_INTERVAL_MS / 1000)
+        with _cond:
+            events = list(_pending.values())
+            _pending.clear()
+            polling = LIVE_EVENTS_BACKEND == "db" and bool(_subscribers)
+        if events:
+            _publish(events)
+        if polling:
+            _poll()
+
+def stats():
+    with _cond:
+        return dict(
+            _stats,
+            backend=LIVE_EVENTS_BACKEND,
+            interval_ms=LIVE_EVENTS_INTERVAL_MS,
+            subscribers=len(_subscribers),
+            pending=len(_pending),
+            running=_thread is not None and _thread.is_alive()
+        )
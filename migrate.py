@@ -0,0 +1,177 @@
+"""Migraciones versionadas del esquema.
+
+Cada archivo migrations/NNN_nombre.sql es la versión NNN. Las versiones aplicadas
+se registran en schema_version y solo se ejecutan las pendientes, en orden. Las
+sentencias son repetibles: si una migración se aplicó a mano (o quedó a medias)
+los errores de "ya existe" se ignoran y la versión se registra igual, y las cargas
+de datos solo completan lo que falta. En MySQL cada DDL confirma la transacción; en
+SQLite cada migración se aplica entera o no se aplica.
+
+    python migrate.py               # aplicar las pendientes
+    python migrate.py --status      # versiones aplicadas y pendientes
+    python migrate.py --baseline 4  # registrar 1..4 como aplicadas sin ejecutarlas
+    python migrate.py --check       # EXPLAIN de las consultas calientes (hot_queries.py)
+
+DB.sql ya trae schema_version con todas las versiones del esquema que contiene.
+Los servicios en ejecución notan la versión nueva en schema_version y vuelven a
+leer las columnas (db.has_column) en la primera consulta con cursor pasados
+DB_CAPABILITIES_CHECK_INTERVAL segundos.
+Con DB_BACKEND=sqlite las sentencias DDL se traducen con db_sqlite.translate_migration;
+el resto se escribe en SQL que ambos motores aceptan (sin alias en UPDATE ni
+INSERT ... SELECT ... ON DUPLICATE KEY UPDATE).
+"""
+import argparse
+import os
+import re
+import sqlite3
+
+from mysql.connector import Error
+
+from db import DB_BACKEND, get_db_connection, refresh_capabilities
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Tabla/columna/índice ya existe, índice ya borrado
+IGNORED_MYSQL_ERRORS = {1050, 1060, 1061, 1091}
+IGNORED_SQLITE_ERRORS = ("duplicate column name", "already exists")
+
+SCHEMA_VERSION_DDL = """CREATE TABLE IF NOT EXISTS `schema_version` (
+  `version` int NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `applied_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`version`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci"""
+
+def available():
+    """[(versión, nombre, ruta)] de migrations/, ordenadas por versión"""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        m = _FILENAME.match(filename)
+        if m:
+            migrations.append((int(m.group(1)), m.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(migrations)
+
+def statements(path):
+    """Sentencias del archivo, sin comentarios; cada una termina en ; al final de línea"""
+    result, current = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.lstrip().startswith("--") or not line.strip():
+                continue
+            current.append(line.rstrip())
+            if line.rstrip().endswith(";"):
+                result.append("\n".join(current).rstrip(";"))
+                current = []
+    if current:
+        result.append("\n".join(current))
+    return result
+
+def _execute(cursor, statement, log):
+    sqls = [statement]
+    if DB_BACKEND == "sqlite":
+        import db_sqlite
+        sqls = db_sqlite.translate_migration(statement)
+    for sql in sqls:
+        try:
+            cursor.execute(sql)
+        except Error as e:
+            if e.errno not in IGNORED_MYSQL_ERRORS:
+                raise
+            log(f"  (ya aplicado) {e.msg}")
+        except sqlite3.OperationalError as e:
+            if not any(text in str(e) for text in IGNORED_SQLITE_ERRORS):
+                raise
+            log(f"  (ya aplicado) {e}")
+
+def applied(cursor):
+    cursor.execute("SELECT version FROM schema_version")
+    return {row["version"] for row in cursor.fetchall()}
+
+def _ensure_table(conn, cursor, log):
+    _execute(cursor, SCHEMA_VERSION_DDL, log)
+    conn.commit()
+
+def migrate(conn, log=print):
+    """Aplicar las migraciones pendientes. Devuelve las versiones aplicadas."""
+    cursor = conn.cursor(dictionary=True)
+    done = []
+    try:
+        _ensure_table(conn, cursor, log)
+        current = applied(cursor)
+        for version, name, path in available():
+            if version in current:
+                continue
+            log(f"Aplicando {version:03d}_{name}")
+            if DB_BACKEND == "sqlite" and not conn.in_transaction:
+                # sqlite3 no abre transacción antes de un DDL: sin BEGIN cada ALTER
+                # quedaría confirmado aunque falle una sentencia posterior
+                conn.execute("BEGIN")
+            for statement in statements(path):
+                _execute(cursor, statement, log)
+            cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)", (version, name))
+            conn.commit()
+            done.append(version)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    if done:
+        # Las vistas consultan el esquema con has_column/has_table
+        refresh_capabilities(conn)
+    return done
+
+def baseline(conn, up_to, log=print):
+    """Registrar como aplicadas las versiones <= up_to sin ejecutarlas"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        _ensure_table(conn, cursor, log)
+        current = applied(cursor)
+        for version, name, _ in available():
+            if version <= up_to and version not in current:
+                cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)", (version, name))
+                log(f"Registrada {version:03d}_{name}")
+        conn.commit()
+    finally:
+        cursor.close()
+
+def status(conn, log=print):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        _ensure_table(conn, cursor, log)
+        current = applied(cursor)
+    finally:
+        cursor.close()
+    pending = 0
+    for version, name, _ in available():
+        if version not in current:
+            pending += 1
+        log(f"{version:03d}_{name}: {'aplicada' if version in current else 'pendiente'}")
+    return pending
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migraciones del esquema")
+    parser.add_argument("--status", action="store_true", help="mostrar versiones aplicadas y pendientes")
+    parser.add_argument("--baseline", type=int, metavar="N", help="registrar 1..N como aplicadas sin ejecutarlas")
+    parser.add_argument("--check", action="store_true", help="verificar con EXPLAIN que las consultas calientes usan índices")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit("Database connection failed")
+    try:
+        if args.status:
+            status(conn)
+        elif args.baseline is not None:
+            baseline(conn, args.baseline)
+        elif args.check:
+            import hot_queries
+            failures = hot_queries.check(conn)
+            if failures:
+                raise SystemExit(f"{len(failures)} consultas recorren tablas completas")
+        else:
+            done = migrate(conn)
+            print(f"{len(done)} migraciones aplicadas" if done else "El esquema está al día")
+    finally:
+        conn.close()
@@ -0,0 +1,21 @@
+-- Estado de avance por sesión: paso actual, intentos en ese paso y total de intentos.
+-- Evita recalcular el paso con COUNT(*) sobre attempts en cada prompt/submit.
+
+ALTER TABLE `sessions`
+  ADD COLUMN `current_step` int NOT NULL DEFAULT '0',
+  ADD COLUMN `step_attempts` int NOT NULL DEFAULT '0',
+  ADD COLUMN `attempt_count` int NOT NULL DEFAULT '0';
+
+-- Carga inicial desde attempts, solo en sesiones sin intentos contados (attempt_count = 0):
+-- al repetir la migración no se recalcula el cursor de sesiones en curso ni de las que ya
+-- tienen sus intentos archivados (archived_at llega recién en 006, acá no se puede usar).
+-- attempt_count se completa al final porque es la marca de las dos primeras.
+UPDATE `sessions` SET
+  `current_step` = (SELECT COUNT(*) FROM `attempts` a WHERE a.`session_id` = `sessions`.`id` AND a.`correct` = 1)
+WHERE `attempt_count` = 0;
+UPDATE `sessions` SET
+  `step_attempts` = (SELECT COUNT(*) FROM `attempts` a WHERE a.`session_id` = `sessions`.`id` AND a.`step_index` = `sessions`.`current_step`)
+WHERE `attempt_count` = 0;
+UPDATE `sessions` SET
+  `attempt_count` = (SELECT COUNT(*) FROM `attempts` a WHERE a.`session_id` = `sessions`.`id`)
+WHERE `attempt_count` = 0;
@@ -0,0 +1,12 @@
+-- Versión por lección y contadores globales de versión para invalidar las cachés en proceso.
+
+ALTER TABLE `lessons`
+  ADD COLUMN `version` int NOT NULL DEFAULT '1';
+
+CREATE TABLE IF NOT EXISTS `cache_versions` (
+  `name` varchar(50) NOT NULL,
+  `version` bigint NOT NULL DEFAULT '0',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO `cache_versions` (`name`, `version`) VALUES ('lessons', 0);
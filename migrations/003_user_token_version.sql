@@ -0,0 +1,4 @@
+-- Versión de token por usuario: al incrementarla se invalidan los JWT emitidos antes.
+
+ALTER TABLE `users`
+  ADD COLUMN `token_version` int NOT NULL DEFAULT '0';
@@ -0,0 +1,59 @@
+-- Contadores de actividad por estudiante y por estudiante/lección, actualizados al
+-- registrar cada intento. El dashboard los lee en lugar de agregar toda la tabla attempts.
+-- activity.py --reconcile --repair los recalcula si alguna vez se desvían.
+
+CREATE TABLE IF NOT EXISTS `student_activity` (
+  `student_id` int NOT NULL,
+  `attempts` int NOT NULL DEFAULT '0',
+  `corrects` int NOT NULL DEFAULT '0',
+  `last_ts` bigint DEFAULT NULL,
+  `lessons_completed` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`student_id`),
+  CONSTRAINT `student_activity_ibfk_1` FOREIGN KEY (`student_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `student_lesson_activity` (
+  `student_id` int NOT NULL,
+  `lesson_id` varchar(50) NOT NULL,
+  `attempts` int NOT NULL DEFAULT '0',
+  `corrects` int NOT NULL DEFAULT '0',
+  `last_ts` bigint DEFAULT NULL,
+  `completed` tinyint(1) NOT NULL DEFAULT '0',
+  PRIMARY KEY (`student_id`,`lesson_id`),
+  KEY `idx_student_lesson_activity_lesson` (`lesson_id`),
+  CONSTRAINT `student_lesson_activity_ibfk_1` FOREIGN KEY (`student_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `student_lesson_activity_ibfk_2` FOREIGN KEY (`lesson_id`) REFERENCES `lessons` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Carga inicial desde attempts y sessions. Solo se insertan las filas que faltan:
+-- así la migración se puede repetir sin pisar contadores que ya se actualizan en vivo
+-- (ni los de intentos ya archivados), y no depende de ON DUPLICATE KEY, que SQLite no acepta
+-- en un INSERT ... SELECT.
+INSERT INTO `student_lesson_activity` (`student_id`, `lesson_id`, `attempts`, `corrects`, `last_ts`, `completed`)
+SELECT k.`user_id`, k.`lesson_id`,
+  (SELECT COUNT(*) FROM `attempts` a WHERE a.`user_id` = k.`user_id` AND a.`lesson_id` = k.`lesson_id`),
+  (SELECT IFNULL(SUM(a.`correct`), 0) FROM `attempts` a WHERE a.`user_id` = k.`user_id` AND a.`lesson_id` = k.`lesson_id`),
+  (SELECT MAX(a.`ts`) FROM `attempts` a WHERE a.`user_id` = k.`user_id` AND a.`lesson_id` = k.`lesson_id`),
+  EXISTS (SELECT 1 FROM `sessions` s WHERE s.`user_id` = k.`user_id` AND s.`lesson_id` = k.`lesson_id` AND s.`finished_at` IS NOT NULL)
+FROM (
+  SELECT `user_id`, `lesson_id` FROM `attempts`
+  UNION
+  SELECT `user_id`, `lesson_id` FROM `sessions` WHERE `finished_at` IS NOT NULL
+) k
+JOIN `users` u ON u.`id` = k.`user_id`
+JOIN `lessons` l ON l.`id` = k.`lesson_id`
+WHERE NOT EXISTS (
+  SELECT 1 FROM `student_lesson_activity` x WHERE x.`student_id` = k.`user_id` AND x.`lesson_id` = k.`lesson_id`
+);
+
+-- Los intentos de lecciones borradas cuentan para el estudiante aunque no tengan fila por lección
+INSERT INTO `student_activity` (`student_id`, `attempts`, `corrects`, `last_ts`, `lessons_completed`)
+SELECT u.`id`,
+  (SELECT COUNT(*) FROM `attempts` a WHERE a.`user_id` = u.`id`),
+  (SELECT IFNULL(SUM(a.`correct`), 0) FROM `attempts` a WHERE a.`user_id` = u.`id`),
+  (SELECT MAX(a.`ts`) FROM `attempts` a WHERE a.`user_id` = u.`id`),
+  (SELECT IFNULL(SUM(x.`completed`), 0) FROM `student_lesson_activity` x WHERE x.`student_id` = u.`id`)
+FROM `users` u
+WHERE (EXISTS (SELECT 1 FROM `attempts` a WHERE a.`user_id` = u.`id`)
+       OR EXISTS (SELECT 1 FROM `student_lesson_activity` x WHERE x.`student_id` = u.`id`))
+  AND NOT EXISTS (SELECT 1 FROM `student_activity` y WHERE y.`student_id` = u.`id`);
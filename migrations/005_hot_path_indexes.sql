@@ -0,0 +1,17 @@
+-- Índices compuestos para las consultas calientes:
+--   attempts por (session_id, correct): aciertos por sesión en el detalle de la lección
+--   attempts por (session_id, step_index): intentos del paso actual de una sesión
+--   sessions por (user_id, lesson_id, finished_at) ordenadas por started_at: sesión activa al iniciar
+-- Cada índice va en su propia sentencia para que la migración se pueda repetir.
+
+ALTER TABLE `attempts` ADD KEY `idx_attempts_session_correct` (`session_id`,`correct`);
+
+ALTER TABLE `attempts` ADD KEY `idx_attempts_session_step` (`session_id`,`step_index`);
+
+ALTER TABLE `sessions` ADD KEY `idx_sessions_user_lesson` (`user_id`,`lesson_id`,`finished_at`,`started_at`);
+
+-- Los índices de una columna quedan cubiertos por el prefijo de los compuestos
+-- (también para las claves foráneas) y solo encarecen las escrituras.
+ALTER TABLE `attempts` DROP KEY `idx_attempts_session`;
+
+ALTER TABLE `sessions` DROP KEY `user_id`;
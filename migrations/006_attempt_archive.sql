@@ -0,0 +1,42 @@
+-- Archivo de intentos (archive.py): los intentos de sesiones terminadas hace más de
+-- ARCHIVE_AFTER_DAYS días se resumen por sesión y paso en attempt_step_summary y las
+-- filas originales pasan a attempts_archive (o a un archivo comprimido).
+-- sessions.archived_at marca las sesiones ya archivadas.
+
+ALTER TABLE `sessions` ADD COLUMN `archived_at` bigint DEFAULT NULL;
+
+ALTER TABLE `sessions` ADD KEY `idx_sessions_archive` (`archived_at`,`finished_at`,`started_at`);
+
+-- Sin clave foránea a sessions: el resumen sigue contando para los contadores de
+-- actividad aunque la sesión abandonada se borre
+CREATE TABLE IF NOT EXISTS `attempt_step_summary` (
+  `session_id` varchar(50) NOT NULL,
+  `step_index` int NOT NULL,
+  `lesson_id` varchar(50) DEFAULT NULL,
+  `user_id` int DEFAULT NULL,
+  `attempts` int NOT NULL DEFAULT '0',
+  `corrects` int NOT NULL DEFAULT '0',
+  `skips` int NOT NULL DEFAULT '0',
+  `first_ts` bigint DEFAULT NULL,
+  `last_ts` bigint DEFAULT NULL,
+  PRIMARY KEY (`session_id`,`step_index`),
+  KEY `idx_attempt_step_summary_user` (`user_id`),
+  KEY `idx_attempt_step_summary_lesson` (`lesson_id`),
+  CONSTRAINT `attempt_step_summary_ibfk_1` FOREIGN KEY (`lesson_id`) REFERENCES `lessons` (`id`) ON DELETE SET NULL,
+  CONSTRAINT `attempt_step_summary_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `attempts_archive` (
+  `id` int NOT NULL,
+  `session_id` varchar(50) DEFAULT NULL,
+  `lesson_id` varchar(50) DEFAULT NULL,
+  `user_id` int DEFAULT NULL,
+  `step_index` int DEFAULT NULL,
+  `answer` text,
+  `correct` tinyint(1) DEFAULT '0',
+  `attempts` int DEFAULT '0',
+  `ts` bigint DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_attempts_archive_session` (`session_id`),
+  KEY `idx_attempts_archive_user` (`user_id`)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,22 @@
+-- Índice de lecciones asignadas por estudiante (assignments.py) y cantidad de
+-- pasos guardada en la lección: la pantalla de inicio del estudiante lee
+-- student_lessons por clave primaria y el catálogo ya no cuenta lesson_steps.
+
+ALTER TABLE `lessons` ADD COLUMN `step_count` int NOT NULL DEFAULT '0';
+
+UPDATE `lessons` SET `step_count` = (SELECT COUNT(*) FROM `lesson_steps` s WHERE s.`lesson_id` = `lessons`.`id`);
+
+CREATE TABLE IF NOT EXISTS `student_lessons` (
+  `student_id` int NOT NULL,
+  `lesson_id` varchar(50) NOT NULL,
+  PRIMARY KEY (`student_id`,`lesson_id`),
+  KEY `idx_student_lessons_lesson` (`lesson_id`),
+  CONSTRAINT `student_lessons_ibfk_1` FOREIGN KEY (`student_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `student_lessons_ibfk_2` FOREIGN KEY (`lesson_id`) REFERENCES `lessons` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO `student_lessons` (`student_id`, `lesson_id`)
+SELECT DISTINCT cs.`student_id`, cl.`lesson_id`
+FROM `class_students` cs
+JOIN `class_lessons` cl ON cl.`class_id` = cs.`class_id`
+JOIN `lessons` l ON l.`id` = cl.`lesson_id` AND l.`active` = 1;
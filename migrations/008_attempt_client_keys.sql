@@ -0,0 +1,7 @@
+-- Clave de idempotencia de los intentos subidos en lote por dispositivos sin
+-- conexión (POST /api/session/<id>/answers): un reintento del mismo lote no
+-- vuelve a contar intentos ni puntaje. Los intentos en vivo la dejan en NULL.
+
+ALTER TABLE `attempts` ADD COLUMN `client_key` varchar(64) DEFAULT NULL;
+
+ALTER TABLE `attempts` ADD UNIQUE KEY `idx_attempts_client_key` (`session_id`,`client_key`);
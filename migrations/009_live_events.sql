@@ -0,0 +1,13 @@
+-- Eventos de progreso en vivo entre procesos (live_events.py con LIVE_EVENTS_BACKEND=db):
+-- los servicios de estudiante insertan un evento agrupado por estudiante e intervalo y
+-- los de docente leen las filas nuevas por clave primaria. Se borran a los
+-- LIVE_EVENTS_RETENTION_S segundos.
+
+CREATE TABLE IF NOT EXISTS `live_events` (
+  `id` bigint NOT NULL AUTO_INCREMENT,
+  `student_id` int NOT NULL,
+  `payload` text NOT NULL,
+  `created_at` bigint NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_live_events_created` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,17 @@
+-- Estado de las importaciones de estudiantes (import_jobs.py) en la base: el job
+-- corre en el proceso que recibió el CSV y cualquier worker puede informar su avance.
+-- errors guarda hasta IMPORT_MAX_ERRORS errores por fila como JSON.
+
+CREATE TABLE IF NOT EXISTS `import_jobs` (
+  `id` char(32) NOT NULL,
+  `status` varchar(16) NOT NULL,
+  `row_count` int NOT NULL DEFAULT '0',
+  `imported` int NOT NULL DEFAULT '0',
+  `skipped` int NOT NULL DEFAULT '0',
+  `error_count` int NOT NULL DEFAULT '0',
+  `errors` mediumtext,
+  `started_at` bigint NOT NULL,
+  `finished_at` bigint DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_import_jobs_started` (`started_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,22 @@
+import hashlib
+import secrets
+
+# Password hashing - same method as FastAPI user_service
+SCRYPT_N = 16384
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 64
+SALT_SIZE = 16
+
+def get_password_hash(password: str) -> str:
+    """Hash password using scrypt - compatible with FastAPI user_service"""
+    salt = secrets.token_bytes(SALT_SIZE)
+    derived = hashlib.scrypt(
+        password.encode(),
+        salt=salt,
+        n=SCRYPT_N,
+        r=SCRYPT_R,
+        p=SCRYPT_P,
+        dklen=SCRYPT_DKLEN
+    )
+    return salt.hex() + '$' + derived.hex()
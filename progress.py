@@ -0,0 +1,113 @@
+"""Mantenimiento de la tabla resumen student_progress.
+
+record_session_finished() se llama desde el camino de escritura del estudiante,
+dentro de la misma transacción que marca la sesión como terminada. rebuild()
+reconstruye la tabla a partir de sessions por bloques de estudiantes:
+
+    python progress.py --backfill [--chunk 500]
+"""
+import argparse
+from datetime import datetime
+
+from db import get_db_connection, insert_many
+import activity
+
+PROGRESS_INSERT = """INSERT INTO student_progress
+    (student_id, lesson_id, class_id, completed, score, attempts, last_attempt_at, completed_at) VALUES"""
+
+def record_session_finished(cursor, session):
+    """Acumular una sesión terminada en student_progress.
+
+    session necesita user_id, lesson_id, class_id, score y attempt_count (ya
+    incluyendo el intento que la terminó). class_id suele ser NULL y el índice
+    único no trata los NULL como iguales, por eso se busca con <=> en lugar de
+    usar ON DUPLICATE KEY UPDATE. También marca la lección como completada en
+    los contadores de actividad.
+    """
+    activity.record_lesson_completed(cursor, session["user_id"], session["lesson_id"])
+    cursor.execute("""
+        SELECT id FROM student_progress
+        WHERE student_id = %s AND lesson_id = %s AND class_id <=> %s
+        FOR UPDATE
+    """, (session["user_id"], session["lesson_id"], session["class_id"]))
+    row = cursor.fetchone()
+    if row:
+        progress_id = row["id"] if isinstance(row, dict) else row[0]
+        cursor.execute("""
+            UPDATE student_progress
+            SET completed = 1, score = GREATEST(score, %s), attempts = attempts + %s,
+                last_attempt_at = NOW(), completed_at = COALESCE(completed_at, NOW())
+            WHERE id = %s
+        """, (session["score"], session["attempt_count"], progress_id))
+    else:
+        cursor.execute("""
+            INSERT INTO student_progress
+            (student_id, lesson_id, class_id, completed, score, attempts, last_attempt_at, completed_at)
+            VALUES (%s, %s, %s, 1, %s, %s, NOW(), NOW())
+        """, (session["user_id"], session["lesson_id"], session["class_id"],
+              session["score"], session["attempt_count"]))
+
+def _ts(value):
+    # sessions.started_at/finished_at guardan NOW() como número YYYYMMDDhhmmss
+    try:
+        return datetime.strptime(str(value), "%Y%m%d%H%M%S")
+    except (TypeError, ValueError):
+        return None
+
+def rebuild(conn, chunk_size=500, log=print):
+    """Reconstruir student_progress desde las sesiones terminadas, por bloques de estudiantes"""
+    cursor = conn.cursor(dictionary=True)
+    last_id = 0
+    total = 0
+    try:
+        while True:
+            cursor.execute("""
+                SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s
+            """, (last_id, chunk_size))
+            student_ids = [row["id"] for row in cursor.fetchall()]
+            if not student_ids:
+                break
+            last_id = student_ids[-1]
+            placeholders = ", ".join(["%s"] * len(student_ids))
+
+            cursor.execute(f"""
+                SELECT user_id, lesson_id, class_id,
+                       MAX(score) as score, SUM(attempt_count) as attempts,
+                       MIN(finished_at) as first_finished, MAX(finished_at) as last_finished
+                FROM sessions
+                WHERE user_id IN ({placeholders}) AND finished_at IS NOT NULL AND lesson_id IS NOT NULL
+                GROUP BY user_id, lesson_id, class_id
+            """, student_ids)
+            rows = [
+                (r["user_id"], r["lesson_id"], r["class_id"], 1, r["score"] or 0, int(r["attempts"] or 0),
+                 _ts(r["last_finished"]), _ts(r["first_finished"]))
+                for r in cursor.fetchall()
+            ]
+
+            cursor.execute(f"DELETE FROM student_progress WHERE student_id IN ({placeholders})", student_ids)
+            insert_many(cursor, PROGRESS_INSERT, rows)
+            conn.commit()
+            total += len(rows)
+            log(f"student_progress: {total} filas (hasta el estudiante {last_id})")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento de student_progress")
+    parser.add_argument("--backfill", action="store_true", help="reconstruir la tabla desde sessions")
+    parser.add_argument("--chunk", type=int, default=500, help="estudiantes por transacción")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+    else:
+        conn = get_db_connection()
+        if not conn:
+            raise SystemExit("Database connection failed")
+        try:
+            rebuild(conn, args.chunk)
+        finally:
+            conn.close()
@@ -1,6 +1,6 @@
 from flask import Flask
 from flask_cors import CORS
-from db import init_db
+from db import init_db, init_app
 
 init_db()
 
@@ -16,10 +16,15 @@ CORS(app, resources={
 })
 
 app.config['SECRET_KEY'] = 'student-secret-key'
+init_app(app)
 
 from student_views import student_bp
 app.register_blueprint(student_bp)
 
+import attempt_writer
+if attempt_writer.ENABLED:
+    attempt_writer.start()
+
 if __name__ == '__main__':
     print("🎓 Student Service running on http://localhost:5003")
     app.run(debug=True, port=5003, host='0.0.0.0')
\ No newline at end of file
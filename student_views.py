@@ -1,10 +1,43 @@
 from flask import Blueprint, request, jsonify
-from db import get_db_connection
+from db import get_db_connection, read_versions
+import lesson_cache
+import progress
+import activity
+import attempt_writer
+import answer_batch
+import live_events
+from etags import make_etag, not_modified, tagged
+import hot_queries
 import uuid
 from datetime import datetime
 
 student_bp = Blueprint("student_bp", __name__)
 
+# Consultas de cada request, registradas para el chequeo de planes (migrate.py --check)
+PROGRESS_MARKER_SQL = hot_queries.register("student.progress_marker", """
+    SELECT COUNT(*) as rows_count, MAX(last_attempt_at) as last_attempt_at,
+           COALESCE(SUM(score), 0) as score
+    FROM student_progress
+    WHERE student_id = %s
+""", (1,), ["student_progress"])
+
+# Índice mantenido por assignments.py: un rango de la clave primaria
+ASSIGNED_LESSONS_SQL = hot_queries.register("student.assigned_lessons", """
+    SELECT lesson_id FROM student_lessons WHERE student_id = %s
+""", (1,), ["student_lessons"])
+
+ACTIVE_SESSION_SQL = hot_queries.register("student.active_session", """
+    SELECT id FROM sessions
+    WHERE user_id = %s AND lesson_id = %s AND finished_at IS NULL
+    ORDER BY started_at DESC LIMIT 1
+""", (1, "x"), ["sessions"])
+
+SESSION_SQL = hot_queries.register("student.session", """
+    SELECT id, lesson_id, user_id, class_id, score, current_step, step_attempts, attempt_count
+    FROM sessions
+    WHERE id = %s
+""", ("x",), ["sessions"])
+
 @student_bp.route("/api/student/lessons/<int:student_id>", methods=["GET"])
 def get_student_lessons(student_id):
     """Obtener lecciones disponibles para el estudiante"""
@@ -16,62 +49,62 @@ def get_student_lessons(student_id):
     try:
         cursor = conn.cursor(dictionary=True)
         
-        # Intentar obtener lecciones asignadas a las clases del estudiante
-        # Intentar obtener lecciones asignadas a las clases del estudiante
+        # Versión de lo que compone la respuesta: catálogo, asignaciones y progreso del estudiante
+        versions = read_versions(cursor, ["lessons", "classes"])
+        cursor.execute(PROGRESS_MARKER_SQL, (student_id,))
+        marker = cursor.fetchone()
+        etag = make_etag("student_lessons", student_id, versions["lessons"], versions["classes"],
+                         int(marker["rows_count"]), str(marker["last_attempt_at"]), int(marker["score"]))
+        cached = not_modified(etag)
+        if cached:
+            cursor.close()
+            conn.close()
+            return cached
+        
+        # Metadatos y cantidad de pasos salen de la caché de lecciones;
+        # a la base solo se le piden las asignaciones y el progreso del estudiante
+        catalog = [l for l in lesson_cache.catalog(cursor) if l.active]
+        
+        cursor.execute(ASSIGNED_LESSONS_SQL, (student_id,))
+        assigned = {row["lesson_id"] for row in cursor.fetchall()}
+        
         cursor.execute("""
-            SELECT DISTINCT
-                l.id,
-                l.title,
-                l.description,
-                l.difficulty,
-                l.order_index,
-                l.created_at,
-                COUNT(ls.id) as total_steps,
-                COALESCE(sp.completed, 0) as completed,
-                COALESCE(sp.score, 0) as score
-            FROM lessons l
-            LEFT JOIN lesson_steps ls ON l.id = ls.lesson_id
-            LEFT JOIN class_lessons cl ON l.id = cl.lesson_id
-            LEFT JOIN class_students cs ON cl.class_id = cs.class_id
-            LEFT JOIN student_progress sp ON l.id = sp.lesson_id AND sp.student_id = %s
-            WHERE cs.student_id = %s AND l.active = 1
-            GROUP BY l.id, l.title, l.description, l.difficulty, l.order_index, l.created_at, sp.completed, sp.score
-            ORDER BY l.order_index, l.created_at
-        """, (student_id, student_id))
-        
-        lessons = cursor.fetchall()
-        print(f"Lecciones encontradas (asignadas): {len(lessons)}")
+            SELECT lesson_id, MAX(completed) as completed, MAX(score) as score
+            FROM student_progress
+            WHERE student_id = %s
+            GROUP BY lesson_id
+        """, (student_id,))
+        progress_rows = {row["lesson_id"]: row for row in cursor.fetchall()}
+        
+        available = [l for l in catalog if l.id in assigned]
+        print(f"Lecciones encontradas (asignadas): {len(available)}")
         
         # Si no hay lecciones asignadas, mostrar todas las lecciones activas
-        if not lessons or len(lessons) == 0:
+        if not available:
             print("No hay lecciones asignadas, mostrando todas las disponibles")
-            cursor.execute("""
-                SELECT 
-                    l.id,
-                    l.title,
-                    l.description,
-                    l.difficulty,
-                    l.order_index,
-                    l.created_at,
-                    COUNT(ls.id) as total_steps,
-                    COALESCE(sp.completed, 0) as completed,
-                    COALESCE(sp.score, 0) as score
-                FROM lessons l
-                LEFT JOIN lesson_steps ls ON l.id = ls.lesson_id
-                LEFT JOIN student_progress sp ON l.id = sp.lesson_id AND sp.student_id = %s
-                WHERE l.active = 1
-                GROUP BY l.id, l.title, l.description, l.difficulty, l.order_index, l.created_at, sp.completed, sp.score
-                ORDER BY l.order_index, l.created_at
-            """, (student_id,))
-            
-            lessons = cursor.fetchall()
-            print(f"Lecciones encontradas (todas): {len(lessons)}")
+            available = catalog
+            print(f"Lecciones encontradas (todas): {len(available)}")
+        
+        lessons = []
+        for l in sorted(available, key=lambda l: (l.order_index or 0, l.created_at is not None, l.created_at)):
+            p = progress_rows.get(l.id) or {}
+            lessons.append({
+                "id": l.id,
+                "title": l.title,
+                "description": l.description,
+                "difficulty": l.difficulty,
+                "order_index": l.order_index,
+                "created_at": l.created_at,
+                "total_steps": l.step_count,
+                "completed": p.get("completed") or 0,
+                "score": p.get("score") or 0
+            })
         
         cursor.close()
         conn.close()
         
         print(f"Retornando {len(lessons)} lecciones")
-        return jsonify({"lessons": lessons})
+        return tagged(jsonify({"lessons": lessons}), etag)
         
     except Exception as e:
         print(f"ERROR en get_student_lessons: {str(e)}")
@@ -102,13 +135,12 @@ def start_session():
         cursor = conn.cursor(dictionary=True)
         
         # Verificar si ya existe una sesión activa
-        cursor.execute("""
-            SELECT id FROM sessions 
-            WHERE user_id = %s AND lesson_id = %s AND finished_at IS NULL
-            ORDER BY started_at DESC LIMIT 1
-        """, (student_id, lesson_id))
+        cursor.execute(ACTIVE_SESSION_SQL, (student_id, lesson_id))
         
         existing = cursor.fetchone()
+        # Con escritura diferida la sesión pudo terminar sin que finished_at esté escrito todavía
+        if existing and attempt_writer.is_finished(existing["id"]):
+            existing = None
         
         if existing:
             session_id = existing["id"]
@@ -145,58 +177,40 @@ def api_session_prompt(session_id):
     try:
         cursor = conn.cursor(dictionary=True)
         
-        # Obtener información de la sesión
-        cursor.execute("""
-            SELECT s.*, l.title as lesson_title
-            FROM sessions s
-            JOIN lessons l ON s.lesson_id = l.id
-            WHERE s.id = %s
-        """, (session_id,))
-        
-        session = cursor.fetchone()
+        # Sesión con su cursor (búsqueda por clave primaria); el paso sale de la caché de lecciones
+        if attempt_writer.ENABLED:
+            # El estado en memoria incluye los intentos que todavía no se escribieron
+            session = attempt_writer.session(cursor, session_id)
+        else:
+            cursor.execute(SESSION_SQL, (session_id,))
+            session = cursor.fetchone()
+        lesson = lesson_cache.get(cursor, session["lesson_id"]) if session else None
         
-        if not session:
+        if not session or not lesson:
             cursor.close()
             conn.close()
             return jsonify({"error": "Session not found"}), 404
         
-        lesson_id = session["lesson_id"]
-        
-        # Obtener total de pasos de la lección
-        cursor.execute("""
-            SELECT COUNT(*) as total_steps 
-            FROM lesson_steps 
-            WHERE lesson_id = %s
-        """, (lesson_id,))
-        
-        total_steps = cursor.fetchone()["total_steps"]
-        
-        # Contar respuestas correctas para determinar el paso actual
-        cursor.execute("""
-            SELECT COUNT(*) as correct_count 
-            FROM attempts 
-            WHERE session_id = %s AND correct = 1
-        """, (session_id,))
-        
-        correct_count = cursor.fetchone()["correct_count"]
-        
-        # Obtener el paso actual
-        cursor.execute("""
-            SELECT * FROM lesson_steps 
-            WHERE lesson_id = %s AND step_index = %s
-        """, (lesson_id, correct_count))
-        
-        step = cursor.fetchone()
+        step = lesson_cache.step_at(lesson, session["current_step"])
         
-        if not step:
+        if not step and attempt_writer.ENABLED:
+            attempt_writer.finish(cursor, session_id)
+        elif not step:
             # La lección ha terminado
             cursor.execute("""
                 UPDATE sessions 
                 SET finished_at = NOW() 
                 WHERE id = %s AND finished_at IS NULL
             """, (session_id,))
+            finished_now = cursor.rowcount == 1
+            if finished_now:
+                progress.record_session_finished(cursor, session)
             conn.commit()
-            
+            if finished_now:
+                live_events.record(session["user_id"], session["lesson_id"], session_id,
+                                   score=session["score"], current_step=session["current_step"], finished=True)
+        
+        if not step:
             cursor.close()
             conn.close()
             
@@ -206,31 +220,29 @@ def api_session_prompt(session_id):
                 "user_id": session["user_id"]
             })
         
-        # Contar intentos en este paso
-        cursor.execute("""
-            SELECT COUNT(*) as attempt_count 
-            FROM attempts 
-            WHERE session_id = %s AND step_index = %s
-        """, (session_id, correct_count))
-        
-        attempts = cursor.fetchone()["attempt_count"]
-        
         cursor.close()
         conn.close()
         
         return jsonify({
             "finished": False,
-            "prompt": step["prompt"],
-            "target": step["target"],
-            "hint": step.get("hint"),
-            "step_index": step["step_index"],
-            "max_attempts": step.get("max_attempts", 3),
-            "attempts": attempts,
+            "prompt": step.prompt,
+            "target": step.target,
+            "hint": step.hint,
+            "step_index": step.step_index,
+            "max_attempts": step.max_attempts,
+            "attempts": session["step_attempts"],
             "score": session.get("score", 0),
             "user_id": session["user_id"],
-            "total_steps": total_steps
+            "total_steps": len(lesson.steps)
         })
         
+    except attempt_writer.QueueFull:
+        try:
+            cursor.close()
+            conn.close()
+        except:
+            pass
+        return jsonify({"error": "Servidor ocupado, intenta de nuevo"}), 503, {"Retry-After": "1"}
     except Exception as e:
         try:
             cursor.close()
@@ -255,106 +267,105 @@ def api_submit(session_id):
     try:
         cursor = conn.cursor(dictionary=True)
         
-        # Obtener sesión
-        cursor.execute("SELECT * FROM sessions WHERE id = %s", (session_id,))
+        if attempt_writer.ENABLED:
+            result, _ = attempt_writer.submit(cursor, session_id, answer)
+            cursor.close()
+            conn.close()
+            if result is None:
+                return jsonify({"error": "session not found"}), 404
+            return jsonify(result)
+        
+        # Bloquear la sesión: el cursor (paso/intentos/puntaje) se lee y actualiza en la misma transacción
+        cursor.execute("""
+            SELECT id, lesson_id, user_id, class_id, score, current_step, step_attempts, attempt_count
+            FROM sessions WHERE id = %s FOR UPDATE
+        """, (session_id,))
         session = cursor.fetchone()
         
         if not session:
+            conn.rollback()
             cursor.close()
             conn.close()
             return jsonify({"error": "session not found"}), 404
         
         lesson_id = session["lesson_id"]
         user_id = session["user_id"]
+        current_step = session["current_step"]
         
-        # Contar correctas para saber el paso actual
-        cursor.execute("""
-            SELECT COUNT(*) as correct_count 
-            FROM attempts 
-            WHERE session_id = %s AND correct = 1
-        """, (session_id,))
-        
-        correct_count = cursor.fetchone()["correct_count"]
-        
-        # Obtener el paso actual
-        cursor.execute("""
-            SELECT * FROM lesson_steps 
-            WHERE lesson_id = %s AND step_index = %s
-        """, (lesson_id, correct_count))
-        
-        step = cursor.fetchone()
+        lesson = lesson_cache.get(cursor, lesson_id)
+        step = lesson_cache.step_at(lesson, current_step) if lesson else None
         
         if not step:
+            conn.rollback()
             cursor.close()
             conn.close()
             return jsonify({"finished": True})
         
-        target = (step["target"] or "").upper()
-        
-        # Contar intentos previos en este paso
-        cursor.execute("""
-            SELECT COUNT(*) as attempt_count 
-            FROM attempts 
-            WHERE session_id = %s AND step_index = %s
-        """, (session_id, correct_count))
-        
-        prev_attempts = cursor.fetchone()["attempt_count"]
-        attempts_now = prev_attempts + 1
+        target = (step.target or "").upper()
+        attempts_now = session["step_attempts"] + 1
         
         # Verificar respuesta
         is_correct = (answer == target)
+        finished = is_correct and lesson_cache.step_at(lesson, current_step + 1) is None
         
-        # Registrar intento
-        cursor.execute("""
-            INSERT INTO attempts 
-            (session_id, lesson_id, user_id, step_index, answer, correct, attempts, ts)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
-        """, (session_id, lesson_id, user_id, correct_count, answer, 1 if is_correct else 0, attempts_now))
+        # Registrar intento (y sumarlo a los contadores de actividad)
+        activity.record_attempts(cursor, [
+            (session_id, lesson_id, user_id, current_step, answer, 1 if is_correct else 0,
+             attempts_now, activity.now_ts())
+        ])
         
-        # Si es correcta, sumar punto
+        # Avanzar el cursor de la sesión: si es correcta, sumar punto y pasar al siguiente paso
         if is_correct:
+            cursor.execute(f"""
+                UPDATE sessions 
+                SET score = score + 1, current_step = current_step + 1, step_attempts = 0,
+                    attempt_count = attempt_count + 1{", finished_at = NOW()" if finished else ""}
+                WHERE id = %s
+            """, (session_id,))
+            if finished:
+                # Actualizar el resumen de progreso en la misma transacción
+                progress.record_session_finished(cursor, dict(
+                    session, score=session["score"] + 1, attempt_count=session["attempt_count"] + 1
+                ))
+        else:
             cursor.execute("""
                 UPDATE sessions 
-                SET score = score + 1 
+                SET step_attempts = step_attempts + 1, attempt_count = attempt_count + 1
                 WHERE id = %s
             """, (session_id,))
         
         conn.commit()
+        live_events.record(user_id, lesson_id, session_id,
+                           score=session["score"] + (1 if is_correct else 0),
+                           current_step=current_step + (1 if is_correct else 0),
+                           attempts=1, corrects=1 if is_correct else 0, finished=finished)
         
         result = {
             "correct": is_correct,
             "attempts": attempts_now,
-            "max_attempts": step.get("max_attempts", 3)
+            "max_attempts": step.max_attempts
         }
         
         # Si falló y agotó intentos, dar pista
-        if not is_correct and attempts_now >= step.get("max_attempts", 3):
-            result["hint"] = step.get("hint") or f"La respuesta correcta es: {target}"
+        if not is_correct and attempts_now >= step.max_attempts:
+            result["hint"] = step.hint or f"La respuesta correcta es: {target}"
         
-        # Si es correcto, verificar si hay más pasos
-        if is_correct:
-            cursor.execute("""
-                SELECT * FROM lesson_steps 
-                WHERE lesson_id = %s AND step_index = %s
-            """, (lesson_id, correct_count + 1))
-            
-            next_step = cursor.fetchone()
-            
-            if not next_step:
-                # Lección completada
-                cursor.execute("""
-                    UPDATE sessions 
-                    SET finished_at = NOW() 
-                    WHERE id = %s
-                """, (session_id,))
-                conn.commit()
-                result["finished"] = True
+        # Lección completada
+        if finished:
+            result["finished"] = True
         
         cursor.close()
         conn.close()
         
         return jsonify(result)
         
+    except attempt_writer.QueueFull:
+        try:
+            cursor.close()
+            conn.close()
+        except:
+            pass
+        return jsonify({"error": "Servidor ocupado, intenta de nuevo"}), 503, {"Retry-After": "1"}
     except Exception as e:
         try:
             conn.rollback()
@@ -374,10 +385,22 @@ def api_skip(session_id):
     try:
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("SELECT * FROM sessions WHERE id = %s", (session_id,))
+        if attempt_writer.ENABLED:
+            found = attempt_writer.skip(cursor, session_id)
+            cursor.close()
+            conn.close()
+            if not found:
+                return jsonify({"error": "session not found"}), 404
+            return jsonify({"ok": True})
+        
+        cursor.execute("""
+            SELECT id, lesson_id, user_id, current_step
+            FROM sessions WHERE id = %s FOR UPDATE
+        """, (session_id,))
         session = cursor.fetchone()
         
         if not session:
+            conn.rollback()
             cursor.close()
             conn.close()
             return jsonify({"error": "session not found"}), 404
@@ -385,28 +408,31 @@ def api_skip(session_id):
         lesson_id = session["lesson_id"]
         user_id = session["user_id"]
         
-        # Contar correctas
-        cursor.execute("""
-            SELECT COUNT(*) as correct_count 
-            FROM attempts 
-            WHERE session_id = %s AND correct = 1
-        """, (session_id,))
-        
-        correct_count = cursor.fetchone()["correct_count"]
-        
         # Registrar intento saltado
+        activity.record_attempts(cursor, [
+            (session_id, lesson_id, user_id, session["current_step"], '__SKIP__', 0, 1, activity.now_ts())
+        ])
+        
         cursor.execute("""
-            INSERT INTO attempts 
-            (session_id, lesson_id, user_id, step_index, answer, correct, attempts, ts)
-            VALUES (%s, %s, %s, %s, '__SKIP__', 0, 1, NOW())
-        """, (session_id, lesson_id, user_id, correct_count))
+            UPDATE sessions 
+            SET step_attempts = step_attempts + 1, attempt_count = attempt_count + 1
+            WHERE id = %s
+        """, (session_id,))
         
         conn.commit()
+        live_events.record(user_id, lesson_id, session_id, current_step=session["current_step"], attempts=1)
         cursor.close()
         conn.close()
         
         return jsonify({"ok": True})
         
+    except attempt_writer.QueueFull:
+        try:
+            cursor.close()
+            conn.close()
+        except:
+            pass
+        return jsonify({"error": "Servidor ocupado, intenta de nuevo"}), 503, {"Retry-After": "1"}
     except Exception as e:
         try:
             conn.rollback()
@@ -415,3 +441,54 @@ def api_skip(session_id):
         except:
             pass
         return jsonify({"error": str(e)}), 500
+
+@student_bp.route("/api/session/<session_id>/answers", methods=["POST"])
+def api_submit_batch(session_id):
+    """Subir en lote respuestas guardadas sin conexión (idempotente por key, ver answer_batch.py)"""
+    try:
+        answers = answer_batch.parse(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Con escritura diferida, lo pendiente de la sesión se escribe antes de ir directo a la base
+    if attempt_writer.ENABLED and not attempt_writer.release(session_id):
+        return jsonify({"error": "Servidor ocupado, intenta de nuevo"}), 503, {"Retry-After": "1"}
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        result = answer_batch.apply(cursor, session_id, answers)
+        if result is None:
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "session not found"}), 404
+
+        conn.commit()
+        if result["applied"]:
+            state = result["session"]
+            live_events.record(state["user_id"], state["lesson_id"], session_id,
+                               score=state["score"], current_step=state["current_step"],
+                               attempts=result["applied"], corrects=result["corrects"],
+                               finished=state["finished"])
+        cursor.close()
+        conn.close()
+
+        return jsonify(result)
+
+    except Exception as e:
+        try:
+            conn.rollback()
+            cursor.close()
+            conn.close()
+        except:
+            pass
+        return jsonify({"error": str(e)}), 500
+
+@student_bp.route("/api/attempts/queue", methods=["GET"])
+def api_attempt_queue():
+    """Estado de la escritura diferida de intentos"""
+    return jsonify(attempt_writer.stats())
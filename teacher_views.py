@@ -1,12 +1,110 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import time
 import uuid
-from db import get_db_connection
+from db import get_db_connection, has_column, bump_version, read_versions
+import lesson_cache
+import assignments
+import live_events
+from etags import make_etag, not_modified, tagged
+import hot_queries
+from lesson_bundle import step_rows, insert_steps, parse_bundle, import_lessons, export_lessons
 
 teacher_bp = Blueprint("teacher_bp", __name__)
 
+# Columnas permitidas para ordenar el dashboard (parámetro ?sort=)
+DASHBOARD_SORT_COLUMNS = {
+    "name": "u.full_name",
+    "accuracy": "accuracy",
+    "last_activity": "sa.last_ts",
+    "attempts": "attempts",
+    "completed": "completed",
+}
+DASHBOARD_MAX_PER_PAGE = 500
+
+# Consultas de cada request, registradas para el chequeo de planes (migrate.py --check)
+TEACHER_CLASSES_SQL = hot_queries.register("teacher.classes", """
+    SELECT
+        c.id,
+        c.name,
+        c.description,
+        c.teacher_id,
+        (SELECT COUNT(*) FROM class_students cs WHERE cs.class_id = c.id) as student_count,
+        (SELECT COUNT(*) FROM class_lessons cl WHERE cl.class_id = c.id) as lesson_count
+    FROM classes c
+    WHERE c.teacher_id = %s
+    ORDER BY c.name
+""", (1,), ["c", "cs", "cl"])
+
+CLASS_ROSTERS_SQL = hot_queries.register("teacher.class_rosters", """
+    SELECT
+        cs.class_id,
+        u.id,
+        u.username,
+        u.full_name,
+        COUNT(DISTINCT sp.lesson_id) as completed_lessons,
+        COALESCE(SUM(sp.score), 0) as total_score
+    FROM classes c
+    JOIN class_students cs ON cs.class_id = c.id
+    JOIN users u ON cs.student_id = u.id
+    LEFT JOIN student_progress sp ON u.id = sp.student_id AND sp.completed = 1
+    WHERE c.teacher_id = %s
+    GROUP BY cs.class_id, u.id, u.username, u.full_name
+""", (1,), ["c", "cs", "u", "sp"])
+
+STUDENT_LESSONS_SQL = hot_queries.register("teacher.student_lessons", """
+    SELECT s.lesson_id, l.title, s.score, s.started_at, s.finished_at,
+           COALESCE(MAX(sla.attempts), 0) as total_attempts,
+           COALESCE(MAX(sla.corrects), 0) as correct_attempts
+    FROM sessions s
+    LEFT JOIN lessons l ON s.lesson_id = l.id
+    LEFT JOIN student_lesson_activity sla
+           ON sla.student_id = s.user_id AND sla.lesson_id = s.lesson_id
+    WHERE s.user_id = %s
+    GROUP BY s.lesson_id
+    ORDER BY s.started_at DESC
+""", (1,), ["s", "sla"])
+
+LESSON_MARKER_SQL = hot_queries.register("teacher.lesson_marker", """
+    SELECT COUNT(*) as students, COALESCE(SUM(attempts), 0) as attempts,
+           COALESCE(SUM(completed), 0) as completed,
+           (SELECT COUNT(*) FROM sessions WHERE lesson_id = %s) as sessions
+    FROM student_lesson_activity
+    WHERE lesson_id = %s
+""", ("x", "x"), ["student_lesson_activity", "sessions"])
+
+# Intentos vigentes más los archivados (attempt_step_summary), por sesión y luego por estudiante
+LESSON_PERFORMANCE_SQL = hot_queries.register("teacher.lesson_performance", """
+    SELECT u.full_name, ps.score, ps.finished_at,
+           SUM(ps.total_attempts) as total_attempts,
+           SUM(ps.correct_attempts) as correct_attempts
+    FROM (
+        SELECT s.user_id, s.score, s.finished_at,
+               (SELECT COUNT(*) FROM attempts a WHERE a.session_id = s.id)
+               + (SELECT COALESCE(SUM(ss.attempts), 0) FROM attempt_step_summary ss
+                  WHERE ss.session_id = s.id) as total_attempts,
+               (SELECT COALESCE(SUM(a.correct), 0) FROM attempts a WHERE a.session_id = s.id)
+               + (SELECT COALESCE(SUM(ss.corrects), 0) FROM attempt_step_summary ss
+                  WHERE ss.session_id = s.id) as correct_attempts
+        FROM sessions s
+        WHERE s.lesson_id = %s
+    ) ps
+    JOIN users u ON ps.user_id = u.id
+    GROUP BY ps.user_id
+""", ("x",), ["s", "u", "a", "ss"])
+
 @teacher_bp.route("/api/teacher/dashboard")
 def api_teacher_dashboard():
+    sort = request.args.get("sort", "name")
+    if sort not in DASHBOARD_SORT_COLUMNS:
+        return jsonify({"error": f"sort debe ser uno de: {', '.join(DASHBOARD_SORT_COLUMNS)}"}), 400
+    order = "ASC" if request.args.get("order", "asc").lower() == "asc" else "DESC"
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        per_page = request.args.get("per_page")
+        per_page = min(max(int(per_page), 1), DASHBOARD_MAX_PER_PAGE) if per_page else None
+    except ValueError:
+        return jsonify({"error": "page y per_page deben ser números"}), 400
+
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
@@ -19,32 +117,29 @@ def api_teacher_dashboard():
         cursor.execute("SELECT COUNT(*) as total_lessons FROM lessons")
         total_lessons = cursor.fetchone()["total_lessons"]
 
-        cursor.execute("SELECT * FROM users WHERE role='student'")
-        students = cursor.fetchall()
+        # Contadores mantenidos por el camino de escritura (activity.py): una fila por estudiante
+        sql = f"""
+            SELECT u.id, u.full_name, u.username,
+                   COALESCE(sa.attempts, 0) as attempts,
+                   COALESCE(sa.corrects, 0) as corrects,
+                   COALESCE(ROUND(sa.corrects * 100.0 / NULLIF(sa.attempts, 0), 2), 0) as accuracy,
+                   sa.last_ts,
+                   COALESCE(sa.lessons_completed, 0) as completed
+            FROM users u
+            LEFT JOIN student_activity sa ON sa.student_id = u.id
+            WHERE u.role='student'
+            ORDER BY {DASHBOARD_SORT_COLUMNS[sort]} {order}, u.id
+        """
+        params = ()
+        if per_page:
+            sql += " LIMIT %s OFFSET %s"
+            params = (per_page, (page - 1) * per_page)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
 
         student_progress = []
-        for student in students:
-            cursor.execute("""
-                SELECT COUNT(*) as attempts, 
-                       IFNULL(SUM(correct),0) as corrects, 
-                       MAX(ts) as last_ts 
-                FROM attempts 
-                WHERE user_id=%s
-            """, (student["id"],))
-            q = cursor.fetchone()
-            attempts = q["attempts"] or 0
-            corrects = q["corrects"] or 0
-            accuracy = round(corrects/attempts*100, 2) if attempts > 0 else 0
-
-            cursor.execute("""
-                SELECT COUNT(DISTINCT lesson_id) as completed 
-                FROM sessions 
-                WHERE user_id=%s AND finished_at IS NOT NULL
-            """, (student["id"],))
-            completed_result = cursor.fetchone()
-            completed = completed_result["completed"] if completed_result else 0
-
-            last_ts = q["last_ts"]
+        for row in rows:
+            last_ts = row["last_ts"]
             last_activity = None
             if last_ts:
                 try:
@@ -53,13 +148,13 @@ def api_teacher_dashboard():
                     last_activity = str(last_ts)
 
             student_progress.append({
-                "id": student["id"],
-                "name": student["full_name"],
-                "username": student["username"],
-                "attempts": attempts,
-                "corrects": corrects,
-                "accuracy": accuracy,
-                "completed": completed,
+                "id": row["id"],
+                "name": row["full_name"],
+                "username": row["username"],
+                "attempts": int(row["attempts"]),
+                "corrects": int(row["corrects"]),
+                "accuracy": float(row["accuracy"]),
+                "completed": int(row["completed"]),
                 "last_activity": last_activity
             })
 
@@ -69,8 +164,12 @@ def api_teacher_dashboard():
         return jsonify({
             "total_students": total_students,
             "total_lessons": total_lessons,
-            "active_sessions": len(student_progress),
-            "students": student_progress
+            "active_sessions": total_students,
+            "students": student_progress,
+            "page": page,
+            "per_page": per_page,
+            "sort": sort,
+            "order": order.lower()
         })
 
     except Exception as e:
@@ -86,7 +185,13 @@ def api_teacher_dashboard():
 
 @teacher_bp.route("/api/teacher/classes/<int:teacher_id>", methods=["GET"])
 def get_teacher_classes(teacher_id):
-    """Obtener las clases asignadas a un profesor"""
+    """Obtener las clases asignadas a un profesor.
+
+    ?include=students (por defecto) agrega el listado de estudiantes de cada clase;
+    con ?include= vacío solo se devuelven las clases con sus conteos.
+    """
+    include = {part.strip() for part in request.args.get("include", "students").split(",")}
+
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
@@ -95,41 +200,21 @@ def get_teacher_classes(teacher_id):
         cursor = conn.cursor(dictionary=True)
         
         # Obtener clases del profesor con conteo de estudiantes
-        cursor.execute("""
-            SELECT 
-                c.id,
-                c.name,
-                c.description,
-                c.teacher_id,
-                COUNT(DISTINCT cs.student_id) as student_count,
-                COUNT(DISTINCT cl.lesson_id) as lesson_count
-            FROM classes c
-            LEFT JOIN class_students cs ON c.id = cs.class_id
-            LEFT JOIN class_lessons cl ON c.id = cl.class_id
-            WHERE c.teacher_id = %s
-            GROUP BY c.id, c.name, c.description, c.teacher_id
-            ORDER BY c.name
-        """, (teacher_id,))
+        cursor.execute(TEACHER_CLASSES_SQL, (teacher_id,))
         
         classes = cursor.fetchall()
         
-        # Para cada clase, obtener los estudiantes
-        for class_data in classes:
-            cursor.execute("""
-                SELECT 
-                    u.id,
-                    u.username,
-                    u.full_name,
-                    COUNT(DISTINCT sp.lesson_id) as completed_lessons,
-                    COALESCE(SUM(sp.score), 0) as total_score
-                FROM class_students cs
-                JOIN users u ON cs.student_id = u.id
-                LEFT JOIN student_progress sp ON u.id = sp.student_id AND sp.completed = 1
-                WHERE cs.class_id = %s
-                GROUP BY u.id, u.username, u.full_name
-            """, (class_data['id'],))
+        if "students" in include and classes:
+            # Todos los estudiantes de todas las clases en una sola consulta,
+            # luego se reparten por class_id en memoria
+            cursor.execute(CLASS_ROSTERS_SQL, (teacher_id,))
+            
+            rosters = {}
+            for row in cursor.fetchall():
+                rosters.setdefault(row.pop("class_id"), []).append(row)
             
-            class_data['students'] = cursor.fetchall()
+            for class_data in classes:
+                class_data['students'] = rosters.get(class_data['id'], [])
         
         cursor.close()
         conn.close()
@@ -144,6 +229,83 @@ def get_teacher_classes(teacher_id):
             pass
         return jsonify({"error": str(e)}), 500
 
+def _live_stream(roster_sql, param):
+    """Respuesta SSE con el progreso en vivo de los estudiantes de roster_sql (filas class_id, student_id)"""
+    if not live_events.enabled():
+        return jsonify({"error": "Eventos en vivo desactivados (LIVE_EVENTS_BACKEND=off)"}), 404
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(roster_sql, (param,))
+        students = {}
+        for row in cursor.fetchall():
+            students.setdefault(row["student_id"], []).append(row["class_id"])
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        try:
+            cursor.close()
+            conn.close()
+        except:
+            pass
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        # La suscripción vive lo que dure la conexión; la base ya no se usa
+        subscriber = live_events.subscribe(students)
+        try:
+            yield from live_events.stream(subscriber)
+        finally:
+            live_events.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+@teacher_bp.route("/api/teacher/class/<int:class_id>/events")
+def api_class_events(class_id):
+    """Progreso en vivo de los estudiantes de la clase (Server-Sent Events, ver live_events.py)"""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM classes WHERE id=%s", (class_id,))
+        found = cursor.fetchone()
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        try:
+            cursor.close()
+            conn.close()
+        except:
+            pass
+        return jsonify({"error": str(e)}), 500
+    if not found:
+        return jsonify({"error": "Clase no encontrada"}), 404
+
+    return _live_stream("SELECT class_id, student_id FROM class_students WHERE class_id = %s", class_id)
+
+@teacher_bp.route("/api/teacher/classes/<int:teacher_id>/events")
+def api_teacher_class_events(teacher_id):
+    """Progreso en vivo de todas las clases del profesor en una sola conexión"""
+    return _live_stream("""
+        SELECT cs.class_id, cs.student_id
+        FROM classes c
+        JOIN class_students cs ON cs.class_id = c.id
+        WHERE c.teacher_id = %s
+    """, teacher_id)
+
+@teacher_bp.route("/api/teacher/live/stats")
+def api_live_stats():
+    """Suscriptores y eventos publicados en este proceso"""
+    return jsonify(live_events.stats())
+
 @teacher_bp.route("/api/teacher/student/<int:student_id>")
 def api_student_detail(student_id):
     conn = get_db_connection()
@@ -159,17 +321,8 @@ def api_student_detail(student_id):
             conn.close()
             return jsonify({"error": "Student not found"}), 404
 
-        cursor.execute("""
-            SELECT s.lesson_id, l.title, s.score, s.started_at, s.finished_at,
-                   COUNT(a.id) as total_attempts,
-                   IFNULL(SUM(a.correct),0) as correct_attempts
-            FROM sessions s
-            LEFT JOIN lessons l ON s.lesson_id = l.id
-            LEFT JOIN attempts a ON s.id = a.session_id
-            WHERE s.user_id = %s
-            GROUP BY s.lesson_id
-            ORDER BY s.started_at DESC
-        """, (student_id,))
+        # Intentos y aciertos por lección desde los contadores, sin recorrer attempts
+        cursor.execute(STUDENT_LESSONS_SQL, (student_id,))
         progress = cursor.fetchall()
 
         progress_list = []
@@ -198,15 +351,14 @@ def api_student_detail(student_id):
 
         cursor.execute("""
             SELECT 
-                COUNT(DISTINCT s.lesson_id) as lessons_attempted,
-                COUNT(DISTINCT CASE WHEN s.finished_at IS NOT NULL THEN s.lesson_id END) as lessons_completed,
-                COUNT(a.id) as total_attempts,
-                IFNULL(SUM(a.correct),0) as correct_attempts,
-                ROUND(IFNULL(SUM(a.correct) * 100.0 / NULLIF(COUNT(a.id),0),0),2) as overall_accuracy
-            FROM sessions s
-            LEFT JOIN attempts a ON s.id = a.session_id
-            WHERE s.user_id = %s
-        """, (student_id,))
+                (SELECT COUNT(DISTINCT lesson_id) FROM sessions WHERE user_id = %s) as lessons_attempted,
+                COALESCE(MAX(sa.lessons_completed), 0) as lessons_completed,
+                COALESCE(MAX(sa.attempts), 0) as total_attempts,
+                COALESCE(MAX(sa.corrects), 0) as correct_attempts,
+                ROUND(IFNULL(MAX(sa.corrects) * 100.0 / NULLIF(MAX(sa.attempts),0),0),2) as overall_accuracy
+            FROM student_activity sa
+            WHERE sa.student_id = %s
+        """, (student_id, student_id))
         overall = cursor.fetchone()
 
         cursor.close()
@@ -244,26 +396,17 @@ def api_lessons_list():
         try:
             cursor = conn.cursor(dictionary=True)
             
-            # Query corregido - compatible con MySQL
-            cursor.execute("""
-                SELECT 
-                    l.id,
-                    l.title,
-                    l.description,
-                    l.difficulty,
-                    l.order_index,
-                    l.created_at,
-                    l.active,
-                    COUNT(ls.id) as step_count 
-                FROM lessons l 
-                LEFT JOIN lesson_steps ls ON l.id = ls.lesson_id 
-                GROUP BY l.id, l.title, l.description, l.difficulty, l.order_index, l.created_at, l.active
-                ORDER BY l.order_index, l.created_at DESC
-            """)
-            lessons = cursor.fetchall()
+            etag = make_etag("lessons", read_versions(cursor, ["lessons"])["lessons"])
+            cached = not_modified(etag)
+            if cached:
+                cursor.close()
+                conn.close()
+                return cached
+            
+            lessons = [l._asdict() for l in lesson_cache.catalog(cursor)]
             cursor.close()
             conn.close()
-            return jsonify({"lessons": lessons})
+            return tagged(jsonify({"lessons": lessons}), etag)
         except Exception as e:
             try:
                 cursor.close()
@@ -298,18 +441,8 @@ def api_lessons_list():
             
             cursor = conn.cursor()
             
-            # Verificar si las columnas existen antes de insertar
-            cursor.execute("SHOW COLUMNS FROM lessons LIKE 'active'")
-            has_active = cursor.fetchone() is not None
-            
-            cursor.execute("SHOW COLUMNS FROM lessons LIKE 'difficulty'")
-            has_difficulty = cursor.fetchone() is not None
-            
-            cursor.execute("SHOW COLUMNS FROM lessons LIKE 'order_index'")
-            has_order_index = cursor.fetchone() is not None
-            
-            # Crear la lección con campos disponibles
-            if has_active and has_difficulty and has_order_index:
+            # Crear la lección con campos disponibles (según el esquema detectado al iniciar)
+            if all(has_column("lessons", c, cursor) for c in ("active", "difficulty", "order_index")):
                 cursor.execute("""
                     INSERT INTO lessons (id, title, description, difficulty, order_index, active)
                     VALUES (%s, %s, %s, %s, %s, 1)
@@ -321,27 +454,19 @@ def api_lessons_list():
                     VALUES (%s, %s, %s)
                 """, (lesson_id, title, description))
             
-            # Crear los pasos de la lección
-            for idx, step in enumerate(steps):
-                step_type = step.get("type", "input")  # input, select, match
-                target = step.get("target", "").strip()  # La respuesta correcta
-                prompt = step.get("prompt", "").strip()  # La pregunta/instrucción
-                hint = step.get("hint", "").strip()  # Pista opcional
-                max_attempts = step.get("max_attempts", 3)
-                
-                if not target or not prompt:
+            # Crear los pasos de la lección (un solo INSERT multi-fila)
+            rows = step_rows(lesson_id, steps)
+            for row in rows:
+                if not row[3] or not row[4]:
                     conn.rollback()
                     cursor.close()
                     conn.close()
-                    return jsonify({"error": f"El paso {idx+1} necesita 'target' y 'prompt'"}), 400
-                
-                cursor.execute("""
-                    INSERT INTO lesson_steps 
-                    (lesson_id, step_index, type, target, prompt, hint, max_attempts)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """, (lesson_id, idx, step_type, target, prompt, hint, max_attempts))
+                    return jsonify({"error": f"El paso {row[1]+1} necesita 'target' y 'prompt'"}), 400
+            insert_steps(cursor, rows)
             
+            lesson_cache.mark_changed(cursor, lesson_id)
             conn.commit()
+            lesson_cache.invalidate(lesson_id)
             cursor.close()
             conn.close()
             
@@ -367,6 +492,54 @@ def api_lessons_list():
                 pass
             return jsonify({"error": str(e)}), 500
 
+@teacher_bp.route("/api/teacher/lessons/import", methods=["POST"])
+def api_lessons_import():
+    """Importar un bundle de lecciones (JSON o NDJSON, ver lesson_bundle)"""
+    fmt = request.args.get("format") or ("ndjson" if "ndjson" in (request.content_type or "") else "json")
+    try:
+        lessons = parse_bundle(request.get_data(), fmt)
+    except ValueError as e:
+        return jsonify({"error": f"Bundle inválido: {e}"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        report = import_lessons(conn, lessons)
+        conn.close()
+        status = 201 if report["imported"] else 400
+        return jsonify(report), status
+    except Exception as e:
+        try:
+            conn.close()
+        except:
+            pass
+        return jsonify({"error": str(e)}), 500
+
+@teacher_bp.route("/api/teacher/lessons/export", methods=["GET"])
+def api_lessons_export():
+    """Exportar todas las lecciones con sus pasos como bundle (NDJSON por defecto)"""
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "json"):
+        return jsonify({"error": "format debe ser 'ndjson' o 'json'"}), 400
+    active_only = request.args.get("active") == "1"
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    def generate():
+        try:
+            yield from export_lessons(conn, fmt, active_only)
+        finally:
+            conn.close()
+
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=lessons.{fmt}"
+    })
+
 @teacher_bp.route("/api/teacher/lesson/<lesson_id>", methods=["GET", "PUT", "DELETE"])
 def api_lesson_detail(lesson_id):
     conn = get_db_connection()
@@ -377,32 +550,33 @@ def api_lesson_detail(lesson_id):
     if request.method == "GET":
         try:
             cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM lessons WHERE id=%s", (lesson_id,))
-            lesson = cursor.fetchone()
+            lesson = lesson_cache.get(cursor, lesson_id)
             if not lesson:
                 cursor.close()
                 conn.close()
                 return jsonify({"error": "Lesson not found"}), 404
-            cursor.execute("SELECT * FROM lesson_steps WHERE lesson_id=%s ORDER BY step_index", (lesson_id,))
-            steps = cursor.fetchall()
-            cursor.execute("""
-                SELECT u.full_name, s.score, s.finished_at,
-                       COUNT(a.id) as total_attempts,
-                       IFNULL(SUM(a.correct),0) as correct_attempts
-                FROM sessions s
-                JOIN users u ON s.user_id = u.id
-                LEFT JOIN attempts a ON s.id = a.session_id
-                WHERE s.lesson_id = %s
-                GROUP BY s.user_id
-            """, (lesson_id,))
+            
+            # Marcadores baratos de lo que cambia el rendimiento: contadores de actividad
+            # de la lección, sesiones iniciadas y nombres de usuario
+            cursor.execute(LESSON_MARKER_SQL, (lesson_id, lesson_id))
+            marker = cursor.fetchone()
+            etag = make_etag("lesson", lesson.id, lesson.version, read_versions(cursor, ["users"])["users"],
+                             *(int(v) for v in marker.values()))
+            cached = not_modified(etag)
+            if cached:
+                cursor.close()
+                conn.close()
+                return cached
+            
+            cursor.execute(LESSON_PERFORMANCE_SQL, (lesson_id,))
             performance = cursor.fetchall()
             cursor.close()
             conn.close()
-            return jsonify({
-                "lesson": lesson,
-                "steps": steps,
+            return tagged(jsonify({
+                "lesson": lesson_cache.lesson_dict(lesson),
+                "steps": lesson_cache.steps_list(lesson),
                 "performance": performance
-            })
+            }), etag)
         except Exception as e:
             try:
                 cursor.close()
@@ -446,23 +620,11 @@ def api_lesson_detail(lesson_id):
                 cursor.execute("DELETE FROM lesson_steps WHERE lesson_id=%s", (lesson_id,))
                 
                 # Insertar nuevos pasos
-                steps = data.get("steps", [])
-                for idx, step in enumerate(steps):
-                    cursor.execute("""
-                        INSERT INTO lesson_steps 
-                        (lesson_id, step_index, type, target, prompt, hint, max_attempts)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """, (
-                        lesson_id, 
-                        idx, 
-                        step.get("type", "input"),
-                        step.get("target", ""),
-                        step.get("prompt", ""),
-                        step.get("hint", ""),
-                        step.get("max_attempts", 3)
-                    ))
+                insert_steps(cursor, step_rows(lesson_id, data.get("steps", [])))
             
+            lesson_cache.mark_changed(cursor, lesson_id)
             conn.commit()
+            lesson_cache.invalidate(lesson_id)
             cursor.close()
             conn.close()
             
@@ -488,7 +650,10 @@ def api_lesson_detail(lesson_id):
         try:
             cursor = conn.cursor()
             cursor.execute("UPDATE lessons SET active=0 WHERE id=%s", (lesson_id,))
+            assignments.refresh_lessons(cursor, [lesson_id])
+            lesson_cache.mark_changed(cursor, lesson_id)
             conn.commit()
+            lesson_cache.invalidate(lesson_id)
             cursor.close()
             conn.close()
             return jsonify({"message": "Lección eliminada exitosamente"}), 200
@@ -540,6 +705,8 @@ def api_assign_lesson_to_class(lesson_id):
             VALUES (%s, %s, %s)
             ON DUPLICATE KEY UPDATE due_date=VALUES(due_date), active=1
         """, (class_id, lesson_id, due_date))
+        assignments.add_lesson_to_class(cursor, class_id, lesson_id)
+        bump_version(cursor, "classes")
         
         conn.commit()
         cursor.close()
@@ -0,0 +1,19 @@
+"""Avisos en proceso de cambios de usuarios.
+
+admin_views publica aquí cuando actualiza o elimina un usuario; quien guarde
+datos de usuarios en memoria (p. ej. la caché de user_service cuando corre en
+el mismo proceso) se suscribe para descartarlos. Entre procesos separados la
+invalidación llega por el contador 'users' de cache_versions, que admin_views
+incrementa en la misma transacción (ver user_cache.sync).
+"""
+_subscribers = []
+
+def subscribe(callback):
+    _subscribers.append(callback)
+
+def user_changed(user_id):
+    for callback in list(_subscribers):
+        try:
+            callback(int(user_id))
+        except Exception:
+            pass